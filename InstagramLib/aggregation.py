@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+import heapq
+import threading
+from collections import OrderedDict
+
+from .instagram import (Account, AgentAccount, Comment, Media,
+                        NotUpdatedElement)
+from .harvesting import CommentHarvester
+
+
+# Cell of liker by post matrix: bit 0 is like, other bits are comments count
+LIKE = 1
+COMMENT = 2
+
+
+class SpaceSaving:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # key -> [count, error]
+        self.counters = {}
+        # (count, key) for every counter, counts only grow, so entry can be
+        # less than its counter and it is fixed on pop
+        self.__heap__ = []
+
+    def add(self, key, count=1):
+        # Returns key of replaced counter
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            return None
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+            heapq.heappush(self.__heap__, (count, key))
+            return None
+        # Replace the smallest counter
+        while True:
+            minimum, smallest = self.__heap__[0]
+            current = self.counters[smallest][0]
+            if current == minimum:
+                break
+            heapq.heapreplace(self.__heap__, (current, smallest))
+        del self.counters[smallest]
+        self.counters[key] = [minimum + count, minimum]
+        heapq.heapreplace(self.__heap__, (minimum + count, key))
+        return smallest
+
+    def top(self, k):
+        return heapq.nlargest(k, ((counter[0], counter[1], key)
+                                  for key, counter in self.counters.items()))
+
+
+class PostStats:
+    __slots__ = ('likes', 'comments', 'likes_count', 'comments_count',
+                 'followers_count')
+
+    def __init__(self):
+        self.likes = 0
+        self.comments = 0
+        self.likes_count = None
+        self.comments_count = None
+        self.followers_count = None
+
+
+class EngagementAggregator:
+    def __init__(self, top_k=100, top_capacity=None, max_posts=10000):
+        # Check data
+        if not isinstance(top_k, int) or top_k < 1:
+            raise TypeError("'top_k' must be positive int")
+        if top_capacity is not None and (not isinstance(top_capacity, int) or
+                                         top_capacity < top_k):
+            raise TypeError("'top_capacity' must be int not less 'top_k'")
+        if not isinstance(max_posts, int) or max_posts < 1:
+            raise TypeError("'max_posts' must be positive int")
+
+        self.top_k = top_k
+        self.max_posts = max_posts
+        self.__lock__ = threading.Lock()
+        # Interned ids: key -> index and index -> key, ids are removed
+        # together with rows of posts and counters of top
+        self.__accounts__ = {}
+        self.account_keys = {}
+        self.__posts__ = {}
+        self.post_codes = {}
+        self.__next_account__ = 0
+        self.__next_post__ = 0
+        # account index -> count of cells in matrix
+        self.__cells__ = {}
+        # post index -> {account index: cell}, least recently used first
+        self.matrix = OrderedDict()
+        self.stats = OrderedDict()
+        self.__top__ = SpaceSaving(top_capacity or top_k * 10)
+
+    def addLike(self, media, account):
+        # Check data
+        if not isinstance(media, Media):
+            raise TypeError("'media' must be Media type")
+        if not isinstance(account, Account):
+            raise TypeError("'account' must be Account type")
+
+        with self.__lock__:
+            post = self.__post__(media)
+            row = self.matrix[post]
+            index = self.__account__(account)
+            cell = row.get(index, 0)
+            if not cell & LIKE:
+                if not cell:
+                    self.__cells__[index] += 1
+                row[index] = cell | LIKE
+                self.stats[post].likes += 1
+                self.__count__(index)
+
+    def addComment(self, comment):
+        # Check data
+        if not isinstance(comment, Comment):
+            raise TypeError("'comment' must be Comment type")
+        if not isinstance(comment.media, Media):
+            raise NotUpdatedElement(comment, 'media')
+
+        with self.__lock__:
+            post = self.__post__(comment.media)
+            row = self.matrix[post]
+            index = self.__account__(comment.owner)
+            cell = row.get(index, 0)
+            if not cell:
+                self.__cells__[index] += 1
+            row[index] = cell + COMMENT
+            self.stats[post].comments += 1
+            self.__count__(index)
+
+    def consume(self, stream):
+        for item in stream:
+            if isinstance(item, Comment):
+                self.addComment(item)
+                # Harvested comments are not kept by media
+                if isinstance(item.media, Media):
+                    item.media.comments.discard(item)
+            else:
+                media, account = item
+                self.addLike(media, account)
+
+    def collectLikes(self, agent, media, count=1000, settings={}):
+        # Check data
+        if not isinstance(agent, AgentAccount):
+            raise TypeError("'agent' must be AgentAccount type")
+
+        for m in media:
+            likes_list, _ = agent.getLikes(m, count=count,
+                                           settings=dict(settings))
+            for account in likes_list:
+                self.addLike(m, account)
+            m.likes.difference_update(likes_list)
+
+    def collectComments(self, agent, media, count=None, workers=8,
+                        settings={}):
+        harvester = CommentHarvester(agent, workers=workers,
+                                     settings=settings)
+        self.consume(harvester.harvest(media, count))
+        return harvester.errors
+
+    def top(self, k=None):
+        # List of (account key, count, maximum overestimation)
+        with self.__lock__:
+            return [(self.account_keys[index], count, error)
+                    for count, error, index in self.__top__.top(
+                        k or self.top_k)]
+
+    def engagement(self, code):
+        with self.__lock__:
+            post = self.__posts__.get(code)
+            if post is None or post not in self.stats:
+                return None
+            stats = self.stats[post]
+            likes = max(stats.likes, stats.likes_count or 0)
+            comments = max(stats.comments, stats.comments_count or 0)
+            return {
+                'likes': likes,
+                'comments': comments,
+                'engagers': len(self.matrix[post]),
+                'rate': (likes + comments) / stats.followers_count
+                if stats.followers_count else None,
+            }
+
+    def engagers(self, code):
+        # Accounts of post with count of likes and comments
+        with self.__lock__:
+            post = self.__posts__.get(code)
+            if post is None or post not in self.matrix:
+                return {}
+            return {self.account_keys[index]: (cell & LIKE, cell // COMMENT)
+                    for index, cell in self.matrix[post].items()}
+
+    def posts(self, key):
+        # Codes of posts which was liked or commented by account
+        with self.__lock__:
+            index = self.__accounts__.get(key)
+            if index is None:
+                return []
+            return [self.post_codes[post] for post, row in self.matrix.items()
+                    if index in row]
+
+    def __account__(self, account):
+        # Comment owners have only login, so accounts are interned by login
+        key = account.login
+        index = self.__accounts__.get(key)
+        if index is None:
+            index = self.__next_account__
+            self.__next_account__ += 1
+            self.__accounts__[key] = index
+            self.account_keys[index] = key
+            self.__cells__[index] = 0
+        return index
+
+    def __count__(self, index):
+        replaced = self.__top__.add(index)
+        if replaced is not None and not self.__cells__[replaced]:
+            self.__release__(replaced)
+
+    def __release__(self, index):
+        # Account without cells and counter of top is forgotten
+        del self.__cells__[index]
+        del self.__accounts__[self.account_keys.pop(index)]
+
+    def __post__(self, media):
+        index = self.__posts__.get(media.code)
+        if index is None:
+            index = self.__next_post__
+            self.__next_post__ += 1
+            self.__posts__[media.code] = index
+            self.post_codes[index] = media.code
+        if index in self.matrix:
+            self.matrix.move_to_end(index)
+            self.stats.move_to_end(index)
+        else:
+            self.matrix[index] = {}
+            self.stats[index] = PostStats()
+            while len(self.matrix) > self.max_posts:
+                self.__evict__()
+        stats = self.stats[index]
+        data = vars(media)
+        if isinstance(data['likes_count'], int):
+            stats.likes_count = data['likes_count']
+        if isinstance(data['comments_count'], int):
+            stats.comments_count = data['comments_count']
+        owner = data['owner']
+        if isinstance(owner, Account) and vars(owner)['followers_count']:
+            stats.followers_count = vars(owner)['followers_count']
+        return index
+
+    def __evict__(self):
+        # Least recently used post is removed with its interned ids
+        post, row = self.matrix.popitem(last=False)
+        self.stats.popitem(last=False)
+        del self.__posts__[self.post_codes.pop(post)]
+        counters = self.__top__.counters
+        for index in row:
+            self.__cells__[index] -= 1
+            if not self.__cells__[index] and index not in counters:
+                self.__release__(index)
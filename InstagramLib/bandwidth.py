@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+import threading
+from collections import deque
+
+from .breaker import endpointClass
+
+
+class BandwidthMeter:
+    def __init__(self, window=1000):
+        # Check data
+        if not isinstance(window, int) or window < 1:
+            raise TypeError("'window' must be positive int")
+
+        # method -> statistics of calls
+        self.stats = {}
+        # Last requests: (method, endpoint, status, encoding, wire, decoded)
+        self.requests = deque(maxlen=window)
+        self.__local__ = threading.local()
+        self.__lock__ = threading.Lock()
+
+    def enter(self, name):
+        self.__stack__().append(name)
+
+    def exit(self, result=None):
+        stack = self.__stack__()
+        name = stack.pop()
+        if stack:
+            return
+        # Calls and items are counted only for outer methods
+        stats = self.__stats__(name)
+        with self.__lock__:
+            stats['calls'] += 1
+            stats['items'] += self.__count__(result)
+
+    def add(self, method, url, params, response, wire, decoded):
+        stack = self.__stack__()
+        # Bytes of nested calls are bytes of outer method
+        stats = self.__stats__(stack[0] if stack else None)
+        encoding = response.headers.get('Content-Encoding') or 'identity'
+        with self.__lock__:
+            stats['requests'] += 1
+            stats['wire'] += wire
+            stats['decoded'] += decoded
+            stats['encodings'][encoding] = \
+                stats['encodings'].get(encoding, 0) + 1
+            self.requests.append((method, endpointClass(method, url, params),
+                                  response.status_code, encoding, wire,
+                                  decoded))
+
+    def report(self):
+        report = {}
+        with self.__lock__:
+            for name, stats in self.stats.items():
+                stats = dict(stats, encodings=dict(stats['encodings']))
+                items = stats['items']
+                stats['wire_per_item'] = stats['wire'] / items if items \
+                    else None
+                stats['decoded_per_item'] = stats['decoded'] / items \
+                    if items else None
+                stats['ratio'] = stats['decoded'] / stats['wire'] \
+                    if stats['wire'] else None
+                report[name] = stats
+        return report
+
+    def reset(self):
+        with self.__lock__:
+            self.stats.clear()
+            self.requests.clear()
+
+    def __stats__(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            with self.__lock__:
+                stats = self.stats.setdefault(name, dict(
+                    calls=0, requests=0, items=0, wire=0, decoded=0,
+                    encodings={}))
+        return stats
+
+    def __stack__(self):
+        stack = getattr(self.__local__, 'stack', None)
+        if stack is None:
+            stack = self.__local__.stack = []
+        return stack
+
+    def __count__(self, result):
+        # Paging methods return (items, cursor), other methods return
+        # list of items or one element
+        if isinstance(result, tuple) and len(result) == 2 and \
+                isinstance(result[0], list):
+            return len(result[0])
+        if isinstance(result, list):
+            return len(result)
+        return 0 if result is None else 1
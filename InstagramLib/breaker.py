@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+import threading
+from time import time
+from urllib.parse import urlsplit
+
+from .exceptions import CircuitOpen
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def endpointClass(method, url, params=None):
+    path = urlsplit(url).path.rstrip('/')
+    if method != 'GET':
+        return 'action'
+    if path == '/graphql/query':
+        params = params or {}
+        return 'graphql:{0}'.format(params.get('query_hash') or
+                                    params.get('query_id'))
+    return 'page'
+
+
+class Circuit:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self.opens = 0
+        self.opened_until = None
+        self.probes = 0
+        self.probe_successes = 0
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=5, cooldown=30, max_cooldown=600, probes=1):
+        # Check data
+        if not isinstance(threshold, int) or threshold < 1:
+            raise TypeError("'threshold' must be positive int")
+        if not isinstance(cooldown, (int, float)) or cooldown < 0:
+            raise TypeError("'cooldown' must be not negative number")
+        if not isinstance(probes, int) or probes < 1:
+            raise TypeError("'probes' must be positive int")
+
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probes = probes
+        self.circuits = {}
+        self.__lock__ = threading.Lock()
+
+    def acquire(self, method, url, params=None):
+        endpoint = endpointClass(method, url, params)
+        with self.__lock__:
+            circuit = self.circuits.get(endpoint)
+            if circuit is None:
+                circuit = self.circuits[endpoint] = Circuit(endpoint)
+            if circuit.state == OPEN:
+                now = time()
+                if circuit.opened_until > now:
+                    circuit.rejected += 1
+                    raise CircuitOpen(endpoint, circuit.opened_until - now)
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+                circuit.probe_successes = 0
+            if circuit.state == HALF_OPEN:
+                # Only few requests check that endpoint is available again
+                if circuit.probes >= self.probes:
+                    circuit.rejected += 1
+                    raise CircuitOpen(endpoint, 0)
+                circuit.probes += 1
+            circuit.requests += 1
+            return circuit
+
+    def release(self, circuit, status_code=None, error=None):
+        failed = error is not None or status_code in (403, 429) or \
+            (status_code is not None and status_code >= 500)
+        with self.__lock__:
+            if failed:
+                circuit.failures += 1
+                circuit.consecutive_failures += 1
+                if circuit.state == HALF_OPEN or \
+                        circuit.consecutive_failures >= self.threshold:
+                    self.__open__(circuit)
+            else:
+                circuit.consecutive_failures = 0
+                if circuit.state == HALF_OPEN:
+                    circuit.probe_successes += 1
+                    if circuit.probe_successes >= self.probes:
+                        circuit.state = CLOSED
+                        circuit.opens = 0
+                        circuit.opened_until = None
+
+    def check(self, circuit):
+        with self.__lock__:
+            if circuit.state == OPEN:
+                raise CircuitOpen(circuit.endpoint,
+                                  max(circuit.opened_until - time(), 0))
+
+    def reset(self, endpoint=None):
+        with self.__lock__:
+            if endpoint is None:
+                self.circuits.clear()
+            else:
+                self.circuits.pop(endpoint, None)
+
+    def stats(self):
+        with self.__lock__:
+            now = time()
+            return {endpoint: {
+                'state': circuit.state,
+                'requests': circuit.requests,
+                'failures': circuit.failures,
+                'rejected': circuit.rejected,
+                'retry_after': max(circuit.opened_until - now, 0)
+                if circuit.state == OPEN else 0,
+            } for endpoint, circuit in self.circuits.items()}
+
+    def __open__(self, circuit):
+        # Every next opening without recovery is longer
+        circuit.opens += 1
+        circuit.state = OPEN
+        circuit.opened_until = time() + min(
+            self.cooldown * 2 ** (circuit.opens - 1), self.max_cooldown)
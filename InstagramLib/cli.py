@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .harvesting import KINDS, pages
+from .instagram import Agent, AgentAccount, Comment, Element
+from .retention import Collection, elementKey
+from .transport import RateLimitedTransport
+
+
+def record(obj, target):
+    data = {'target': target}
+    for key, value in vars(obj).items():
+        if key.startswith('__') or isinstance(value, (set, Collection)):
+            continue
+        if isinstance(value, (Element, Comment)):
+            value = elementKey(value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        data[key] = value
+    return data
+
+
+class Writer:
+    def __init__(self, file, format):
+        self.file = file
+        self.format = format
+        self.__csv__ = None
+        self.__lock__ = threading.Lock()
+
+    def write(self, records):
+        with self.__lock__:
+            for data in records:
+                if self.format == 'csv':
+                    if self.__csv__ is None:
+                        self.__csv__ = csv.DictWriter(
+                            self.file, list(data), extrasaction='ignore')
+                        # Header is not repeated in resumed file
+                        if not self.file.seekable() or not self.file.tell():
+                            self.__csv__.writeheader()
+                    self.__csv__.writerow(data)
+                else:
+                    self.file.write(json.dumps(data, ensure_ascii=False))
+                    self.file.write("\n")
+            self.file.flush()
+
+
+class State:
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.__lock__ = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self.data = json.load(file)
+
+    def get(self, target):
+        return self.data.get(target, {'cursor': None, 'count': 0,
+                                      'done': False})
+
+    def set(self, target, cursor, count, done):
+        with self.__lock__:
+            self.data[target] = {'cursor': cursor, 'count': count,
+                                 'done': done}
+            if self.path:
+                # Saving by replace for not break state on crash
+                with open(self.path + '.tmp', 'w') as file:
+                    json.dump(self.data, file)
+                os.replace(self.path + '.tmp', self.path)
+
+
+def readTargets(args):
+    targets = list(args.targets)
+    if args.input or not targets:
+        file = sys.stdin if args.input in (None, '-') else open(args.input)
+        try:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    targets.append(line)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+    return targets
+
+
+def export(agent, args, writer, state, target):
+    progress = state.get(target)
+    if progress['done']:
+        return
+    cursor = progress['cursor']
+    count = progress['count']
+    for _, items, cursor, count in pages(agent, args.kind, target, cursor,
+                                         count, args.count, args.page_size):
+        writer.write(record(item, target) for item in items)
+        state.set(target, cursor, count, cursor is None)
+    state.set(target, cursor, count, True)
+
+
+def createParser():
+    parser = argparse.ArgumentParser(
+        prog='instagramlib',
+        description="Tools for InstagramLib library",
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    parser_export = subparsers.add_parser(
+        'export', help="Bulk export of elements to NDJSON or CSV")
+    parser_export.add_argument('kind', choices=sorted(KINDS))
+    parser_export.add_argument(
+        'targets', nargs='*',
+        help="logins, tag names, location ids or media codes")
+    parser_export.add_argument(
+        '-i', '--input', help="file with targets, one per line ('-' - stdin)")
+    parser_export.add_argument(
+        '-o', '--output', help="output file, stdout by default")
+    parser_export.add_argument('-f', '--format', default='ndjson',
+                               choices=('ndjson', 'csv'))
+    parser_export.add_argument('-w', '--workers', type=int, default=4)
+    parser_export.add_argument('-c', '--count', type=int,
+                               help="max count of elements for every target")
+    parser_export.add_argument('--page-size', type=int, default=50)
+    parser_export.add_argument('--rate', type=float, default=1.0,
+                               help="max requests per second")
+    parser_export.add_argument(
+        '--state', help="file with cursors for resume export")
+    parser_export.add_argument('--repeats', type=int, default=3)
+    parser_export.add_argument(
+        '--login', default=os.environ.get('INSTAGRAM_LOGIN'))
+    parser_export.add_argument(
+        '--password', default=os.environ.get('INSTAGRAM_PASSWORD'))
+    return parser
+
+
+def main(argv=None):
+    args = createParser().parse_args(argv)
+
+    if KINDS[args.kind][2]:
+        if not args.login or not args.password:
+            sys.exit("Export of {0} requires --login and --password".format(
+                args.kind))
+        agent = AgentAccount(args.login, args.password)
+    else:
+        agent = Agent()
+    agent.repeats = args.repeats
+    agent.setTransport(RateLimitedTransport(agent.transport, args.rate))
+
+    targets = readTargets(args)
+    state = State(args.state)
+    file = sys.stdout if not args.output else \
+        open(args.output, 'a' if args.state else 'w', newline='')
+    writer = Writer(file, args.format)
+    failed = 0
+    try:
+        with ThreadPoolExecutor(args.workers) as executor:
+            futures = {executor.submit(export, agent, args, writer, state,
+                                       target): target for target in targets}
+            for future, target in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    sys.stderr.write("Export of '{0}' failed: {1}\n".format(
+                        target, e))
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
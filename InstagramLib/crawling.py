@@ -0,0 +1,343 @@
+#!/usr/bin/python3
+import multiprocessing
+import os
+import queue
+import socket
+import sqlite3
+from time import sleep, time
+
+from .harvesting import KINDS, pages
+from .instagram import Agent, AgentAccount
+from .serialization import dumps, loads
+from .storage import Storage
+from .transport import RateLimitedTransport
+
+# Kind of crawl -> relation of elements to target in storage
+RELATIONS = {
+    'followers': 'follower',
+    'follows': 'follow',
+    'media': 'media',
+    'tag': 'media',
+    'location': 'media',
+    'comments': None,
+    'likes': 'like',
+}
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY, kind TEXT, target TEXT, state TEXT,
+    cursor TEXT, count INTEGER, items INTEGER, worker TEXT,
+    leased_until REAL, attempts INTEGER, error TEXT, updated_at REAL,
+    UNIQUE (kind, target)
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, leased_until);
+"""
+
+
+class Task:
+    def __init__(self, id, kind, target, cursor, count, items, attempts):
+        self.id = id
+        self.kind = kind
+        self.target = target
+        self.cursor = cursor
+        # Max count of items and count of items, which are loaded already
+        self.count = count
+        self.items = items
+        self.attempts = attempts
+
+    def __repr__(self):
+        return "Task({0}, {1!r}, {2!r})".format(self.id, self.kind,
+                                               self.target)
+
+
+class WorkQueue:
+    def __init__(self, path, lease=300, max_attempts=5):
+        # Check data
+        if not isinstance(path, str):
+            raise TypeError("'path' must be str type")
+        if not isinstance(lease, (int, float)) or lease <= 0:
+            raise TypeError("'lease' must be positive number")
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise TypeError("'max_attempts' must be positive int")
+
+        self.path = path
+        # Task of worker, which has not renewed lease, is given to other
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Every process opens own connection
+        self.__connection__ = None
+        self.__pid__ = None
+        self.connection.executescript(SCHEMA)
+
+    def __getstate__(self):
+        return {'path': self.path, 'lease': self.lease,
+                'max_attempts': self.max_attempts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__connection__ = None
+        self.__pid__ = None
+
+    @property
+    def connection(self):
+        if self.__connection__ is None or self.__pid__ != os.getpid():
+            self.__connection__ = sqlite3.connect(self.path, timeout=60,
+                                                  isolation_level=None)
+            self.__connection__.execute("PRAGMA journal_mode=WAL")
+            self.__pid__ = os.getpid()
+        return self.__connection__
+
+    def add(self, kind, target, count=None):
+        # Check data
+        if kind not in KINDS:
+            raise ValueError("Unknown kind '{0}'".format(kind))
+
+        # Task, which is in queue already, is not added again
+        self.connection.execute(
+            "INSERT OR IGNORE INTO tasks (kind, target, state, count, items, "
+            "attempts, updated_at) VALUES (?, ?, ?, ?, 0, 0, ?)",
+            (kind, str(target), PENDING, count, time()))
+
+    def extend(self, kind, targets, count=None):
+        now = time()
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, target, state, count, items, "
+            "attempts, updated_at) VALUES (?, ?, ?, ?, 0, 0, ?)",
+            ((kind, str(target), PENDING, count, now) for target in targets))
+
+    def acquire(self, worker, count=1):
+        now = time()
+        connection = self.connection
+        # Immediate transaction locks queue for other workers
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, kind, target, cursor, count, items, attempts "
+                "FROM tasks "
+                "WHERE state = ? OR (state = ? AND leased_until < ?) "
+                "ORDER BY attempts, id LIMIT ?",
+                (PENDING, LEASED, now, count)).fetchall()
+            connection.executemany(
+                "UPDATE tasks SET state = ?, worker = ?, leased_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                ((LEASED, worker, now + self.lease, now, row[0])
+                 for row in rows))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [Task(*row[:6], row[6] + 1) for row in rows]
+
+    def progress(self, task, worker, cursor, items):
+        # Cursor is saved with renew of lease, so reassigned task is
+        # continued from the last page
+        return self.__update__(
+            "UPDATE tasks SET cursor = ?, items = ?, leased_until = ?, "
+            "updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+            (cursor, items, time() + self.lease, time(), task.id, worker,
+             LEASED))
+
+    def complete(self, task, worker):
+        return self.__update__(
+            "UPDATE tasks SET state = ?, leased_until = NULL, error = NULL, "
+            "updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+            (DONE, time(), task.id, worker, LEASED))
+
+    def fail(self, task, worker, error):
+        state = FAILED if task.attempts >= self.max_attempts else PENDING
+        return self.__update__(
+            "UPDATE tasks SET state = ?, leased_until = NULL, error = ?, "
+            "updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+            (state, str(error), time(), task.id, worker, LEASED))
+
+    def release(self, worker):
+        # Tasks of dead worker are returned to queue at once
+        return self.__update__(
+            "UPDATE tasks SET state = ?, leased_until = NULL, updated_at = ? "
+            "WHERE worker = ? AND state = ?",
+            (PENDING, time(), worker, LEASED))
+
+    def retry(self):
+        return self.__update__(
+            "UPDATE tasks SET state = ?, attempts = 0, updated_at = ? "
+            "WHERE state = ?", (PENDING, time(), FAILED))
+
+    def unfinished(self):
+        return self.connection.execute(
+            "SELECT count(*) FROM tasks WHERE state IN (?, ?)",
+            (PENDING, LEASED)).fetchone()[0]
+
+    def stats(self):
+        stats = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        stats.update(self.connection.execute(
+            "SELECT state, count(*) FROM tasks GROUP BY state").fetchall())
+        return stats
+
+    def close(self):
+        if self.__connection__ is not None:
+            self.__connection__.close()
+            self.__connection__ = None
+
+    def __update__(self, query, arguments):
+        return self.connection.execute(query, arguments).rowcount > 0
+
+
+def work(work_queue, worker, results=None, login=None, password=None,
+         page_size=50, rate=1.0, repeats=3, idle=1.0):
+    agents = {}
+
+    def getAgent(needs_login):
+        agent = agents.get(needs_login)
+        if agent is None:
+            agent = AgentAccount(login, password) if needs_login else Agent()
+            agent.repeats = repeats
+            agent.setTransport(RateLimitedTransport(agent.transport, rate))
+            agents[needs_login] = agent
+        return agent
+
+    while True:
+        tasks = work_queue.acquire(worker)
+        if not tasks:
+            # Leased tasks of other workers can come back to queue
+            if not work_queue.unfinished():
+                return
+            sleep(idle)
+            continue
+        task = tasks[0]
+        try:
+            crawl(work_queue, worker, task, getAgent, results, page_size)
+        except Exception as e:
+            work_queue.fail(task, worker, e)
+
+
+def crawl(work_queue, worker, task, getAgent, results, page_size):
+    agent = getAgent(KINDS[task.kind][2])
+    for obj, items, cursor, count in pages(agent, task.kind, task.target,
+                                           task.cursor, task.items,
+                                           task.count, page_size):
+        if results is not None and items:
+            # Target is the first record, so relations are restored with ids
+            results.put((task.kind, task.target, dumps([obj] + items)))
+        # Lease is lost, if task is given to other worker
+        if not work_queue.progress(task, worker, cursor, count):
+            return
+    work_queue.complete(task, worker)
+
+
+class Coordinator:
+    def __init__(self, work_queue, workers=4, sink=None, login=None,
+                 password=None, page_size=50, rate=1.0, repeats=3,
+                 max_restarts=10):
+        # Check data
+        if not isinstance(work_queue, WorkQueue):
+            raise TypeError("'work_queue' must be WorkQueue type")
+        if not isinstance(workers, int) or workers < 1:
+            raise TypeError("'workers' must be positive int")
+        if sink is not None and not (isinstance(sink, Storage) or
+                                     callable(sink)):
+            raise TypeError("'sink' must be Storage or function")
+
+        self.work_queue = work_queue
+        self.workers = workers
+        # Results of all workers are merged to one storage or function with
+        # arguments (kind, target, parent, items)
+        self.sink = sink
+        self.login = login
+        self.password = password
+        self.page_size = page_size
+        # Rate of every worker
+        self.rate = rate
+        self.repeats = repeats
+        # Workers, which fail at start, are not restarted forever
+        self.max_restarts = max_restarts
+        self.items = 0
+        self.restarts = 0
+        self.processes = {}
+        self.__context__ = multiprocessing.get_context('spawn')
+        self.__results__ = self.__context__.Queue(maxsize=1000)
+        self.__number__ = 0
+
+    def run(self, timeout=None):
+        end = None if timeout is None else time() + timeout
+        for _ in range(self.workers):
+            self.__start__()
+        try:
+            while self.processes:
+                self.__merge__(0.5)
+                for name, process in list(self.processes.items()):
+                    if process.is_alive():
+                        continue
+                    del self.processes[name]
+                    if process.exitcode != 0:
+                        # Tasks of dead worker are reassigned, and worker is
+                        # replaced while there is work
+                        self.work_queue.release(name)
+                        if self.work_queue.unfinished() and \
+                                self.restarts < self.max_restarts:
+                            self.restarts += 1
+                            self.__start__()
+                if end is not None and time() > end:
+                    break
+            # Results of finished workers, which are still in queue
+            while self.__merge__(0.1):
+                pass
+        finally:
+            self.stop()
+            if isinstance(self.sink, Storage):
+                self.sink.flush()
+        return self.work_queue.stats()
+
+    def scale(self, workers):
+        # Check data
+        if not isinstance(workers, int) or workers < 1:
+            raise TypeError("'workers' must be positive int")
+
+        self.workers = workers
+        while len(self.processes) < workers:
+            self.__start__()
+
+    def stop(self):
+        for name, process in list(self.processes.items()):
+            process.terminate()
+            process.join()
+            self.work_queue.release(name)
+        self.processes.clear()
+
+    def __start__(self):
+        self.__number__ += 1
+        name = "{0}:{1}:{2}".format(socket.gethostname(), os.getpid(),
+                                    self.__number__)
+        process = self.__context__.Process(
+            target=work, name=name, daemon=True,
+            args=(self.work_queue, name, self.__results__, self.login,
+                  self.password, self.page_size, self.rate, self.repeats))
+        process.start()
+        self.processes[name] = process
+
+    def __merge__(self, timeout):
+        # All ready results are merged, waiting is only for the first
+        merged = False
+        while True:
+            try:
+                message = self.__results__.get(timeout=timeout)
+            except queue.Empty:
+                return merged
+            self.__enqueue__(*message)
+            merged = True
+            timeout = 0.01
+
+    def __enqueue__(self, kind, target, data):
+        objects = loads(data)
+        parent, items = objects[0], objects[1:]
+        self.items += len(items)
+        if isinstance(self.sink, Storage):
+            self.sink.add(parent)
+            for item in items:
+                self.sink.add(item, RELATIONS[kind], parent)
+        elif self.sink is not None:
+            self.sink(kind, target, parent, items)
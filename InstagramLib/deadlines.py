@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+import threading
+from time import perf_counter, sleep
+
+from .exceptions import Cancelled, DeadlineExceeded
+
+
+class CancellationToken:
+    def __init__(self):
+        self.__event__ = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.__event__.is_set()
+
+    def cancel(self):
+        self.__event__.set()
+
+    def wait(self, timeout=None):
+        return self.__event__.wait(timeout)
+
+
+# Budget of time for call with all nested requests, retries and sleeps
+class Deadline:
+    # Stack of entered deadlines of every thread
+    __local__ = threading.local()
+
+    def __init__(self, timeout=None, token=None):
+        # Check data
+        if timeout is not None and (not isinstance(timeout, (int, float)) or
+                                    timeout < 0):
+            raise TypeError("'timeout' must be not negative number")
+        if token is not None and not isinstance(token, CancellationToken):
+            raise TypeError("'token' must be CancellationToken type")
+
+        self.timeout = timeout
+        self.token = token
+        self.expires_at = None if timeout is None else perf_counter() + \
+            timeout
+        self.tokens = () if token is None else (token,)
+
+    def __enter__(self):
+        stack = Deadline.__stack__()
+        # Nested deadline can't be later than outer deadline
+        if stack:
+            outer = stack[-1]
+            if self.expires_at is None or (outer.expires_at is not None and
+                                           outer.expires_at < self.expires_at):
+                self.timeout = outer.timeout
+                self.expires_at = outer.expires_at
+            self.tokens += tuple(token for token in outer.tokens
+                                 if token not in self.tokens)
+        stack.append(self)
+        return self
+
+    def __exit__(self, *args):
+        Deadline.__stack__().remove(self)
+
+    @staticmethod
+    def current():
+        stack = Deadline.__stack__()
+        return stack[-1] if stack else None
+
+    @property
+    def cancelled(self):
+        return any(token.cancelled for token in self.tokens)
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - perf_counter(), 0)
+
+    def expired(self):
+        return self.cancelled or self.remaining() == 0
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+        if self.remaining() == 0:
+            raise DeadlineExceeded(self.timeout)
+
+    def limit(self, timeout):
+        # Timeout of request is shortened to rest of deadline
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if isinstance(timeout, tuple):
+            return tuple(remaining if value is None else min(value, remaining)
+                         for value in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def sleep(self, seconds):
+        seconds = self.limit(seconds)
+        if len(self.tokens) == 1:
+            self.tokens[0].wait(seconds)
+        elif self.tokens:
+            # Any of tokens must wake up sleep
+            end = perf_counter() + seconds
+            while not self.cancelled and perf_counter() < end:
+                sleep(min(0.05, max(end - perf_counter(), 0)))
+        else:
+            sleep(seconds)
+        self.check()
+
+    @staticmethod
+    def __stack__():
+        stack = getattr(Deadline.__local__, 'stack', None)
+        if stack is None:
+            stack = Deadline.__local__.stack = []
+        return stack
+
+
+def backoff(seconds):
+    deadline = Deadline.current()
+    if deadline is None:
+        sleep(seconds)
+    else:
+        deadline.sleep(seconds)
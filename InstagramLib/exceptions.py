@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+
+class InstagramException(Exception):
+    pass
+
+
+class InternetException(InstagramException):
+    def __init__(self, e):
+        self.error = e
+
+    def __getattr__(self, name):
+        return self.error.__getattribute__(name)
+
+    def __str__(self):
+        # Errors without response are errors of connection
+        response = getattr(self.error, 'response', None)
+        if response is None:
+            return "Error by connection with Instagram: {0}".format(
+                self.error)
+        return "Error by connection with Instagram to '{0}' with response code '{1}'".format(
+            response.url, response.status_code)
+
+
+class AuthException(Exception):
+    def __init__(self, login):
+        super().__init__("Cannot auth user with username '{0}'".format(login))
+
+
+class UnexpectedResponse(InstagramException):
+    def __init__(self, url, data=None):
+        self.url = url
+        self.data = data
+
+        message = "Get unexpected response from '{}'".format(url)
+
+        if data:
+            message = "{0} with data: {1}".format(message, str(data))
+
+        super().__init__(message)
+
+
+class NotUpdatedElement(InstagramException):
+    def __init__(self, element, argument):
+        super().__init__(
+            "Element '{0}' haven't argument {1}. Please, update this element".format(
+                element.__repr__(), argument))
+
+
+class ProxyPoolExhausted(InstagramException):
+    def __init__(self, timeout):
+        super().__init__(
+            "No healthy proxy with free budget in {0} seconds".format(timeout))
+
+
+class DeadlineExceeded(InstagramException):
+    def __init__(self, timeout):
+        self.timeout = timeout
+        super().__init__("Deadline of {0} seconds is exceeded".format(timeout))
+
+
+class Cancelled(InstagramException):
+    def __init__(self):
+        super().__init__("Operation is cancelled")
+
+
+class CircuitOpen(InstagramException):
+    def __init__(self, endpoint, retry_after):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            "Circuit of '{0}' is open, retry after {1:.1f} seconds".format(
+                endpoint, retry_after))
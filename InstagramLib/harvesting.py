@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+import threading
+from queue import Empty, Full, Queue
+
+from .instagram import (Account, Agent, Location, Media, Tag,
+                        UnexpectedResponse)
+
+# Kind of collection -> (element class of target, method name, needs login)
+KINDS = {
+    'followers': (Account, 'getFollowers', True),
+    'follows': (Account, 'getFollows', True),
+    'media': (Account, 'getMedia', False),
+    'tag': (Tag, 'getMedia', False),
+    'location': (Location, 'getMedia', False),
+    'comments': (Media, 'getComments', False),
+    'likes': (Media, 'getLikes', True),
+}
+
+
+class CommentHarvester:
+    def __init__(self, agent, workers=8, queue_size=1000, page_size=50,
+                 settings={}):
+        # Check data
+        if not isinstance(agent, Agent):
+            raise TypeError("'agent' must be Agent type")
+        if not isinstance(workers, int) or workers < 1:
+            raise TypeError("'workers' must be positive int")
+        if not isinstance(queue_size, int) or queue_size < 1:
+            raise TypeError("'queue_size' must be positive int")
+        if not isinstance(page_size, int) or page_size < 1:
+            raise TypeError("'page_size' must be positive int")
+        if not isinstance(settings, dict):
+            raise TypeError("'settings' must be dict type")
+
+        self.agent = agent
+        self.workers = workers
+        self.queue_size = queue_size
+        self.page_size = page_size
+        self.settings = settings
+        # Pairs of media and exception for failed media
+        self.errors = []
+
+    def harvest(self, media, count=None):
+        # Check data
+        if count is not None and not isinstance(count, int):
+            raise TypeError("'count' must be int type")
+
+        queue = Queue(self.queue_size)
+        stop = threading.Event()
+        done = object()
+        iterator = iter(media)
+        lock = threading.Lock()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def work():
+            try:
+                while not stop.is_set():
+                    with lock:
+                        try:
+                            m = next(iterator)
+                        except StopIteration:
+                            return
+                    if not isinstance(m, Media):
+                        self.errors.append(
+                            (m, TypeError("'media' must be Media type")))
+                        continue
+                    try:
+                        for comments_list in self.__pages__(m, count):
+                            for comment in comments_list:
+                                if not put(comment):
+                                    return
+                    except Exception as e:
+                        self.errors.append((m, e))
+            finally:
+                put(done)
+
+        threads = [threading.Thread(target=work, daemon=True)
+                   for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < len(threads):
+                try:
+                    item = queue.get(timeout=0.1)
+                except Empty:
+                    continue
+                if item is done:
+                    finished += 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+    def __pages__(self, media, count):
+        # First comments are taken from page of media
+        data = self.agent.__update__(media, dict(self.settings))
+        try:
+            data = data['edge_media_to_comment']
+            comments_list = self.agent.__parse_comments__(media, data)
+            has_next_page = data['page_info']['has_next_page']
+            after = data['page_info']['end_cursor']
+        except (KeyError, TypeError):
+            raise UnexpectedResponse(
+                "https://www.instagram.com/p/{0}".format(media.code), data)
+        yield comments_list
+        if count is not None:
+            count -= len(comments_list)
+
+        # Next pages only for media with more comments
+        while has_next_page and after and (count is None or count > 0):
+            first = self.page_size if count is None else \
+                min(self.page_size, count)
+            comments_list, after = self.agent.getComments(
+                media, after=after, count=first, settings=dict(self.settings),
+                limit=first)
+            has_next_page = after is not None
+            yield comments_list
+            if count is not None:
+                count -= len(comments_list)
+            if not comments_list:
+                break
+
+
+def pages(agent, kind, target, cursor=None, count=0, limit=None,
+          page_size=50):
+    # Pages of items of target as (target, items, cursor, count of items),
+    # paging is continued from cursor and count of loaded items
+    cls, method, _ = KINDS[kind]
+    obj = cls(target)
+    method = getattr(agent, method)
+    while limit is None or count < limit:
+        first = page_size if limit is None else min(page_size, limit - count)
+        items, cursor = method(obj, after=cursor, count=first, settings={},
+                               limit=first)
+        count += len(items)
+        yield obj, items, cursor, count
+        # Items are given away already, so they are not kept in memory
+        for name in ('media', 'followers', 'follows', 'comments', 'likes'):
+            collection = getattr(obj, name, None)
+            if collection is not None:
+                collection.clear()
+        if cursor is None or not items:
+            break
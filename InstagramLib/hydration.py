@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+import threading
+import weakref
+from collections import OrderedDict
+from time import time
+
+from .exceptions import NotUpdatedElement
+from .instagram import Agent
+
+
+class Hydrator:
+    def __init__(self, agent, ttl=300, batch_size=20, workers=8, settings={}):
+        # Check data
+        if not isinstance(agent, Agent):
+            raise TypeError("'agent' must be Agent type")
+        if not isinstance(ttl, (int, float)):
+            raise TypeError("'ttl' must be int or float type")
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise TypeError("'batch_size' must be positive int")
+        if not isinstance(workers, int) or workers < 1:
+            raise TypeError("'workers' must be positive int")
+        if not isinstance(settings, dict):
+            raise TypeError("'settings' must be dict type")
+
+        self.agent = agent
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.workers = workers
+        self.settings = settings
+        self.closed = False
+        self.__lock__ = threading.Lock()
+        self.__local__ = threading.local()
+        # Weak references to bound elements waiting for hydration
+        self.__pending__ = OrderedDict()
+        self.__running__ = {}
+        self.__executor__ = None
+
+    def register(self, obj):
+        with self.__lock__:
+            LazyElement.bind(obj)
+            obj.__dict__['__hydrator__'] = self
+            if not self.__fresh__(obj):
+                self.__pending__[id(obj)] = weakref.ref(obj)
+
+    def hydrate(self, obj):
+        # Elements read inside of hydration are not hydrated again
+        if self.closed or getattr(self.__local__, 'active', False):
+            return
+        with self.__lock__:
+            if self.__fresh__(obj):
+                return
+            future = self.__running__.get(id(obj))
+            if future is None:
+                # Collect batch from pending elements
+                self.__pending__.pop(id(obj), None)
+                batch = [obj]
+                while self.__pending__ and len(batch) < self.batch_size:
+                    other = self.__pending__.popitem(last=False)[1]()
+                    if other is None or id(other) in self.__running__ or \
+                            self.__fresh__(other):
+                        continue
+                    batch.append(other)
+                if self.__executor__ is None:
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    self.__executor__ = ThreadPoolExecutor(self.workers)
+                for item in batch:
+                    self.__running__[id(item)] = self.__executor__.submit(
+                        self.__run__, item)
+                future = self.__running__[id(obj)]
+        future.result()
+
+    def close(self):
+        self.closed = True
+        with self.__lock__:
+            self.__pending__.clear()
+            executor, self.__executor__ = self.__executor__, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def __fresh__(self, obj):
+        hydrated_at = obj.__dict__.get('__hydrated_at__')
+        return hydrated_at is not None and time() - hydrated_at < self.ttl
+
+    def __run__(self, obj):
+        self.__local__.active = True
+        try:
+            self.agent.__update__(obj, dict(self.settings))
+        finally:
+            self.__local__.active = False
+            with self.__lock__:
+                self.__running__.pop(id(obj), None)
+
+
+
+
+# Mixin of elements, which are bound to hydrator, other elements keep plain
+# access to attributes
+class LazyElement:
+    __classes__ = {}
+
+    def __getattribute__(self, name):
+        value = object.__getattribute__(self, name)
+        if value is None and \
+                name in object.__getattribute__(self, '__lazy_fields__'):
+            data = object.__getattribute__(self, '__dict__')
+            hydrator = data.get('__hydrator__')
+            # Field, which is present in node as null, is not loaded again
+            if hydrator is not None and \
+                    name not in data.get('__fields__', ()):
+                try:
+                    hydrator.hydrate(self)
+                except Exception as e:
+                    raise NotUpdatedElement(self, name) from e
+                value = object.__getattribute__(self, name)
+        return value
+
+    def __reduce_ex__(self, protocol):
+        # Element is pickled as not bound element
+        data = dict(object.__getattribute__(self, '__dict__'))
+        data.pop('__hydrator__', None)
+        cls = object.__getattribute__(self, '__class__').__bases__[1]
+        return (restoreElement, (cls,), data)
+
+    @staticmethod
+    def bind(obj):
+        cls = obj.__class__
+        if issubclass(cls, LazyElement):
+            return
+        lazy = LazyElement.__classes__.get(cls)
+        if lazy is None:
+            lazy = LazyElement.__classes__.setdefault(cls, type(
+                cls.__name__, (LazyElement, cls),
+                {'__module__': cls.__module__,
+                 '__qualname__': cls.__qualname__}))
+        obj.__class__ = lazy
+
+
+def restoreElement(cls):
+    return cls.__new__(cls)
@@ -0,0 +1,409 @@
+#!/usr/bin/python3
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+from .instagram import Comment, Media
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+MENTION_PATTERN = re.compile(r'@([\w.]+\w)')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Kinds of documents
+MEDIA, COMMENT = 0, 1
+KIND_NAMES = ('media', 'comment')
+
+MAGIC = b'ILIX'
+HEADER = struct.Struct('<4sI')
+ENTRY = struct.Struct('<HQI')
+# time, offset of key, length of key, kind
+DOC = struct.Struct('<qQIB3x')
+# Documents are indexed by days too, so short time ranges are searched by
+# small lists of days
+BUCKET = '\x00'
+BUCKET_SIZE = 86400
+MAX_BUCKETS = 62
+
+
+def tokenize(text):
+    # Hashtags and mentions are separate terms with prefix
+    if not text:
+        return set()
+    text = text.lower()
+    terms = set(TOKEN_PATTERN.findall(text))
+    terms.update('#' + tag for tag in HASHTAG_PATTERN.findall(text))
+    terms.update('@' + login for login in MENTION_PATTERN.findall(text))
+    return terms
+
+
+def parseQuery(query):
+    # Words are joined by AND, 'a|b' is OR, '-a' is NOT
+    required = []
+    excluded = []
+    for word in query.lower().split():
+        if word.startswith('-') and len(word) > 1:
+            excluded.append(word[1:])
+        else:
+            required.append([term for term in word.split('|') if term])
+    return [group for group in required if group], excluded
+
+
+class Segment:
+    def __init__(self, path):
+        self.path = path
+        self.terms = {}
+        self.__file__ = open(path, 'rb')
+        self.__mmap__ = mmap.mmap(self.__file__.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self.__mmap__, 0)
+        # Check data
+        if magic != MAGIC:
+            raise ValueError("'{0}' is not segment of index".format(path))
+
+        # Dictionary of terms is read to memory, postings stay on disk
+        offset = HEADER.size
+        for _ in range(count):
+            size, start, length = ENTRY.unpack_from(self.__mmap__, offset)
+            offset += ENTRY.size
+            term = self.__mmap__[offset:offset + size].decode('utf-8')
+            offset += size
+            self.terms[term] = (start, length)
+        self.__view__ = memoryview(self.__mmap__)
+
+    def postings(self, term):
+        item = self.terms.get(term)
+        if item is None:
+            return None
+        start, length = item
+        # Postings are read from mapped file without copy
+        return self.__view__[start:start + length * 4].cast('I')
+
+    def close(self):
+        self.__view__.release()
+        self.__mmap__.close()
+        self.__file__.close()
+
+    @staticmethod
+    def write(path, postings):
+        terms = sorted(postings)
+        encoded = [term.encode('utf-8') for term in terms]
+        start = HEADER.size + sum(ENTRY.size + len(term) for term in encoded)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(terms)))
+            for term, data in zip(terms, encoded):
+                file.write(ENTRY.pack(len(data), start, len(postings[term])))
+                file.write(data)
+                start += len(postings[term]) * 4
+            for term in terms:
+                file.write(postings[term])
+        os.replace(path + '.tmp', path)
+
+
+class InvertedIndex:
+    def __init__(self, path, flush_size=100000, max_segments=8):
+        # Check data
+        if not isinstance(path, str):
+            raise TypeError("'path' must be str type")
+        if not isinstance(flush_size, int) or flush_size < 1:
+            raise TypeError("'flush_size' must be positive int")
+        if not isinstance(max_segments, int) or max_segments < 1:
+            raise TypeError("'max_segments' must be positive int")
+
+        self.path = path
+        # Count of postings in memory, which are written as new segment
+        self.flush_size = flush_size
+        # Segments are merged, when flushes make more segments
+        self.max_segments = max_segments
+        self.segments = []
+        self.__lock__ = threading.RLock()
+        # Postings of documents, which are not flushed yet
+        self.__postings__ = {}
+        self.__size__ = 0
+        self.__keys__ = {}
+        os.makedirs(path, exist_ok=True)
+        self.__docs__ = open(os.path.join(path, 'docs.bin'), 'ab+')
+        self.__names__ = open(os.path.join(path, 'keys.bin'), 'ab+')
+        self.__docs_map__ = None
+        self.__names_map__ = None
+        self.__load__()
+
+    def __len__(self):
+        return self.__count__
+
+    def add(self, obj):
+        # Check data
+        if isinstance(obj, Media):
+            kind, key, text = MEDIA, obj.code, vars(obj)['caption']
+            time = vars(obj)['date']
+        elif isinstance(obj, Comment):
+            kind, key, text = COMMENT, str(obj.id), obj.text
+            time = obj.created_at
+        else:
+            raise TypeError("obj must be Media or Comment type")
+
+        with self.__lock__:
+            # Document is indexed once
+            if (kind, key) in self.__keys__:
+                return False
+            doc = self.__count__
+            name = key.encode('utf-8')
+            self.__docs__.seek(0, os.SEEK_END)
+            self.__docs__.write(DOC.pack(time or 0, self.__names_size__,
+                                         len(name), kind))
+            self.__names__.seek(0, os.SEEK_END)
+            self.__names__.write(name)
+            self.__names_size__ += len(name)
+            self.__keys__[(kind, key)] = doc
+            self.__count__ += 1
+            terms = tokenize(text)
+            if time:
+                terms.add(BUCKET + str(time // BUCKET_SIZE))
+            for term in terms:
+                postings = self.__postings__.get(term)
+                if postings is None:
+                    postings = self.__postings__[term] = array('I')
+                postings.append(doc)
+                self.__size__ += 1
+            if self.__size__ >= self.flush_size:
+                self.flush()
+            return True
+
+    def update(self, objects):
+        for obj in objects:
+            self.add(obj)
+
+    def consume(self, stream):
+        # Objects are indexed while they are loaded
+        for obj in stream:
+            self.add(obj)
+            yield obj
+
+    def flush(self):
+        with self.__lock__:
+            self.__docs__.flush()
+            self.__names__.flush()
+            if not self.__postings__:
+                self.__save__()
+                return
+            number = max([int(os.path.basename(segment.path)[8:-4])
+                          for segment in self.segments] + [0]) + 1
+            path = os.path.join(self.path, 'segment-{0}.idx'.format(number))
+            Segment.write(path, self.__postings__)
+            self.segments.append(Segment(path))
+            self.__save__()
+            self.__postings__ = {}
+            self.__size__ = 0
+            if len(self.segments) > self.max_segments:
+                self.compact()
+
+    def compact(self):
+        # All segments are merged to one for fast queries
+        with self.__lock__:
+            self.flush()
+            if len(self.segments) < 2:
+                return
+            terms = set()
+            for segment in self.segments:
+                terms.update(segment.terms)
+            postings = {term: self.__postings_of__(term) for term in terms}
+            old = self.segments
+            number = max(int(os.path.basename(segment.path)[8:-4])
+                         for segment in old) + 1
+            path = os.path.join(self.path, 'segment-{0}.idx'.format(number))
+            Segment.write(path, postings)
+            # Views of old segments are released before closing of files
+            del postings
+            self.segments = [Segment(path)]
+            self.__save__()
+            for segment in old:
+                segment.close()
+                os.remove(segment.path)
+
+    def search(self, query, since=None, until=None, kind=None, limit=None):
+        # Check data
+        if not isinstance(query, str):
+            raise TypeError("'query' must be str type")
+        if kind is not None and kind not in KIND_NAMES:
+            raise ValueError("Unknown kind '{0}'".format(kind))
+
+        required, excluded = parseQuery(query)
+        if not required:
+            return []
+        if since is not None and until is not None and \
+                0 < until - since <= MAX_BUCKETS * BUCKET_SIZE:
+            required.append([BUCKET + str(day) for day in range(
+                since // BUCKET_SIZE, (until - 1) // BUCKET_SIZE + 1)])
+        with self.__lock__:
+            self.__docs__.flush()
+            self.__names__.flush()
+            groups = sorted((self.__union__(group) for group in required),
+                            key=len)
+            excluded = [self.__postings_of__(term) for term in excluded]
+            if limit is None:
+                # All results are found by intersection of sets, but long
+                # lists are checked by binary search for short results
+                found = set(groups[0])
+                for postings in groups[1:]:
+                    if len(found) * 16 < len(postings):
+                        found = {doc for doc in found
+                                 if self.__has__(postings, doc)}
+                    else:
+                        found.intersection_update(postings)
+                for postings in excluded:
+                    if len(found) * 16 < len(postings):
+                        found = {doc for doc in found
+                                 if not self.__has__(postings, doc)}
+                    else:
+                        found.difference_update(postings)
+                candidates = sorted(found, reverse=True)
+                groups = excluded = ()
+            else:
+                # Smallest list is checked against other lists by binary
+                # search while limit is not reached
+                candidates = reversed(groups[0])
+                groups = groups[1:]
+            docs = self.__map__()
+            kind = None if kind is None else KIND_NAMES.index(kind)
+            results = []
+            # Documents are returned in reverse order of adding, not by time
+            for doc in candidates:
+                if not all(self.__has__(postings, doc)
+                           for postings in groups):
+                    continue
+                if any(self.__has__(postings, doc)
+                       for postings in excluded):
+                    continue
+                time, start, size, doc_kind = DOC.unpack_from(
+                    docs, doc * DOC.size)
+                if (kind is not None and doc_kind != kind) or \
+                        (since is not None and time < since) or \
+                        (until is not None and time >= until):
+                    continue
+                results.append((KIND_NAMES[doc_kind], self.__key__(
+                    start, size), time))
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def terms(self):
+        with self.__lock__:
+            terms = set(self.__postings__)
+            for segment in self.segments:
+                terms.update(segment.terms)
+            return {term for term in terms if not term.startswith(BUCKET)}
+
+    def close(self):
+        with self.__lock__:
+            self.flush()
+            self.__unmap__()
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+            self.__docs__.close()
+            self.__names__.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __postings_of__(self, term):
+        parts = [segment.postings(term) for segment in self.segments]
+        parts = [part for part in parts if part is not None]
+        if term in self.__postings__:
+            parts.append(self.__postings__[term])
+        if len(parts) == 1:
+            return parts[0]
+        # Documents of segments are in order of adding, so lists are joined
+        postings = array('I')
+        for part in parts:
+            postings.frombytes(memoryview(part).cast('B'))
+        return postings
+
+    def __union__(self, terms):
+        if len(terms) == 1:
+            return self.__postings_of__(terms[0])
+        docs = set()
+        for term in terms:
+            docs.update(self.__postings_of__(term))
+        return array('I', sorted(docs))
+
+    @staticmethod
+    def __has__(postings, doc):
+        index = bisect_left(postings, doc)
+        return index < len(postings) and postings[index] == doc
+
+    def __map__(self):
+        # Files of documents are mapped again after adding of documents
+        size = self.__count__ * DOC.size
+        if self.__docs_map__ is None or len(self.__docs_map__) < size:
+            self.__unmap__()
+            if size:
+                self.__docs_map__ = mmap.mmap(self.__docs__.fileno(), 0,
+                                              access=mmap.ACCESS_READ)
+                self.__names_map__ = mmap.mmap(self.__names__.fileno(), 0,
+                                               access=mmap.ACCESS_READ)
+        return self.__docs_map__
+
+    def __unmap__(self):
+        for name in ('__docs_map__', '__names_map__'):
+            if getattr(self, name) is not None:
+                getattr(self, name).close()
+                setattr(self, name, None)
+
+    def __key__(self, start, size):
+        return self.__names_map__[start:start + size].decode('utf-8')
+
+    def __load__(self):
+        manifest = os.path.join(self.path, 'manifest.json')
+        flushed = 0
+        if os.path.exists(manifest):
+            with open(manifest) as file:
+                data = json.load(file)
+            for name in data['segments']:
+                self.segments.append(Segment(os.path.join(self.path, name)))
+            flushed = data['docs']
+        self.__docs__.seek(0, os.SEEK_END)
+        self.__count__ = self.__docs__.tell() // DOC.size
+        self.__names__.seek(0, os.SEEK_END)
+        self.__names_size__ = self.__names__.tell()
+        docs = self.__map__()
+        for doc in range(self.__count__):
+            _, start, size, kind = DOC.unpack_from(docs, doc * DOC.size)
+            self.__keys__[(kind, self.__key__(start, size))] = doc
+        # Documents without flushed postings are lost on crash, so they can
+        # be added again
+        if flushed < self.__count__:
+            self.__unmap__()
+            self.__truncate__(flushed)
+
+    def __truncate__(self, count):
+        docs = self.__map__()
+        names_size = 0
+        if count:
+            _, start, size, _ = DOC.unpack_from(docs, (count - 1) * DOC.size)
+            names_size = start + size
+        for key, doc in list(self.__keys__.items()):
+            if doc >= count:
+                del self.__keys__[key]
+        self.__unmap__()
+        self.__docs__.truncate(count * DOC.size)
+        self.__names__.truncate(names_size)
+        self.__count__ = count
+        self.__names_size__ = names_size
+
+    def __save__(self):
+        manifest = os.path.join(self.path, 'manifest.json')
+        with open(manifest + '.tmp', 'w') as file:
+            json.dump({
+                'segments': [os.path.basename(segment.path)
+                             for segment in self.segments],
+                'docs': self.__count__,
+            }, file)
+        os.replace(manifest + '.tmp', manifest)
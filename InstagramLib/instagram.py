@@ -1,53 +1,22 @@
 #!/usr/bin/python3
 import hashlib
-import re
 import json
-
-import requests
-from requests.exceptions import *
-from time import sleep
-
-
-# Exception classes
-class InstagramException(Exception):
-    pass
-
-
-class InternetException(InstagramException):
-    def __init__(self, e):
-        self.error = e
-
-    def __getattr__(self, name):
-        return self.error.__getattribute__(name)
-
-    def __str__(self):
-        return "Error by connection with Instagram to '{0}' with response code '{1}'".format(
-            self.error.request.url, self.error.response.status_code)
-
-
-class AuthException(Exception):
-    def __init__(self, login):
-        super().__init__("Cannot auth user with username '{0}'".format(login))
-
-
-class UnexpectedResponse(InstagramException):
-    def __init__(self, url, data=None):
-        self.url = url
-        self.data = data
-
-        message = "Get unexpected response from '{}'".format(url)
-
-        if data:
-            message = "{0} with data: {1}".format(message, str(data))
-
-        super().__init__(message)
-
-
-class NotUpdatedElement(InstagramException):
-    def __init__(self, element, argument):
-        super().__init__(
-            "Element '{0}' haven't argument {1}. Please, update this element".format(
-                element.__repr__(), argument))
+import os
+import sys
+from array import array
+from operator import itemgetter
+from time import perf_counter, time
+
+from .deadlines import Deadline, backoff
+from .exceptions import (AuthException, Cancelled, CircuitOpen,
+                         DeadlineExceeded, InstagramException,
+                         InternetException, NotUpdatedElement,
+                         UnexpectedResponse)
+from .parsing import parseEdges, parsePage
+from .retention import createCollection
+from .syncing import Delta
+from .transport import HedgedTransport, RequestsTransport, Transport, \
+    wireSize
 
 
 # Exception struct
@@ -57,6 +26,8 @@ class ExceptionTree:
             'action': lambda exception, *args, **kwargs: (args, kwargs),
             'branch': {},
         }
+        # Exceptions by name from modules, which are not imported yet
+        self.__pending__ = []
 
     def __getitem__(self, key):
         # Check data
@@ -65,6 +36,11 @@ class ExceptionTree:
         return self.__search__(key)['action']
 
     def __setitem__(self, key, value):
+        if isinstance(key, str):
+            if not callable(value):
+                raise TypeError("Value must be function")
+            self.__pending__.append((key, value))
+            return
         # Check data
         if not issubclass(key, Exception):
             raise TypeError("Key must be Exception type")
@@ -82,6 +58,9 @@ class ExceptionTree:
         if not issubclass(exception, Exception):
             raise TypeError("'exception' must be Exception type")
 
+        if self.__pending__:
+            self.__resolve__()
+
         # Search
         current = self.__tree__
         while True:
@@ -99,37 +78,111 @@ class ExceptionTree:
                 return current
             continue
 
+    def __resolve__(self):
+        # Exception can be raised only by imported module, so others wait
+        resolved = []
+        pending = []
+        for name, action in self.__pending__:
+            module, _, attribute = name.rpartition('.')
+            if module in sys.modules:
+                resolved.append((getattr(sys.modules[module], attribute),
+                                 action))
+            else:
+                pending.append((name, action))
+        # Setting of item searches in tree again, so list is replaced before
+        self.__pending__ = pending
+        for exception, action in resolved:
+            self[exception] = action
+
 
 class Agent:
-    # Anonymous session
-    __session__ = requests.Session()
+    # Anonymous session, it is created on first request
+    transport = RequestsTransport()
     repeats = 1
+    rhx_gis = None
+    csrf_token = None
+    hydrator = None
+    storage = None
+    # Collection name -> (mode, size, window)
+    retention = {}
+    parse_executor = None
+    profiler = None
+    # Responses less than this size are parsed in current process
+    parse_threshold = 64 * 1024
+    # Deadline and cancellation token of every call of agent
+    timeout = None
+    token = None
+    breaker = None
+    scheduler = None
+    meter = None
 
     def exceptionDecorator(func):
-        def wrapper(self, *args, **kwargs):
+        def repeat(self, *args, **kwargs):
             count = 0
             while True:
                 count += 1
                 try:
                     return func(self, *args, **kwargs)
+                except (DeadlineExceeded, Cancelled, CircuitOpen):
+                    raise
                 except Exception as e:
                     if count < Agent.repeats:
-                        args, kwargs = self.exception_actions[e.__class__](e,
-                                                                           *args,
-                                                                           **kwargs)
+                        deadline = Deadline.current()
+                        if deadline is not None:
+                            deadline.check()
+                        start = perf_counter()
+                        args, kwargs = self.exception_actions[e.__class__](
+                            e, *args, **kwargs)
+                        if self.profiler is not None:
+                            self.profiler.add('backoff', start)
                     else:
                         raise e
 
+        def wrapper(self, *args, **kwargs):
+            return self.__call_method__(func.__name__, repeat, args, kwargs)
+
+        wrapper.__name__ = func.__name__
+        return wrapper
+
+    def deadlineDecorator(func):
+        # Method is called without repeats, it returns partial result by
+        # itself when deadline is exceeded
+        def wrapper(self, *args, **kwargs):
+            return self.__call_method__(func.__name__, func, args, kwargs)
+
+        wrapper.__name__ = func.__name__
         return wrapper
 
+    def __call_method__(self, name, func, args, kwargs):
+        # Outer call starts deadline, call is frame of profiler and meter
+        deadline = self.__deadline__()
+        if deadline is not None:
+            with deadline:
+                return self.__call_method__(name, func, args, kwargs)
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enter(name)
+        meter = self.meter
+        if meter is not None:
+            meter.enter(name)
+        result = None
+        try:
+            result = func(self, *args, **kwargs)
+            return result
+        finally:
+            if profiler is not None:
+                profiler.exit()
+            if meter is not None:
+                meter.exit(result)
+
     def __http_error_action__(exception, *args, **kwargs):
-        if exception.status_code in (403, 429):
-            sleep(2)
+        if exception.response.status_code in (403, 429):
+            backoff(2)
             return (args, kwargs)
         raise exception
 
     exception_actions = ExceptionTree()
-    exception_actions[HTTPError] = __http_error_action__
+    exception_actions['requests.exceptions.HTTPError'] = __http_error_action__
 
     @exceptionDecorator
     def __update__(self, obj=None, settings={}):
@@ -137,47 +190,53 @@ class Agent:
         if not isinstance(settings, dict):
             raise TypeError("'settings' must be dict type")
 
-        if isinstance(obj, Account):
-            query = "https://www.instagram.com/{0}".format(obj.login)
-        elif isinstance(obj, Media):
-            query = "https://www.instagram.com/p/{0}".format(obj.code)
-        elif isinstance(obj, Location):
-            query = "https://www.instagram.com/explore/locations/{0}".format(
-                obj.id)
-        elif isinstance(obj, Tag):
-            query = "https://www.instagram.com/explore/tags/{0}".format(
-                obj.name)
-        else:
-            raise TypeError("obj must be Account, Media, Location or Tag")
+        query, kind = self.__page__(obj)
 
         # Request
-        response = self.__send_get_request__(query, **settings)
+        response = self.__send_request__('GET', query, **settings)
 
         # Parsing info
         try:
-            match = re.search(
-                r"<script[^>]*>\s*window._sharedData\s*=\s*((?!<script>).*)\s*;\s*</script>",
-                response.text,
-            )
-            data = json.loads(match.group(1))
-            if 'rhx_gis' in data:
+            data = self.__parse_page__(response, kind)
+            if data['rhx_gis']:
                 self.rhx_gis = data['rhx_gis']
-            if 'csrf_token' in data['config']:
-                self.csrf_token = data['config']['csrf_token']
-            data = data['entry_data']
-            if isinstance(obj, Account):
-                data = data['ProfilePage'][0]['graphql']['user']
-            elif isinstance(obj, Media):
-                data = data['PostPage'][0]['graphql']['shortcode_media']
-            elif isinstance(obj, Location):
-                data = data['LocationsPage'][0]['graphql']['location']
-            elif isinstance(obj, Tag):
-                data = data['TagPage'][0]['graphql']['hashtag']
+            if data['csrf_token']:
+                self.csrf_token = data['csrf_token']
+            data = data['data']
+            if isinstance(obj, (Location, Tag)):
+                self.__retain__(obj, 'top_posts')
             obj.__setDataFromJSON__(data)
+            obj.__dict__['__hydrated_at__'] = time()
+            self.__store__(obj)
+            if isinstance(obj, Media):
+                self.__register__(obj.__dict__['owner'],
+                                  obj.__dict__['location'])
+                self.__store__(obj.__dict__['owner'])
+            elif isinstance(obj, (Location, Tag)):
+                self.__register__(*obj.top_posts)
+                for media in obj.top_posts:
+                    if isinstance(media, Media):
+                        self.__store__(media, 'media', obj)
             return data
         except (AttributeError, KeyError, ValueError):
             raise UnexpectedResponse(response.url, response.text)
 
+    def __page__(self, obj):
+        # URL of page of element and kind of page
+        if isinstance(obj, Account):
+            return "https://www.instagram.com/{0}".format(obj.login), \
+                'Account'
+        elif isinstance(obj, Media):
+            return "https://www.instagram.com/p/{0}".format(obj.code), \
+                'Media'
+        elif isinstance(obj, Location):
+            return "https://www.instagram.com/explore/locations/{0}".format(
+                obj.id), 'Location'
+        elif isinstance(obj, Tag):
+            return "https://www.instagram.com/explore/tags/{0}".format(
+                obj.name), 'Tag'
+        raise TypeError("obj must be Account, Media, Location or Tag")
+
     @exceptionDecorator
     def getMedia(self, obj, after=None, count=12, settings={},
                  limit=12):
@@ -185,7 +244,10 @@ class Agent:
         if not isinstance(count, int):
             raise TypeError("'count' must be int type")
 
-        data = self.__update__(obj, settings)
+        # Page of element is needed only for first media, id and GIS tokens
+        if not after or self.rhx_gis is None or \
+                not isinstance(obj, Tag) and vars(obj)['id'] is None:
+            data = self.__update__(obj, settings)
         media_list = []
         stop = False
 
@@ -196,25 +258,22 @@ class Agent:
                     raise TypeError("'settings' must be dict type")
                 if isinstance(obj, Account):
                     data = data['edge_owner_to_timeline_media']
-                elif isinstance(obj, Tag):
-                    data = data['edge_location_to_media']
                 elif isinstance(obj, Location):
+                    data = data['edge_location_to_media']
+                elif isinstance(obj, Tag):
                     data = data['edge_hashtag_to_media']
                 else:
                     raise TypeError(
                         "obj must be Account, Media, Location or Tag")
-                for media in data['edges']:
-                    media = media['node']
-                    m = Media(media['shortcode'])
-                    m.__setDataFromJSON__(media)
+                for record in data['edges']:
+                    m = Media(record[0])
+                    m.__setDataFromRecord__(record)
                     if isinstance(obj, Account):
-                        m.likes_count = media['edge_media_preview_like'][
-                            'count']
                         m.owner = obj
-                    else:
-                        m.likes_count = media['edge_liked_by']
-                    obj.media.add(m)
+                    self.__collect__(obj, 'media', m)
                     media_list.append(m)
+                    self.__register__(m)
+                    self.__store__(m, 'media', obj)
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -225,7 +284,7 @@ class Agent:
                 else:
                     after = None
             except (ValueError, KeyError):
-                raise UnexpectedResponse(response.url, response.text)
+                raise UnexpectedResponse(self.__page__(obj)[0], data)
 
         # Set params
         if not 'params' in settings:
@@ -259,34 +318,33 @@ class Agent:
             }
 
             # Send request
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial result is returned with cursor for resume
+                break
 
             # Parsing info
             try:
                 if isinstance(obj, Account):
-                    data = response.json()['data']['user'][
-                        'edge_owner_to_timeline_media']
+                    path = ('data', 'user', 'edge_owner_to_timeline_media')
                 elif isinstance(obj, Location):
-                    data = response.json()['data']['location'][
-                        'edge_location_to_media']
-                elif isinstance(obj, Tag):
-                    data = response.json()['data']['hashtag'][
-                        'edge_hashtag_to_media']
-                for media in data['edges']:
-                    media = media['node']
-                    m = Media(media['shortcode'])
-                    m.__setDataFromJSON__(media)
+                    path = ('data', 'location', 'edge_location_to_media')
+                else:
+                    path = ('data', 'hashtag', 'edge_hashtag_to_media')
+                data = self.__parse_edges__(response, path, 'media')
+                for record in data['edges']:
+                    m = Media(record[0])
+                    m.__setDataFromRecord__(record)
                     if isinstance(obj, Account):
-                        m.likes_count = media['edge_media_preview_like'][
-                            'count']
                         m.owner = obj
-                    else:
-                        m.likes_count = media['edge_liked_by']
-                    obj.media.add(m)
+                    self.__collect__(obj, 'media', m)
                     media_list.append(m)
+                    self.__register__(m)
+                    self.__store__(m, 'media', obj)
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -313,19 +371,15 @@ class Agent:
         # Parse first request
         try:
             data = data['edge_media_preview_like']
-            for edge in data['edges']:
-                edge = edge['node']
-                account = Account(edge['username'])
-                account.id = edge['id']
-                account.profile_pic_url = edge['profile_pic_url']
-                if 'is_verified' in edge:
-                    account.is_verified = edge['is_verified']
-                if 'full_name' in edge:
-                    account.full_name = edge['full_name']
-                media.likes.add(account)
+            for record in data['edges']:
+                account = Account(record[0])
+                account.__setDataFromRecord__(record)
+                self.__collect__(media, 'likes', account)
                 likes_list.append(account)
+                self.__register__(account)
+                self.__store__(account, 'like', media)
         except (ValueError, KeyError):
-            raise UnexpectedResponse(response.url, response.text)
+            raise UnexpectedResponse(self.__page__(media)[0], data)
         return likes_list, None
 
     @exceptionDecorator
@@ -339,31 +393,25 @@ class Agent:
         if not isinstance(media, Media):
             raise TypeError("'media' must be Media type")
 
-        data = self.__update__(media, settings)
         comments_list = []
+        stop = False
 
+        # Page of media is needed only for first comments and GIS tokens
+        if not after or self.rhx_gis is None:
+            data = self.__update__(media, settings)
         if not after:
             try:
                 data = data['edge_media_to_comment']
-                for comment in data['edges']:
-                    comment = comment['node']
-                    c = Comment(
-                        comment['id'],
-                        media=media,
-                        owner=Account(comment['owner']['username']),
-                        text=comment['text'],
-                        created_at=comment['created_at'],
-                    )
-                    media.comments.add(c)
-                    comments_list.append(c)
+                comments_list.extend(self.__parse_comments__(media, data))
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
-                    after = data['page_info']['end_cursor']
                 else:
                     stop = True
+                if data['page_info']['has_next_page']:
+                    after = data['page_info']['end_cursor']
             except (ValueError, KeyError):
-                raise UnexpectedResponse(response.url, response.text)
+                raise UnexpectedResponse(self.__page__(media)[0], data)
 
         # Set params
         if not 'params' in settings:
@@ -391,27 +439,22 @@ class Agent:
             }
 
             # Request for get info
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial result is returned with cursor for resume
+                break
 
             # Parsing info
             try:
-                data = response.json()['data']['shortcode_media'][
-                    'edge_media_to_comment']
+                data = self.__parse_edges__(
+                    response, ('data', 'shortcode_media',
+                               'edge_media_to_comment'), 'comment')
                 media.comments_count = data['count']
-                for comment in data['edges']:
-                    comment = comment['node']
-                    c = Comment(
-                        id=comment['id'],
-                        media=media,
-                        owner=Account(comment['owner']['username']),
-                        text=comment['text'],
-                        data=comment['created_at'],
-                    )
-                    media.comments.add(c)
-                    comments_list.append(c)
+                comments_list.extend(self.__parse_comments__(media, data))
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -425,41 +468,431 @@ class Agent:
                 raise UnexpectedResponse(response.url, response.text)
         return comments_list, after
 
-    def __send_get_request__(self, *args, raise_for_status=True, **kwargs):
-        count = 0
-        while True:
-            count += 1
-            try:
-                response = self.__session__.get(*args, **kwargs)
-                if raise_for_status:
-                    response.raise_for_status()
-                return response
-            except Exception as e:
-                if count < self.repeats:
-                    args, kwargs = self.exception_actions[e.__class__](e, *args,
-                                                                       **kwargs)
-                else:
-                    raise InternetException(e)
+    def __parse_comments__(self, media, data):
+        comments_list = []
+        for id, owner, text, created_at in data['edges']:
+            c = Comment(
+                id=id,
+                media=media,
+                owner=Account(owner),
+                text=text,
+                created_at=created_at,
+            )
+            self.__collect__(media, 'comments', c)
+            comments_list.append(c)
+            self.__register__(c.owner)
+            self.__store__(c)
+        return comments_list
+
+    def enableProfiling(self, memory=True):
+        from .profiling import Profiler
+
+        self.disableProfiling()
+        self.profiler = Profiler(memory)
+        self.profiler.start()
+        return self.profiler
+
+    def disableProfiling(self):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.stop()
+        self.profiler = None
+        return profiler
+
+    def enableBandwidthMeter(self, window=1000):
+        from .bandwidth import BandwidthMeter
+
+        self.meter = BandwidthMeter(window)
+        return self.meter
+
+    def disableBandwidthMeter(self):
+        meter = self.meter
+        self.meter = None
+        return meter
+
+    def getBandwidth(self):
+        if self.meter is None:
+            return {}
+        return self.meter.report()
+
+    def setTransport(self, transport):
+        # Check data
+        if not isinstance(transport, Transport):
+            raise TypeError("'transport' must be Transport type")
+
+        self.transport = transport
+
+    def setProxyPool(self, pool, factory=None, timeout=60):
+        from .proxies import ProxyTransport
+
+        # Requests transport is shared for all proxies, other transports
+        # are created by factory for every proxy
+        transport = self.transport
+        if factory is not None or not isinstance(transport,
+                                                 RequestsTransport):
+            transport = None
+        self.setTransport(ProxyTransport(pool, transport, factory, timeout))
+
+    def enableHedging(self, hedge=None, percentile=95, budget=0.05,
+                      min_delay=0.05, window=1000, workers=64):
+        self.disableHedging()
+        self.setTransport(HedgedTransport(
+            self.transport, hedge, percentile, budget, min_delay, window,
+            workers=workers))
+        return self.transport
+
+    def disableHedging(self):
+        transport = self.transport
+        if isinstance(transport, HedgedTransport):
+            # Wrapped transport is still used, so only threads are stopped
+            if transport.__executor__ is not None:
+                transport.__executor__.shutdown(wait=False)
+            self.setTransport(transport.transport)
+            return transport
+        return None
+
+    def enableCircuitBreaker(self, threshold=5, cooldown=30, max_cooldown=600,
+                             probes=1):
+        from .breaker import CircuitBreaker
+
+        self.breaker = CircuitBreaker(threshold, cooldown, max_cooldown,
+                                      probes)
+        return self.breaker
+
+    def disableCircuitBreaker(self):
+        breaker = self.breaker
+        self.breaker = None
+        return breaker
+
+    def getCircuits(self):
+        if self.breaker is None:
+            return {}
+        return self.breaker.stats()
+
+    def enableScheduler(self, rate, burst=1, weights=None, window=1000):
+        from .scheduling import RequestScheduler
+
+        self.scheduler = RequestScheduler(rate, burst, weights, window)
+        return self.scheduler
+
+    def disableScheduler(self):
+        scheduler = self.scheduler
+        self.scheduler = None
+        return scheduler
+
+    def priority(self, name):
+        from .scheduling import Priority
+
+        return Priority(name)
+
+    def getQueues(self):
+        if self.scheduler is None:
+            return {}
+        return self.scheduler.stats()
+
+    def __schedule__(self, method, url, params, deadline):
+        scheduler = self.scheduler
+        timeout = None if deadline is None else deadline.remaining()
+        if not scheduler.acquire(scheduler.classify(method, url, params),
+                                 timeout, deadline):
+            deadline.check()
+
+    def enableLazyMode(self, ttl=300, batch_size=20, workers=8, settings={}):
+        if self.hydrator is not None:
+            self.hydrator.close()
+        from .hydration import Hydrator
+
+        self.hydrator = Hydrator(self, ttl, batch_size, workers, settings)
+
+    def disableLazyMode(self):
+        if self.hydrator is not None:
+            self.hydrator.close()
+        self.hydrator = None
+
+    def bind(self, *objects):
+        # Check data
+        for obj in objects:
+            if not isinstance(obj, Element):
+                raise TypeError(
+                    "objects must be Account, Media, Location or Tag")
+        if self.hydrator is None:
+            raise InstagramException("Lazy mode is disabled for this agent")
+
+        for obj in objects:
+            self.hydrator.register(obj)
+
+    def enableParseExecutor(self, workers=None, threshold=64 * 1024):
+        # Check data
+        if workers is not None and (not isinstance(workers, int) or
+                                    workers < 1):
+            raise TypeError("'workers' must be positive int")
+        if not isinstance(threshold, int):
+            raise TypeError("'threshold' must be int type")
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.disableParseExecutor()
+        self.parse_threshold = threshold
+        # Pool with one core is slower than parsing in current process
+        if workers is None and (os.cpu_count() or 1) == 1:
+            return
+        self.parse_executor = ProcessPoolExecutor(workers)
+
+    def disableParseExecutor(self):
+        if self.parse_executor is not None:
+            self.parse_executor.shutdown()
+        self.parse_executor = None
+
+    def __parse_page__(self, response, kind):
+        return self.__parse__(parsePage, response, kind)
+
+    def __parse_edges__(self, response, path, kind):
+        return self.__parse__(parseEdges, response, path, kind)
+
+    def __parse__(self, func, response, *args):
+        start = perf_counter()
+        content = response.content
+        if self.parse_executor is None or len(content) < self.parse_threshold:
+            data = func(content, response.encoding, *args)
+        else:
+            data = self.parse_executor.submit(func, content, response.encoding,
+                                              *args).result()
+        if self.profiler is not None:
+            self.profiler.add('decode', start)
+        return data
 
-    def __send_post_request__(self, *args, raise_for_status=True, **kwargs):
+    def setRetention(self, name, mode='all', size=None, window=None):
+        # Check data
+        if name not in ('media', 'top_posts', 'follows', 'followers', 'likes',
+                        'comments'):
+            raise ValueError("Unknown collection '{0}'".format(name))
+        createCollection(mode, size, window)
+
+        self.retention = dict(self.retention)
+        self.retention[name] = (mode, size, window)
+
+    def __collect__(self, obj, name, item):
+        self.__retain__(obj, name).add(item)
+
+    def __retain__(self, obj, name):
+        collection = getattr(obj, name)
+        # Retention of element has priority over retention of agent
+        if isinstance(collection, set) and name in self.retention and \
+                self.retention[name][0] != 'all':
+            collection = createCollection(*self.retention[name],
+                                          items=collection)
+            setattr(obj, name, collection)
+        return collection
+
+    def __store__(self, obj, relation=None, parent=None):
+        if self.storage is not None and obj is not None:
+            self.storage.add(obj, relation, parent)
+
+    def setDeadline(self, timeout=None, token=None):
+        # Check data
+        Deadline(timeout, token)
+
+        self.timeout = timeout
+        self.token = token
+
+    def deadline(self, timeout=None, token=None):
+        return Deadline(timeout, token)
+
+    def __deadline__(self):
+        # Deadline of agent is started by outer call, token of agent is
+        # checked in every call
+        deadline = Deadline.current()
+        if deadline is None:
+            if self.timeout is not None or self.token is not None:
+                return Deadline(self.timeout, self.token)
+        elif self.token is not None and self.token not in deadline.tokens:
+            return Deadline(None, self.token)
+        return None
+
+    def __register__(self, *objects):
+        if self.hydrator is None:
+            return
+        for obj in objects:
+            if isinstance(obj, Element):
+                self.hydrator.register(obj)
+
+    def __negotiate__(self, kwargs):
+        # The most efficient encodings, which are decoded by transport, are
+        # requested, encoding of request settings is not changed
+        headers = kwargs.get('headers') or {}
+        for name in headers:
+            if name.lower() == 'accept-encoding':
+                return
+        kwargs['headers'] = dict(headers, **{
+            'Accept-Encoding': self.transport.acceptEncoding})
+
+    def __send_request__(self, method, url, raise_for_status=True,
+                         **kwargs):
+        deadline = Deadline.current()
         count = 0
         while True:
             count += 1
+            if deadline is not None:
+                deadline.check()
+                kwargs['timeout'] = deadline.limit(kwargs.get('timeout'))
+            if self.scheduler is not None:
+                self.__schedule__(method, url, kwargs.get('params'),
+                                  deadline)
+            # Open circuit of endpoint fails request at once
+            circuit = None
+            if self.breaker is not None:
+                circuit = self.breaker.acquire(method, url,
+                                               kwargs.get('params'))
+            self.__negotiate__(kwargs)
+            response = None
+            start = perf_counter()
             try:
-                response = self.__session__.post(*args, **kwargs)
+                response = self.transport.request(method, url, **kwargs)
+                if self.profiler is not None:
+                    self.profiler.add('network', start)
+                if self.meter is not None:
+                    self.meter.add(method, url, kwargs.get('params'),
+                                   response, wireSize(response),
+                                   len(response.content))
+                if circuit is not None:
+                    self.breaker.release(circuit, response.status_code)
                 if raise_for_status:
                     response.raise_for_status()
                 return response
+            except (DeadlineExceeded, Cancelled):
+                raise
             except Exception as e:
+                if circuit is not None:
+                    if response is None:
+                        self.breaker.release(circuit, error=e)
+                    # Request is not repeated if circuit is opened by it
+                    self.breaker.check(circuit)
+                # Error of request by short timeout is error of deadline
+                if deadline is not None and deadline.expired():
+                    deadline.check()
                 if count < self.repeats:
-                    args, kwargs = self.exception_actions[e.__class__](e, *args,
-                                                                       **kwargs)
+                    start = perf_counter()
+                    (url,), kwargs = self.exception_actions[e.__class__](
+                        e, url, **kwargs)
+                    if self.profiler is not None:
+                        self.profiler.add('backoff', start)
                 else:
                     raise InternetException(e)
 
 
+# Base class for elements with lazy loading fields
+class Element:
+    __lazy_fields__ = frozenset()
+    # Field -> path of keys in node of element inside other page
+    __node_fields__ = {}
+    # Key of element in node
+    __node_key__ = 'id'
+    # Field with key of element in collections
+    __key__ = 'id'
+    # Fields of records: plain keys of node and paths of keys
+    __record_keys__ = ()
+    __record_paths__ = ()
+    __record_key_set__ = frozenset()
+    # Absent keys of node -> names of present fields and getter of values
+    __record_layouts__ = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__node_fields__' in cls.__dict__:
+            fields = cls.__node_fields__.items()
+            cls.__record_keys__ = tuple(
+                (name, path[0]) for name, path in fields if len(path) == 1)
+            cls.__record_paths__ = tuple(
+                (name, path) for name, path in fields if len(path) > 1)
+            cls.__record_key_set__ = frozenset(
+                key for _, key in cls.__record_keys__)
+            cls.__record_layouts__ = {}
+
+    @classmethod
+    def __record__(cls, node):
+        # Compact record of node: key, names of present fields and their
+        # values, it can be made in processes of parse executor
+        absent = cls.__record_key_set__.difference(node)
+        layout = cls.__record_layouts__.get(absent)
+        if layout is None:
+            layout = cls.__layout__(absent)
+        names, getter = layout
+        paths = []
+        for name, path in cls.__record_paths__:
+            value = node
+            for key in path:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                paths.append((name, value))
+        return [node.get(cls.__node_key__), names, getter(node), paths]
+
+    @classmethod
+    def __layout__(cls, absent):
+        keys = [(name, key) for name, key in cls.__record_keys__
+                if key not in absent]
+        # Same names are one object, so they are pickled once
+        names = tuple(name for name, _ in keys)
+        getter = itemgetter(*(key for _, key in keys))
+        if len(keys) == 0:
+            getter = lambda node: ()
+        elif len(keys) == 1:
+            getter = lambda node, getter=getter: (getter(node),)
+        layout = cls.__record_layouts__[absent] = (names, getter)
+        return layout
+
+    def getFields(self):
+        # Fields, which are loaded by update or from nodes of other pages
+        if '__hydrated_at__' in self.__dict__:
+            return frozenset(self.__lazy_fields__)
+        return frozenset(self.__dict__.get('__fields__', ()))
+
+    def __setDataFromNode__(self, data):
+        self.__setDataFromRecord__(self.__record__(data))
+
+    def __setDataFromRecord__(self, record):
+        data = self.__dict__
+        data.update(zip(record[1], record[2]))
+        fields = data.get('__fields__')
+        if fields is None:
+            fields = data['__fields__'] = set()
+        fields.update(record[1])
+        for name, value in record[3]:
+            data[name] = value
+            fields.add(name)
+
+    def __present__(self, *names):
+        fields = self.__dict__.get('__fields__')
+        if fields is None:
+            fields = self.__dict__['__fields__'] = set()
+        fields.update(names)
+
+
 # Account class
-class Account:
+class Account(Element):
+    __lazy_fields__ = frozenset((
+        'id', 'full_name', 'profile_pic_url', 'profile_pic_url_hd', 'fb_page',
+        'biography', 'follows_count', 'followers_count', 'media_count',
+        'is_private', 'is_verified', 'country_block',
+    ))
+    __node_fields__ = {
+        'id': ('id',),
+        'full_name': ('full_name',),
+        'profile_pic_url': ('profile_pic_url',),
+        'profile_pic_url_hd': ('profile_pic_url_hd',),
+        'fb_page': ('connected_fb_page',),
+        'biography': ('biography',),
+        'follows_count': ('edge_follow', 'count'),
+        'followers_count': ('edge_followed_by', 'count'),
+        'media_count': ('edge_owner_to_timeline_media', 'count'),
+        'is_private': ('is_private',),
+        'is_verified': ('is_verified',),
+        'country_block': ('country_block',),
+    }
+    __node_key__ = 'username'
+    __key__ = 'login'
+
     def __init__(self, login):
         self.id = None
         self.login = login
@@ -496,13 +929,15 @@ class Account:
 
 class AgentAccount(Account, Agent):
     @Agent.exceptionDecorator
-    def __init__(self, login, password, settings={}):
+    def __init__(self, login, password, settings={}, transport=None):
         super().__init__(login)
         if not isinstance(settings, dict):
             raise TypeError("'settings' must be dict type")
+        if transport is not None:
+            self.setTransport(transport)
         # Request for get start page for get CSRFToken
-        response = self.__send_get_request__(
-            "https://www.instagram.com/",
+        response = self.__send_request__(
+            'GET', "https://www.instagram.com/",
             **settings
         )
         # Create login data structure
@@ -516,8 +951,8 @@ class AgentAccount(Account, Agent):
             "referer": "https://www.instagram.com/",
         }
         # Login request
-        response = self.__send_post_request__(
-            "https://www.instagram.com/accounts/login/ajax/",
+        response = self.__send_request__(
+            'POST', "https://www.instagram.com/accounts/login/ajax/",
             data=data,
             headers=headers,
             **settings,
@@ -549,8 +984,9 @@ class AgentAccount(Account, Agent):
         if not isinstance(limit, int):
             raise TypeError("'limit' must be int type")
 
-        # Update media
-        self.__update__(media, settings)
+        # Update media, next pages need only code of media
+        if not after:
+            self.__update__(media, settings)
         likes_list = []
         stop = False
 
@@ -561,6 +997,9 @@ class AgentAccount(Account, Agent):
                 'query_hash': "1cb6ec562846122743b61e492c85999f",
                 'variables': '{{"shortcode":"{shortcode}","first":{first}}}',
             }
+            if after:
+                settings['params']['variables'] = \
+                    '{{"shortcode":"{shortcode}","first":{first},"after":"{after}"}}'
 
         while not stop:
             data = {}
@@ -576,24 +1015,28 @@ class AgentAccount(Account, Agent):
                 settings['params']['variables'].format(**data)
 
             # Request for get info
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial result is returned with cursor for resume
+                break
 
             # Parsing info
             try:
-                data = response.json()['data']['shortcode_media'][
-                    'edge_liked_by']
+                data = self.__parse_edges__(
+                    response, ('data', 'shortcode_media', 'edge_liked_by'),
+                    'account')
                 media.likes_count = data['count']
-                for edge in data['edges']:
-                    account = Account(edge['node']['username'])
-                    account.id = edge['node']['id']
-                    account.profile_pic_url = edge['node']['profile_pic_url']
-                    account.is_verified = edge['node']['is_verified']
-                    account.full_name = edge['node']['full_name']
-                    media.likes.add(account)
+                for record in data['edges']:
+                    account = Account(record[0])
+                    account.__setDataFromRecord__(record)
+                    self.__collect__(media, 'likes', account)
                     likes_list.append(account)
+                    self.__register__(account)
+                    self.__store__(account, 'like', media)
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -623,8 +1066,9 @@ class AgentAccount(Account, Agent):
         if not isinstance(account, Account):
             raise TypeError("'account' must be Account type")
 
-        # Update account
-        self.__update__(account, settings)
+        # Update account, next pages need only id of account
+        if not after or vars(account)['id'] is None:
+            self.__update__(account, settings)
         follows_list = []
         stop = False
 
@@ -635,6 +1079,9 @@ class AgentAccount(Account, Agent):
                 'query_hash': "58712303d941c6855d4e888c5f0cd22f",
                 'variables': '{{"id":"{id}","first":{first}}}',
             }
+            if after:
+                settings['params']['variables'] = \
+                    '{{"id":"{id}","first":{first},"after":"{after}"}}'
 
         while not stop:
             data = {}
@@ -649,24 +1096,27 @@ class AgentAccount(Account, Agent):
                 settings['params']['variables'].format(**data)
 
             # Request for get info
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial result is returned with cursor for resume
+                break
 
             # Parsing info
             try:
-                data = response.json()['data']['user']['edge_follow']
+                data = self.__parse_edges__(
+                    response, ('data', 'user', 'edge_follow'), 'account')
                 account.follows_count = data['count']
-                for follow in data['edges']:
-                    follow = follow['node']
-                    a = Account(follow['username'])
-                    a.id = follow['id']
-                    a.profile_pic_url = follow['profile_pic_url']
-                    a.is_verified = follow['is_verified']
-                    a.full_name = follow['full_name']
-                    account.follows.add(a)
+                for record in data['edges']:
+                    a = Account(record[0])
+                    a.__setDataFromRecord__(record)
+                    self.__collect__(account, 'follows', a)
                     follows_list.append(a)
+                    self.__register__(a)
+                    self.__store__(a, 'follow', account)
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -696,8 +1146,9 @@ class AgentAccount(Account, Agent):
         if not isinstance(account, Account):
             raise TypeError("'account' must be Account type")
 
-        # Update account
-        self.__update__(account, settings)
+        # Update account, next pages need only id of account
+        if not after or vars(account)['id'] is None:
+            self.__update__(account, settings)
         followers_list = []
         stop = False
 
@@ -708,6 +1159,9 @@ class AgentAccount(Account, Agent):
                 'query_hash': "37479f2b8209594dde7facb0d904896a",
                 'variables': '{{"id":"{id}","first":{first}}}',
             }
+            if after:
+                settings['params']['variables'] = \
+                    '{{"id":"{id}","first":{first},"after":"{after}"}}'
 
         while not stop:
             data = {}
@@ -722,24 +1176,27 @@ class AgentAccount(Account, Agent):
                 settings['params']['variables'].format(**data)
 
             # Request for get info
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial result is returned with cursor for resume
+                break
 
             # Parsing info
             try:
-                data = response.json()['data']['user']['edge_followed_by']
+                data = self.__parse_edges__(
+                    response, ('data', 'user', 'edge_followed_by'), 'account')
                 account.followers_count = data['count']
-                for follower in data['edges']:
-                    follower = follower['node']
-                    a = Account(follower['username'])
-                    a.id = follower['id']
-                    a.profile_pic_url = follower['profile_pic_url']
-                    a.is_verified = follower['is_verified']
-                    a.full_name = follower['full_name']
-                    account.followers.add(a)
+                for record in data['edges']:
+                    a = Account(record[0])
+                    a.__setDataFromRecord__(record)
+                    self.__collect__(account, 'followers', a)
                     followers_list.append(a)
+                    self.__register__(a)
+                    self.__store__(a, 'follower', account)
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
@@ -755,123 +1212,213 @@ class AgentAccount(Account, Agent):
                 raise UnexpectedResponse(response.url, response.text)
         return followers_list, after
 
-    def feed(self, count=12, settings={}):
+    def syncFollowers(self, account=None, snapshot=(), known_streak=50,
+                      reconcile=False, page_size=200, settings={}):
+        return self.__sync__(account, snapshot, known_streak, reconcile,
+                             page_size, settings, 'edge_followed_by',
+                             "37479f2b8209594dde7facb0d904896a")
+
+    def syncFollows(self, account=None, snapshot=(), known_streak=50,
+                    reconcile=False, page_size=200, settings={}):
+        return self.__sync__(account, snapshot, known_streak, reconcile,
+                             page_size, settings, 'edge_follow',
+                             "58712303d941c6855d4e888c5f0cd22f")
+
+    @Agent.exceptionDecorator
+    def __sync__(self, account, snapshot, known_streak, reconcile, page_size,
+                 settings, edge, query_hash):
+        # Check set and data
+        if not account:
+            account = self
+        if not isinstance(account, Account):
+            raise TypeError("'account' must be Account type")
+        if not isinstance(known_streak, int) or known_streak < 1:
+            raise TypeError("'known_streak' must be positive int")
+        if not isinstance(page_size, int) or page_size < 1:
+            raise TypeError("'page_size' must be positive int")
+        if not isinstance(settings, dict):
+            raise TypeError("'settings' must be dict type")
+
+        # Snapshot is kept as sorted array of ids for bisect search
+        if not (isinstance(snapshot, array) and snapshot.typecode == 'q'):
+            snapshot = array('q', sorted(int(id) for id in snapshot))
+        delta = Delta(snapshot)
+
+        # Update account for id and count of edges
+        data = self.__update__(account, dict(settings))
+        try:
+            delta.count = data[edge]['count']
+        except (KeyError, TypeError):
+            raise UnexpectedResponse(
+                "https://www.instagram.com/{0}".format(account.login), data)
+        delta.requests += 1
+
+        seen = set()
+        streak = 0
+        after = None
+        stopped = False
+        while True:
+            variables = {'id': str(account.id), 'first': page_size}
+            if after:
+                variables['after'] = after
+            params = dict(settings.get('params', {}))
+            params['query_hash'] = query_hash
+            params['variables'] = json.dumps(variables,
+                                             separators=(',', ':'))
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **dict(settings, params=params),
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Delta is not complete, so lost ids are unknown
+                stopped = True
+                break
+            delta.requests += 1
+
+            # Parsing info
+            try:
+                data = self.__parse_edges__(
+                    response, ('data', 'user', edge), 'id')
+                delta.count = data['count']
+                for id in data['edges']:
+                    id = int(id)
+                    if id in seen:
+                        continue
+                    seen.add(id)
+                    if delta.contains(id):
+                        streak += 1
+                    else:
+                        streak = 0
+                        delta.gained.append(id)
+                has_next_page = data['page_info']['has_next_page']
+                after = data['page_info']['end_cursor']
+            except (ValueError, KeyError):
+                raise UnexpectedResponse(response.url, response.text)
+
+            if not has_next_page or not data['edges']:
+                # Full list is seen, so lost ids are known exactly
+                delta.lost = [id for id in snapshot if id not in seen]
+                delta.lost_count = len(delta.lost)
+                delta.complete = True
+                break
+            # New edges are first in list, so long run of known ids means
+            # that rest of list is known. Without reconcile lost ids are
+            # only counted, reconcile walks full list to find them
+            if streak >= known_streak and (not reconcile or delta.count ==
+                                           len(snapshot) + len(delta.gained)):
+                break
+        if not delta.complete and not stopped:
+            # Lost ids stay in snapshot, so they are counted again by next
+            # sync until reconcile
+            delta.lost_count = max(
+                len(snapshot) + len(delta.gained) - delta.count, 0)
+            delta.complete = delta.lost_count == 0
+        delta.merge()
+        return delta
+
+    @Agent.deadlineDecorator
+    def feed(self, count=12, settings={}, after=None, cursor=False):
         # Check set and data
         if not isinstance(settings, dict):
             raise TypeError("'settings' must be dict type")
         if not isinstance(count, int):
             raise TypeError("'count' must be int type")
+        if not isinstance(cursor, bool):
+            raise TypeError("'cursor' must be bool type")
 
         # Set data
         feed = []
         stop = False
 
-        # Request for get info
-        response = self.__send_get_request__(
-            "https://www.instagram.com/?__a=1",
-            **settings,
-        )
+        # First page is loaded from start page, next pages by cursor
+        if not after:
+            # Request for get info
+            response = self.__send_request__(
+                'GET', "https://www.instagram.com/?__a=1",
+                **settings,
+            )
 
-        # Parsing info
-        try:
-            data = response.json()['graphql']['user']['edge_web_feed_timeline']
-            cursor = data['page_info']['end_cursor']
-            data = data['edges']
-            for edge in data:
-                edge = edge['node']
-                media = Media(edge['shortcode'])
-                media.id = int(edge['id'])
-                if edge['edge_media_to_caption']['edges']:
-                    media.caption = \
-                        edge['edge_media_to_caption']['edges'][0]['node'][
-                            'text']
-                media.owner = Account(edge['owner']['username'])
-                media.owner.id = int(edge['owner']['id'])
-                media.owner.full_name = edge['owner']['full_name']
-                media.owner.profile_pic_url = edge['owner']['profile_pic_url']
-                media.owner.is_private = edge['owner']['is_private']
-                media.date = edge['taken_at_timestamp']
-                if edge['location']:
-                    media.location = Location(edge['location']['id'])
-                media.likes_count = edge['edge_media_preview_like']['count']
-                media.comments_count = edge['edge_media_to_comment']['count']
-                media.comments_disabled = edge['comments_disabled']
-                media.is_video = edge['is_video']
-                if 'video_url' in edge:
-                    media.video_url = edge['video_url']
-                media.display_url = edge['display_url']
-                media.dimensions = (
-                    edge['dimensions']['width'], edge['dimensions']['height'])
-                feed.append(media)
-        except (ValueError, KeyError):
-            raise UnexpectedResponse(response.url, response.text)
+            # Parsing info
+            try:
+                data = self.__parse_edges__(
+                    response, ('graphql', 'user', 'edge_web_feed_timeline'),
+                    'media')
+                for record in data['edges']:
+                    media = self.__feed_media__(record)
+                    feed.append(media)
+                    self.__register__(media, media.owner, media.location)
+                    self.__store__(media.owner)
+                    self.__store__(media)
+                if data['page_info']['has_next_page']:
+                    after = data['page_info']['end_cursor']
+                stop = count <= len(feed) or not after
+                count -= len(feed)
+            except (ValueError, KeyError):
+                raise UnexpectedResponse(response.url, response.text)
 
         # Set data
-        stop = (count <= len(feed))
-        count -= len(feed)
-        data = {'query_id': 17842794232208280,
-                'variables': '{"fetch_media_item_count":' + str(
-                    count) + ',"fetch_media_item_cursor":"' + cursor + '","fetch_comment_count":4,"fetch_like":10,"has_stories":false}'}
+        data = {'query_id': 17842794232208280}
         if 'params' in settings:
             settings['params'].update(data)
         else:
             settings['params'] = data
 
         while not stop:
+            settings['params']['variables'] = \
+                '{"fetch_media_item_count":' + str(count) + \
+                ',"fetch_media_item_cursor":"' + after + \
+                '","fetch_comment_count":4,"fetch_like":10,' \
+                '"has_stories":false}'
+
             # Request for get info
-            response = self.__send_get_request__(
-                "https://www.instagram.com/graphql/query/",
-                **settings,
-            )
+            try:
+                response = self.__send_request__(
+                    'GET', "https://www.instagram.com/graphql/query/",
+                    **settings,
+                )
+            except (DeadlineExceeded, Cancelled):
+                # Partial feed is returned with cursor for resume
+                break
 
             # Parsing info
             try:
-                data = response.json()['data']['user']['edge_web_feed_timeline']
-                cursor = data['page_info']['end_cursor']
-                for edge in data['edges']:
-                    edge = edge['node']
-                    media = Media(edge['shortcode'])
-                    media.id = int(edge['id'])
-                    if edge['edge_media_to_caption']['edges']:
-                        media.caption = \
-                            edge['edge_media_to_caption']['edges'][0]['node'][
-                                'text']
-                    media.owner = Account(edge['owner']['username'])
-                    media.owner.id = int(edge['owner']['id'])
-                    media.owner.full_name = edge['owner']['full_name']
-                    media.owner.profile_pic_url = edge['owner'][
-                        'profile_pic_url']
-                    media.owner.is_private = edge['owner']['is_private']
-                    media.date = edge['taken_at_timestamp']
-                    if edge['location']:
-                        media.location = Location(edge['location']['id'])
-                    media.likes_count = edge['edge_media_preview_like']['count']
-                    media.comments_count = edge['edge_media_to_comment'][
-                        'count']
-                    media.comments_disabled = edge['comments_disabled']
-                    media.is_video = edge['is_video']
-                    if 'video_url' in edge:
-                        media.video_url = edge['video_url']
-                    media.display_url = edge['display_url']
-                    media.dimensions = (
-                        edge['dimensions']['width'],
-                        edge['dimensions']['height'])
+                data = self.__parse_edges__(
+                    response, ('data', 'user', 'edge_web_feed_timeline'),
+                    'media')
+                for record in data['edges']:
+                    media = self.__feed_media__(record)
                     feed.append(media)
+                    self.__register__(media, media.owner, media.location)
+                    self.__store__(media.owner)
+                    self.__store__(media)
                 # Recursive calling method if not all elements was loading
                 if len(data['edges']) < count and data['page_info'][
                     'has_next_page']:
                     count = count - len(data['edges'])
-                    settings['params'][
-                        'variables'] = '{"fetch_media_item_count":' + str(
-                        count) + ',"fetch_media_item_cursor":"' + \
-                                       data['page_info'][
-                                           'end_cursor'] + '","fetch_comment_count":4,"fetch_like":10,"has_stories":false}'
                 else:
                     stop = True
+                if data['page_info']['has_next_page']:
+                    after = data['page_info']['end_cursor']
+                else:
+                    after = None
             except (ValueError, KeyError):
                 raise UnexpectedResponse(response.url, response.text)
+        # Cursor for resume is returned only on request
+        if cursor:
+            return feed, after
         return feed
 
+    def __feed_media__(self, record):
+        media = Media(record[0])
+        media.__setDataFromRecord__(record)
+        # Ids of feed are numbers
+        media.id = int(media.id)
+        if media.owner is None:
+            raise KeyError('owner')
+        media.owner.id = int(media.owner.id)
+        return media
+
     @Agent.exceptionDecorator
     def like(self, media, settings={}):
         # Check data
@@ -1055,7 +1602,7 @@ class AgentAccount(Account, Agent):
         # Set data
         headers = {
             'referer': referer,
-            'x-csrftoken': self.__session__.cookies['csrftoken'],
+            'x-csrftoken': self.transport.cookies['csrftoken'],
             'x-instagram-ajax': '1',
             'x-requested-with': 'XMLHttpRequest',
         }
@@ -1068,12 +1615,59 @@ class AgentAccount(Account, Agent):
         else:
             settings['data'] = data
 
-        # Send request
-        response = self.__session__.post(url, **settings)
-        return response
-
+        # Send request through deadline, scheduler and circuit of actions
+        return self.__send_request__('POST', url, raise_for_status=False,
+                                     **settings)
+
+
+class Media(Element):
+    __lazy_fields__ = frozenset((
+        'id', 'caption', 'owner', 'date', 'location', 'likes_count',
+        'comments_count', 'comments_disabled', 'is_video', 'video_url',
+        'is_ad', 'display_url', 'dimensions',
+    ))
+    __node_fields__ = {
+        'id': ('id',),
+        'date': ('taken_at_timestamp',),
+        'likes_count': ('edge_media_preview_like', 'count'),
+        'comments_count': ('edge_media_to_comment', 'count'),
+        'comments_disabled': ('comments_disabled',),
+        'is_video': ('is_video',),
+        'video_url': ('video_url',),
+        'is_ad': ('is_ad',),
+        'display_url': ('display_url',),
+    }
+    __node_key__ = 'shortcode'
+    __key__ = 'code'
+
+    @classmethod
+    def __record__(cls, node):
+        record = super().__record__(node)
+        # Fields, which are not plain values of node
+        paths = record[3]
+        if 'edge_media_to_caption' in node:
+            edges = node['edge_media_to_caption']['edges']
+            paths.append(('caption', edges[0]['node']['text'] if edges
+                          else None))
+        if 'dimensions' in node:
+            dimensions = node['dimensions']
+            paths.append(('dimensions', (dimensions['width'],
+                                         dimensions['height'])))
+        if 'edge_liked_by' in node and 'edge_media_preview_like' not in node:
+            paths.append(('likes_count', node['edge_liked_by']['count']))
+        # Owner in nodes of tag and location pages has only id, absent
+        # location is False
+        owner = node.get('owner')
+        owner = Account.__record__(owner) if owner and 'username' in owner \
+            else None
+        location = False
+        if 'location' in node:
+            location = node['location']
+            location = Location.__record__(location) \
+                if location and 'id' in location else None
+        record.extend((owner, location))
+        return record
 
-class Media:
     def __init__(self, code):
         self.id = None
         self.code = code
@@ -1103,9 +1697,11 @@ class Media:
             self.caption = None
         if 'username' in data['owner']:
             self.owner = Account(data['owner']['username'])
+            self.owner.__setDataFromNode__(data['owner'])
         self.date = data['taken_at_timestamp']
         if 'location' in data and data['location'] and 'id' in data['location']:
             self.location = Location(data['location']['id'])
+            self.location.__setDataFromNode__(data['location'])
         self.likes_count = data['edge_media_preview_like']['count']
         self.comments_count = data['edge_media_to_comment']['count']
         self.comments_disabled = data['comments_disabled']
@@ -1116,8 +1712,35 @@ class Media:
             self.is_ad = data['is_ad']
         self.display_url = data['display_url']
 
+    def __setDataFromRecord__(self, record):
+        super().__setDataFromRecord__(record)
+        if record[0] is not None:
+            self.code = record[0]
+        owner, location = record[4:6]
+        if owner is not None:
+            self.owner = Account(owner[0])
+            self.owner.__setDataFromRecord__(owner)
+            self.__present__('owner')
+        if location is not False:
+            if location is not None:
+                self.location = Location(location[0])
+                self.location.__setDataFromRecord__(location)
+            self.__present__('location')
+
+
+class Location(Element):
+    __lazy_fields__ = frozenset((
+        'slug', 'name', 'has_public_page', 'directory', 'coordinates',
+        'media_count',
+    ))
+    __node_fields__ = {
+        'slug': ('slug',),
+        'name': ('name',),
+        'has_public_page': ('has_public_page',),
+        'directory': ('directory',),
+        'media_count': ('edge_location_to_media', 'count'),
+    }
 
-class Location:
     def __init__(self, id):
         self.id = id
         self.slug = None
@@ -1139,11 +1762,16 @@ class Location:
             self.directory = data['directory']
         self.coordinates = (data['lat'], data['lng'])
         self.media_count = data['edge_location_to_media']['count']
-        for node in data['edge_location_to_top_posts']['edges']:
-            self.top_posts.add(Media(node['node']['shortcode']))
+        for record in data['edge_location_to_top_posts']['edges']:
+            media = Media(record[0])
+            media.__setDataFromRecord__(record)
+            self.top_posts.add(media)
 
 
-class Tag:
+class Tag(Element):
+    __lazy_fields__ = frozenset(('media_count',))
+    __key__ = 'name'
+
     def __init__(self, name):
         self.name = name
         self.media_count = None
@@ -1154,11 +1782,15 @@ class Tag:
     def __setDataFromJSON__(self, data):
         self.name = data['name']
         self.media_count = data['edge_hashtag_to_media']['count']
-        for node in data['edge_hashtag_to_top_posts']['edges']:
-            self.top_posts.add(Media(node['node']['shortcode']))
+        for record in data['edge_hashtag_to_top_posts']['edges']:
+            media = Media(record[0])
+            media.__setDataFromRecord__(record)
+            self.top_posts.add(media)
 
 
 class Comment:
+    __key__ = 'id'
+
     def __init__(self, id, media, owner, text, created_at):
         self.id = id
         self.media = media
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+import json
+import re
+
+# Functions of module can be run in processes of parse executor
+SHARED_DATA_PATTERN = re.compile(
+    r"<script[^>]*>\s*window._sharedData\s*=\s*((?!<script>).*)\s*;\s*</script>")
+
+PAGES = {
+    'Account': ('ProfilePage', 'user'),
+    'Media': ('PostPage', 'shortcode_media'),
+    'Location': ('LocationsPage', 'location'),
+    'Tag': ('TagPage', 'hashtag'),
+}
+
+
+# Kind of page -> lists of edges in page and kind of their records
+PAGE_EDGES = {
+    'Account': (('edge_owner_to_timeline_media', 'media'),),
+    'Media': (('edge_media_to_comment', 'comment'),
+              ('edge_media_preview_like', 'account')),
+    'Location': (('edge_location_to_media', 'media'),
+                 ('edge_location_to_top_posts', 'media')),
+    'Tag': (('edge_hashtag_to_media', 'media'),
+            ('edge_hashtag_to_top_posts', 'media')),
+}
+
+
+def commentRecord(node):
+    return (node['id'], node['owner']['username'], node['text'],
+            node['created_at'])
+
+
+def idRecord(node):
+    return node['id']
+
+
+def compactEdges(data, kind):
+    # Nodes are replaced by compact records, so only values of fields are
+    # sent back from processes of parse executor
+    from .instagram import Account, Media
+
+    if kind == 'media':
+        record = Media.__record__
+    elif kind == 'account':
+        record = Account.__record__
+    elif kind == 'comment':
+        record = commentRecord
+    else:
+        record = idRecord
+    data['edges'] = [record(edge['node']) for edge in data['edges']]
+    return data
+
+
+def parsePage(content, encoding, kind):
+    match = SHARED_DATA_PATTERN.search(
+        content.decode(encoding or 'utf-8', errors='replace'))
+    data = json.loads(match.group(1))
+    page, key = PAGES[kind]
+    entity = data['entry_data'][page][0]['graphql'][key]
+    for name, edges in PAGE_EDGES[kind]:
+        if isinstance(entity.get(name), dict) and 'edges' in entity[name]:
+            compactEdges(entity[name], edges)
+    return {
+        'rhx_gis': data.get('rhx_gis'),
+        'csrf_token': data['config'].get('csrf_token'),
+        'data': entity,
+    }
+
+
+def parseJSON(content, encoding):
+    return json.loads(content.decode(encoding or 'utf-8', errors='replace'))
+
+
+def parseEdges(content, encoding, path, kind):
+    data = parseJSON(content, encoding)
+    for key in path:
+        data = data[key]
+    return compactEdges(data, kind)
@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from .instagram import Location, Tag
+
+
+class Target:
+    def __init__(self, obj, interval):
+        self.obj = obj
+        self.key = (obj.__class__.__name__, obj.name if isinstance(obj, Tag)
+                    else str(obj.id))
+        # Posts per second
+        self.rate = None
+        self.frequency = 1 / interval
+        self.interval = interval
+        self.media_count = None
+        self.polled_at = None
+        self.due = time()
+        self.errors = 0
+        self.version = 0
+        self.running = False
+        # Recently seen media codes
+        self.seen = OrderedDict()
+
+
+class PollingScheduler:
+    def __init__(self, budget=1.0, min_interval=60, max_interval=86400,
+                 items_per_poll=12, smoothing=0.3, seen_limit=1000):
+        # Check data
+        if not isinstance(budget, (int, float)) or budget <= 0:
+            raise TypeError("'budget' must be positive number")
+        if not isinstance(min_interval, (int, float)) or min_interval <= 0:
+            raise TypeError("'min_interval' must be positive number")
+        if not isinstance(max_interval, (int, float)) or \
+                max_interval < min_interval:
+            raise TypeError("'max_interval' must be not less 'min_interval'")
+        if not isinstance(items_per_poll, int) or items_per_poll < 1:
+            raise TypeError("'items_per_poll' must be positive int")
+        if not 0 < smoothing <= 1:
+            raise TypeError("'smoothing' must be in (0, 1]")
+        if not isinstance(seen_limit, int):
+            raise TypeError("'seen_limit' must be int type")
+
+        # Requests per second for all targets
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.items_per_poll = items_per_poll
+        self.smoothing = smoothing
+        self.seen_limit = seen_limit
+        self.targets = {}
+        self.__frequency__ = 0
+        self.__queue__ = []
+        self.__condition__ = threading.Condition()
+
+    def __len__(self):
+        return len(self.targets)
+
+    def add(self, obj):
+        # Check data
+        if not isinstance(obj, (Tag, Location)):
+            raise TypeError("'obj' must be Tag or Location type")
+
+        with self.__condition__:
+            target = Target(obj, self.min_interval)
+            if target.key in self.targets:
+                return self.targets[target.key]
+            self.targets[target.key] = target
+            self.__frequency__ += target.frequency
+            self.__push__(target)
+            self.__condition__.notify()
+            return target
+
+    def remove(self, obj):
+        with self.__condition__:
+            target = Target(obj, self.min_interval)
+            target = self.targets.pop(target.key, None)
+            if target is not None:
+                self.__frequency__ -= target.frequency
+                target.version += 1
+
+    def scale(self):
+        # Intervals are stretched when targets want more than budget
+        return max(1, self.__frequency__ / self.budget)
+
+    def next(self, timeout=None, stop=None):
+        deadline = None if timeout is None else time() + timeout
+        with self.__condition__:
+            while stop is None or not stop.is_set():
+                now = time()
+                while self.__queue__:
+                    due, _, version, target = self.__queue__[0]
+                    if version != target.version or \
+                            self.targets.get(target.key) is not target:
+                        heapq.heappop(self.__queue__)
+                        continue
+                    break
+                if self.__queue__ and self.__queue__[0][0] <= now:
+                    target = heapq.heappop(self.__queue__)[3]
+                    target.running = True
+                    return target
+                wait = self.__queue__[0][0] - now if self.__queue__ else None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else \
+                        min(wait, deadline - now)
+                if stop is not None:
+                    wait = 1 if wait is None else min(wait, 1)
+                self.__condition__.wait(wait)
+        return None
+
+    def observe(self, target, media_count, media_list, now=None):
+        if now is None:
+            now = time()
+        new = []
+        for media in media_list:
+            if media.code not in target.seen:
+                target.seen[media.code] = True
+                new.append(media)
+        while len(target.seen) > self.seen_limit:
+            target.seen.popitem(last=False)
+
+        if target.polled_at is None:
+            # First estimation by dates of media on the page
+            dates = sorted(vars(media)['date'] for media in media_list
+                           if vars(media)['date'])
+            rate = 0
+            if len(dates) > 1 and dates[-1] > dates[0]:
+                rate = (len(dates) - 1) / (dates[-1] - dates[0])
+        else:
+            delta = len(new)
+            if media_count is not None and target.media_count is not None:
+                delta = max(delta, media_count - target.media_count)
+            rate = delta / max(now - target.polled_at, 1e-6)
+            if target.rate is not None:
+                rate = self.smoothing * rate + \
+                       (1 - self.smoothing) * target.rate
+
+        with self.__condition__:
+            target.rate = rate
+            target.media_count = media_count
+            target.polled_at = now
+            target.errors = 0
+            frequency = min(max(rate / self.items_per_poll,
+                                1 / self.max_interval), 1 / self.min_interval)
+            if target.key in self.targets:
+                self.__frequency__ += frequency - target.frequency
+            target.frequency = frequency
+            target.interval = self.scale() / frequency
+            self.__reschedule__(target, now + target.interval)
+        return new
+
+    def fail(self, target, now=None):
+        if now is None:
+            now = time()
+        with self.__condition__:
+            target.errors += 1
+            interval = min(target.interval * 2 ** target.errors,
+                           self.max_interval)
+            self.__reschedule__(target, now + interval)
+
+    def poll(self, agent, target, settings={}):
+        media_list, _ = agent.getMedia(target.obj, count=self.items_per_poll,
+                                       settings=dict(settings))
+        return self.observe(target, vars(target.obj)['media_count'],
+                            media_list)
+
+    def run(self, agent, workers=4, callback=None, settings={}, stop=None):
+        # Check data
+        if not isinstance(workers, int) or workers < 1:
+            raise TypeError("'workers' must be positive int")
+        if not isinstance(settings, dict):
+            raise TypeError("'settings' must be dict type")
+        if stop is None:
+            stop = threading.Event()
+
+        slots = threading.Semaphore(workers)
+
+        def work(target):
+            try:
+                new = self.poll(agent, target, settings)
+            except Exception:
+                self.fail(target)
+                return
+            finally:
+                slots.release()
+            if callback is not None and new:
+                callback(target.obj, new)
+
+        with ThreadPoolExecutor(workers) as executor:
+            while not stop.is_set():
+                slots.acquire()
+                target = self.next(stop=stop)
+                if target is None:
+                    slots.release()
+                    break
+                executor.submit(work, target)
+                # Global request budget
+                stop.wait(1 / self.budget)
+
+    def __reschedule__(self, target, due):
+        target.running = False
+        target.due = due
+        target.version += 1
+        if self.targets.get(target.key) is target:
+            self.__push__(target)
+            self.__condition__.notify()
+
+    def __push__(self, target):
+        heapq.heappush(self.__queue__,
+                       (target.due, id(target), target.version, target))
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from time import perf_counter
+
+PHASES = ('network', 'decode', 'model', 'backoff')
+
+# Peak of traced memory can be reset since Python 3.9
+RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+class Frame:
+    __slots__ = ('name', 'path', 'start', 'blocks', 'phases', 'children')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.start = perf_counter()
+        self.blocks = sys.getallocatedblocks()
+        self.phases = Counter()
+        # Wall time of nested calls
+        self.children = 0.0
+
+
+# Blocks and peak of memory are values of whole process, so they include
+# memory of concurrent calls of other threads. Peak is reset only when no
+# other outer call is measured
+class Profiler:
+    def __init__(self, memory=True):
+        # Tracing of memory is needed only for peaks of memory
+        self.memory = memory
+        # method -> statistics of calls
+        self.stats = {}
+        # Folded stacks for flamegraph: "method;method;phase" -> microseconds
+        self.folded = Counter()
+        self.__local__ = threading.local()
+        self.__lock__ = threading.Lock()
+        self.__started_tracing__ = False
+        # Count of threads with outer calls
+        self.__active__ = 0
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing__ = True
+
+    def stop(self):
+        if self.__started_tracing__:
+            tracemalloc.stop()
+            self.__started_tracing__ = False
+
+    def enter(self, name):
+        stack = self.__stack__()
+        path = stack[-1].path + ';' + name if stack else name
+        if not stack:
+            with self.__lock__:
+                self.__active__ += 1
+                if self.__active__ == 1 and RESET_PEAK and self.memory and \
+                        tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+        stack.append(Frame(name, path))
+
+    def exit(self):
+        stack = self.__stack__()
+        frame = stack.pop()
+        wall = perf_counter() - frame.start
+        if stack:
+            stack[-1].children += wall
+        # Time, which is not spent in other phases, is spent for models
+        own = wall - frame.children
+        frame.phases['model'] += max(own - sum(frame.phases.values()), 0)
+        peak = None
+        if not stack and RESET_PEAK and self.memory and \
+                tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+
+        with self.__lock__:
+            if not stack:
+                self.__active__ -= 1
+            stats = self.stats.get(frame.name)
+            if stats is None:
+                stats = self.stats[frame.name] = dict(
+                    calls=0, wall=0.0, blocks=0, peak=0,
+                    **{phase: 0.0 for phase in PHASES})
+            stats['calls'] += 1
+            stats['wall'] += wall
+            stats['blocks'] += sys.getallocatedblocks() - frame.blocks
+            if peak is not None:
+                stats['peak'] = max(stats['peak'], peak)
+            for phase, value in frame.phases.items():
+                stats[phase] += value
+                self.folded[frame.path + ';' + phase] += int(value * 1000000)
+
+    def add(self, phase, start):
+        stack = self.__stack__()
+        if stack:
+            stack[-1].phases[phase] += perf_counter() - start
+
+    def report(self):
+        lines = ["{0:<20} {1:>6} {2:>10} {3:>10} {4:>10} {5:>10} {6:>10} "
+                 "{7:>10} {8:>10}".format(
+                     'method', 'calls', 'wall, s', 'network', 'decode',
+                     'model', 'backoff', 'blocks', 'peak, KB')]
+        with self.__lock__:
+            for name, stats in sorted(self.stats.items(),
+                                      key=lambda item: -item[1]['wall']):
+                lines.append(
+                    "{0:<20} {1:>6} {2:>10.3f} {3:>10.3f} {4:>10.3f} "
+                    "{5:>10.3f} {6:>10.3f} {7:>10} {8:>10}".format(
+                        name, stats['calls'], stats['wall'],
+                        stats['network'], stats['decode'], stats['model'],
+                        stats['backoff'], stats['blocks'],
+                        stats['peak'] // 1024))
+        return "\n".join(lines)
+
+    def flamegraph(self, file=None):
+        # Folded stacks format of flamegraph.pl and speedscope
+        with self.__lock__:
+            lines = ["{0} {1}".format(path, value)
+                     for path, value in sorted(self.folded.items()) if value]
+        if file is not None:
+            with open(file, 'w') as f:
+                f.write("\n".join(lines) + "\n")
+        return "\n".join(lines)
+
+    def __stack__(self):
+        stack = getattr(self.__local__, 'stack', None)
+        if stack is None:
+            stack = self.__local__.stack = []
+        return stack
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+import threading
+from time import time
+
+from .exceptions import ProxyPoolExhausted
+from .transport import RequestsTransport, Transport
+
+
+def cookieJar():
+    # Jar with interface of dict, if requests is installed
+    try:
+        from requests.cookies import RequestsCookieJar
+    except ImportError:
+        from http.cookiejar import CookieJar
+
+        return CookieJar()
+    return RequestsCookieJar()
+
+
+class ProxyState:
+    def __init__(self, url, rate, burst):
+        self.url = url
+        # Token bucket of proxy
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time()
+        # Health
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.success_rate = 1.0
+        self.latency = None
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+        self.in_flight = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def score(self):
+        return self.success_rate / ((self.latency or 0.1) + 0.01) / \
+               (self.in_flight + 1)
+
+
+class ProxyPool:
+    def __init__(self, proxies=(), rate=1.0, burst=None, failures=3,
+                 cooldown=30, max_cooldown=600, smoothing=0.2):
+        # Check data
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise TypeError("'rate' must be positive number")
+        if not isinstance(failures, int) or failures < 1:
+            raise TypeError("'failures' must be positive int")
+        if not isinstance(cooldown, (int, float)) or cooldown < 0:
+            raise TypeError("'cooldown' must be not negative number")
+
+        # Requests per second for every proxy
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.failures = failures
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.smoothing = smoothing
+        self.proxies = {}
+        self.__condition__ = threading.Condition()
+        for proxy in proxies:
+            self.add(proxy)
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def add(self, url, rate=None, burst=None):
+        # Check data
+        if not isinstance(url, str):
+            raise TypeError("'url' must be str type")
+
+        with self.__condition__:
+            self.proxies[url] = ProxyState(url, rate or self.rate,
+                                           burst or self.burst)
+            self.__condition__.notify_all()
+
+    def remove(self, url):
+        with self.__condition__:
+            self.proxies.pop(url, None)
+
+    def acquire(self, timeout=60):
+        deadline = time() + timeout
+        with self.__condition__:
+            while True:
+                now = time()
+                best = None
+                wait = None
+                for state in self.proxies.values():
+                    if state.ejected_until is not None:
+                        if state.ejected_until > now:
+                            need = state.ejected_until - now
+                            wait = need if wait is None else min(wait, need)
+                            continue
+                        # Re-admitted proxy gets only one probe request
+                        if state.in_flight:
+                            continue
+                    state.refill(now)
+                    if state.tokens < 1:
+                        need = (1 - state.tokens) / state.rate
+                        wait = need if wait is None else min(wait, need)
+                        continue
+                    if best is None or state.score() > best.score():
+                        best = state
+                if best is not None:
+                    best.tokens -= 1
+                    best.in_flight += 1
+                    best.requests += 1
+                    return best.url
+                if now >= deadline:
+                    raise ProxyPoolExhausted(timeout)
+                self.__condition__.wait(min(wait or 1, deadline - now))
+
+    def release(self, url, latency=None, status_code=None, error=None):
+        with self.__condition__:
+            state = self.proxies.get(url)
+            if state is None:
+                return
+            state.in_flight -= 1
+            failed = error is not None or status_code in (403, 407, 429) or \
+                (status_code is not None and status_code >= 500)
+            if status_code == 429:
+                state.rate_limited += 1
+            state.success_rate = (1 - self.smoothing) * state.success_rate + \
+                self.smoothing * (0 if failed else 1)
+            if latency is not None and not failed:
+                state.latency = latency if state.latency is None else \
+                    (1 - self.smoothing) * state.latency + \
+                    self.smoothing * latency
+            if failed:
+                state.failures += 1
+                state.consecutive_failures += 1
+                # Rate limited proxy is ejected at once
+                if state.consecutive_failures >= self.failures or \
+                        status_code == 429:
+                    state.ejections += 1
+                    state.ejected_until = time() + min(
+                        self.cooldown * 2 ** (state.ejections - 1),
+                        self.max_cooldown)
+                    state.tokens = 0
+            else:
+                state.successes += 1
+                state.consecutive_failures = 0
+                if state.ejected_until is not None:
+                    state.ejected_until = None
+                    state.ejections = 0
+            self.__condition__.notify_all()
+
+    def stats(self):
+        with self.__condition__:
+            now = time()
+            return {url: {
+                'requests': state.requests,
+                'successes': state.successes,
+                'failures': state.failures,
+                'rate_limited': state.rate_limited,
+                'success_rate': state.success_rate,
+                'latency': state.latency,
+                'healthy': state.ejected_until is None or
+                state.ejected_until <= now,
+            } for url, state in self.proxies.items()}
+
+
+class ProxyTransport(Transport):
+    def __init__(self, pool, transport=None, factory=None, timeout=60):
+        # Check data
+        if not isinstance(pool, ProxyPool):
+            raise TypeError("'pool' must be ProxyPool type")
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError("'transport' must be Transport type")
+
+        self.pool = pool
+        self.timeout = timeout
+        # Factory creates own transport for every proxy, else proxy is given
+        # to shared transport in every request
+        self.factory = factory
+        self.transport = transport
+        if factory is None and transport is None:
+            self.transport = RequestsTransport()
+        self.__transports__ = {}
+        # Transports of proxies share one jar, so session of login is kept
+        # for all proxies
+        self.__cookies__ = None if factory is None else cookieJar()
+        self.__lock__ = threading.Lock()
+
+    @property
+    def cookies(self):
+        if self.transport is not None:
+            return self.transport.cookies
+        return self.__cookies__
+
+    @property
+    def encodings(self):
+        if self.transport is not None:
+            return self.transport.encodings
+        # Factory makes transports of one backend, so encodings of transport
+        # of any proxy are encodings of all proxies
+        proxy = next(iter(self.pool.proxies), None)
+        if proxy is None:
+            return super().encodings
+        return self.__transport__(proxy).encodings
+
+    def request(self, method, url, **kwargs):
+        proxy = self.pool.acquire(self.timeout)
+        if self.factory is None:
+            transport = self.transport
+            kwargs['proxies'] = {'http': proxy, 'https': proxy}
+        else:
+            transport = self.__transport__(proxy)
+        start = time()
+        try:
+            response = transport.request(method, url, **kwargs)
+        except Exception as e:
+            self.pool.release(proxy, time() - start, error=e)
+            raise
+        self.pool.release(proxy, time() - start, response.status_code)
+        return response
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+        for transport in self.__transports__.values():
+            transport.close()
+
+    def __transport__(self, proxy):
+        with self.__lock__:
+            transport = self.__transports__.get(proxy)
+            if transport is None:
+                transport = self.factory(proxy)
+                transport.cookies = self.__cookies__
+                self.__transports__[proxy] = transport
+            return transport
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import time
+
+
+def elementKey(obj):
+    # Elements are kept by key field of their class
+    name = getattr(obj.__class__, '__key__', None)
+    return obj if name is None else getattr(obj, name)
+
+
+class Collection(ABC):
+    def __init__(self, items=()):
+        self.update(items)
+
+    def __len__(self):
+        return len(self.__items__)
+
+    def __iter__(self):
+        return iter(list(self.__items__.values()))
+
+    def __contains__(self, obj):
+        return elementKey(obj) in self.__items__
+
+    @abstractmethod
+    def add(self, obj):
+        pass
+
+    def update(self, items):
+        for obj in items:
+            self.add(obj)
+
+    def discard(self, obj):
+        self.__items__.pop(elementKey(obj), None)
+
+    def difference_update(self, items):
+        for obj in items:
+            self.discard(obj)
+
+    def clear(self):
+        self.__items__.clear()
+
+
+class NullCollection(Collection):
+    __items__ = {}
+
+    def add(self, obj):
+        pass
+
+
+class LRUCollection(Collection):
+    def __init__(self, size, items=()):
+        # Check data
+        if not isinstance(size, int) or size < 0:
+            raise TypeError("'size' must be not negative int")
+
+        self.size = size
+        self.__items__ = OrderedDict()
+        super().__init__(items)
+
+    def add(self, obj):
+        key = elementKey(obj)
+        self.__items__.pop(key, None)
+        self.__items__[key] = obj
+        while len(self.__items__) > self.size:
+            self.__items__.popitem(last=False)
+
+
+class WindowCollection(Collection):
+    def __init__(self, window, items=()):
+        # Check data
+        if not isinstance(window, (int, float)) or window < 0:
+            raise TypeError("'window' must be not negative number")
+
+        self.window = window
+        self.__items__ = OrderedDict()
+        self.__times__ = OrderedDict()
+        super().__init__(items)
+
+    def __len__(self):
+        self.__prune__()
+        return len(self.__items__)
+
+    def __iter__(self):
+        self.__prune__()
+        return super().__iter__()
+
+    def add(self, obj):
+        key = elementKey(obj)
+        self.__items__.pop(key, None)
+        self.__times__.pop(key, None)
+        self.__items__[key] = obj
+        self.__times__[key] = time()
+        self.__prune__()
+
+    def discard(self, obj):
+        super().discard(obj)
+        self.__times__.pop(elementKey(obj), None)
+
+    def clear(self):
+        super().clear()
+        self.__times__.clear()
+
+    def __prune__(self):
+        border = time() - self.window
+        while self.__times__:
+            key, added_at = next(iter(self.__times__.items()))
+            if added_at >= border:
+                break
+            self.__times__.popitem(last=False)
+            self.__items__.pop(key, None)
+
+
+class IdCollection(Collection):
+    def __init__(self, items=()):
+        self.__items__ = set()
+        super().__init__(items)
+
+    def __iter__(self):
+        return iter(list(self.__items__))
+
+    def add(self, obj):
+        self.__items__.add(elementKey(obj))
+
+    def discard(self, obj):
+        self.__items__.discard(elementKey(obj))
+
+
+RETENTION_MODES = ('all', 'off', 'lru', 'window', 'ids')
+
+
+def createCollection(mode='all', size=None, window=None, items=()):
+    if mode == 'all':
+        return set(items)
+    elif mode == 'off':
+        return NullCollection()
+    elif mode == 'lru':
+        return LRUCollection(size, items)
+    elif mode == 'window':
+        return WindowCollection(window, items)
+    elif mode == 'ids':
+        return IdCollection(items)
+    raise ValueError("'mode' must be one of {0}".format(
+        ", ".join(RETENTION_MODES)))
+
+
+def setRetention(obj, name, mode='all', size=None, window=None):
+    # Check data
+    if name not in ('media', 'top_posts', 'follows', 'followers', 'likes',
+                    'comments') or not isinstance(getattr(obj, name, None),
+                                                  (set, Collection)):
+        raise ValueError("'{0}' haven't collection '{1}'".format(
+            obj.__repr__(), name))
+
+    setattr(obj, name, createCollection(mode, size, window, getattr(obj, name)))
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+import heapq
+import itertools
+import threading
+from collections import deque
+from time import time
+
+from .breaker import endpointClass
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+
+# Priority of requests in current thread
+class Priority:
+    __local__ = threading.local()
+
+    def __init__(self, name):
+        # Check data
+        if not isinstance(name, str):
+            raise TypeError("'name' must be str type")
+
+        self.name = name
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(Priority.__local__, 'name', None)
+        Priority.__local__.name = self.name
+        return self
+
+    def __exit__(self, *args):
+        Priority.__local__.name = self.previous
+
+    @staticmethod
+    def current():
+        return getattr(Priority.__local__, 'name', None)
+
+
+class PriorityClass:
+    def __init__(self, name, weight, window):
+        self.name = name
+        self.weight = weight
+        # Virtual finish time of last queued request
+        self.finish = 0.0
+        self.depth = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.wait = 0.0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=window)
+
+
+class RequestScheduler:
+    def __init__(self, rate, burst=1, weights=None, window=1000):
+        # Check data
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise TypeError("'rate' must be positive number")
+        if weights is None:
+            weights = {INTERACTIVE: 10, BULK: 1}
+        if not isinstance(weights, dict):
+            raise TypeError("'weights' must be dict type")
+        for name, weight in weights.items():
+            if not isinstance(weight, (int, float)) or weight <= 0:
+                raise TypeError("Weight of '{0}' must be positive number"
+                                .format(name))
+
+        # Requests per second for all classes
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.classes = {name: PriorityClass(name, weight, window)
+                        for name, weight in weights.items()}
+        self.__tokens__ = burst
+        self.__refilled_at__ = time()
+        # Virtual time of weighted fair queue
+        self.__virtual__ = 0.0
+        self.__queue__ = []
+        self.__counter__ = itertools.count()
+        self.__condition__ = threading.Condition()
+
+    def classify(self, method, url, params=None):
+        # Pages of graphql are bulk work, if priority is not set by caller
+        priority = Priority.current()
+        if priority is not None:
+            return priority
+        if endpointClass(method, url, params).startswith('graphql'):
+            return BULK
+        return INTERACTIVE
+
+    def acquire(self, priority=INTERACTIVE, timeout=None, deadline=None):
+        start = time()
+        with self.__condition__:
+            cls = self.classes.get(priority)
+            if cls is None:
+                raise ValueError("Unknown priority '{0}'".format(priority))
+            cls.finish = max(self.__virtual__, cls.finish) + 1 / cls.weight
+            entry = (cls.finish, next(self.__counter__), cls)
+            heapq.heappush(self.__queue__, entry)
+            cls.depth += 1
+            try:
+                while True:
+                    now = time()
+                    self.__tokens__ = min(
+                        self.burst,
+                        self.__tokens__ + (now - self.__refilled_at__) *
+                        self.rate)
+                    self.__refilled_at__ = now
+                    if deadline is not None and deadline.cancelled:
+                        self.__leave__(cls, entry)
+                        return False
+                    wait = None
+                    if self.__queue__[0] is entry:
+                        if self.__tokens__ >= 1:
+                            heapq.heappop(self.__queue__)
+                            self.__tokens__ -= 1
+                            self.__virtual__ = entry[0]
+                            self.__record__(cls, now - start)
+                            # Next request in queue can take token
+                            self.__condition__.notify_all()
+                            return True
+                        wait = (1 - self.__tokens__) / self.rate
+                    if timeout is not None:
+                        rest = start + timeout - now
+                        if rest <= 0:
+                            self.__leave__(cls, entry)
+                            return False
+                        wait = rest if wait is None else min(wait, rest)
+                    # Cancellation of tokens doesn't notify condition, so
+                    # waiting is split to short parts
+                    if deadline is not None and deadline.tokens:
+                        wait = 0.05 if wait is None else min(wait, 0.05)
+                    self.__condition__.wait(wait)
+            finally:
+                cls.depth -= 1
+
+    def stats(self):
+        with self.__condition__:
+            stats = {}
+            for name, cls in self.classes.items():
+                waits = sorted(cls.waits)
+                stats[name] = {
+                    'weight': cls.weight,
+                    'depth': cls.depth,
+                    'requests': cls.requests,
+                    'timeouts': cls.timeouts,
+                    'mean_wait': cls.wait / cls.requests if cls.requests
+                    else 0.0,
+                    'p95_wait': waits[min(int(len(waits) * 0.95),
+                                          len(waits) - 1)] if waits else 0.0,
+                    'max_wait': cls.max_wait,
+                }
+            return stats
+
+    def __leave__(self, cls, entry):
+        # Request leaves queue by timeout or cancellation
+        cls.timeouts += 1
+        self.__queue__.remove(entry)
+        heapq.heapify(self.__queue__)
+        self.__condition__.notify_all()
+
+    def __record__(self, cls, wait):
+        cls.requests += 1
+        cls.wait += wait
+        cls.max_wait = max(cls.max_wait, wait)
+        cls.waits.append(wait)
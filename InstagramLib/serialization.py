@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+import struct
+
+from .instagram import Account, Comment, Location, Media, Tag
+
+# Kind -> (class, key field, fields of flat record)
+# Fields with elements are written as keys of elements
+KINDS = (
+    (Account, 'login', (
+        'id', 'full_name', 'profile_pic_url', 'profile_pic_url_hd', 'fb_page',
+        'biography', 'follows_count', 'followers_count', 'media_count',
+        'is_private', 'is_verified', 'country_block',
+    )),
+    (Media, 'code', (
+        'id', 'caption', 'owner', 'date', 'location', 'likes_count',
+        'comments_count', 'comments_disabled', 'is_video', 'video_url',
+        'is_ad', 'display_url', 'dimensions',
+    )),
+    (Location, 'id', (
+        'slug', 'name', 'has_public_page', 'directory', 'coordinates',
+        'media_count',
+    )),
+    (Tag, 'name', ('media_count',)),
+    (Comment, 'id', ('media', 'owner', 'text', 'created_at')),
+)
+KIND_INDEXES = {cls: index for index, (cls, _, _) in enumerate(KINDS)}
+# Field -> class of element in it
+REFERENCES = {'owner': Account, 'location': Location, 'media': Media}
+TUPLES = ('dimensions', 'coordinates')
+CODECS = ('struct', 'msgpack')
+
+MAGIC = b'IL'
+VERSION = 1
+
+NONE, TRUE, FALSE, INT, FLOAT, STR, BYTES, LIST, DICT, BIGINT = range(10)
+HEADER = struct.Struct('<2sBBI')
+INT64 = struct.Struct('<Bq')
+FLOAT64 = struct.Struct('<Bd')
+SIZE = struct.Struct('<BI')
+UINT32 = struct.Struct('<I')
+
+
+def toRecord(obj):
+    # Check data
+    kind = KIND_INDEXES.get(obj.__class__)
+    if kind is None:
+        for cls, index in KIND_INDEXES.items():
+            if isinstance(obj, cls):
+                kind = index
+                break
+        else:
+            raise TypeError(
+                "obj must be Account, Media, Location, Tag or Comment")
+
+    _, key, fields = KINDS[kind]
+    # Values are read from __dict__ for skip lazy loading of fields
+    data = vars(obj)
+    record = [kind, data[key]]
+    for name in fields:
+        value = data.get(name)
+        if name in REFERENCES and value is not None:
+            value = vars(value)[KINDS[KIND_INDEXES[REFERENCES[name]]][1]]
+        record.append(value)
+    return record
+
+
+def fromRecord(record, cache=None):
+    # Cache of elements by kind and key is shared by records of batch, so
+    # references to the same element are restored as one object
+    if cache is None:
+        cache = {}
+    kind = record[0]
+    cls, key, fields = KINDS[kind]
+    obj = cache.get((kind, record[1]))
+    if obj is None:
+        if cls is Comment:
+            obj = Comment(record[1], None, None, None, None)
+        else:
+            obj = cls(record[1])
+        cache[(kind, record[1])] = obj
+    for name, value in zip(fields, record[2:]):
+        if value is not None:
+            if name in REFERENCES:
+                value = referenceElement(REFERENCES[name], value, cache)
+            elif name in TUPLES:
+                value = tuple(value)
+        setattr(obj, name, value)
+    return obj
+
+
+def referenceElement(cls, key, cache):
+    kind = KIND_INDEXES[cls]
+    obj = cache.get((kind, key))
+    if obj is None:
+        obj = cache[(kind, key)] = cls(key)
+    return obj
+
+
+def dumps(objects, codec='struct'):
+    # Check data
+    if codec not in CODECS:
+        raise ValueError("Unknown codec '{0}'".format(codec))
+
+    records = [toRecord(obj) for obj in objects]
+    buffer = bytearray(HEADER.pack(MAGIC, VERSION, CODECS.index(codec),
+                                   len(records)))
+    if codec == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("Codec 'msgpack' requires 'msgpack' package")
+
+        buffer += msgpack.packb(records, use_bin_type=True)
+    else:
+        # All records are written to one buffer without intermediate bytes
+        for record in records:
+            buffer.append(record[0])
+            for value in record[1:]:
+                # Fast path for the most frequent types of fields
+                if value is None:
+                    buffer.append(NONE)
+                elif value.__class__ is str:
+                    value = value.encode('utf-8')
+                    buffer += SIZE.pack(STR, len(value))
+                    buffer += value
+                else:
+                    packValue(buffer, value)
+    # Buffer is returned without copy to bytes
+    return buffer
+
+
+def loads(data, cache=None):
+    view = memoryview(data)
+    magic, version, codec, count = HEADER.unpack_from(view, 0)
+    # Check data
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Data is not serialized by InstagramLib")
+
+    if cache is None:
+        cache = {}
+    if CODECS[codec] == 'msgpack':
+        import msgpack
+
+        records = msgpack.unpackb(view[HEADER.size:], raw=False,
+                                  use_list=True)
+    else:
+        records = []
+        offset = HEADER.size
+        for _ in range(count):
+            kind = view[offset]
+            offset += 1
+            record = [kind]
+            for _ in range(len(KINDS[kind][2]) + 1):
+                tag = view[offset]
+                if tag == NONE:
+                    record.append(None)
+                    offset += 1
+                elif tag == STR:
+                    size = UINT32.unpack_from(view, offset + 1)[0]
+                    offset += SIZE.size
+                    record.append(str(view[offset:offset + size], 'utf-8'))
+                    offset += size
+                else:
+                    value, offset = unpackValue(view, offset)
+                    record.append(value)
+            records.append(record)
+    return [fromRecord(record, cache) for record in records]
+
+
+def packValue(buffer, value):
+    if value is None:
+        buffer.append(NONE)
+    elif value is True:
+        buffer.append(TRUE)
+    elif value is False:
+        buffer.append(FALSE)
+    elif isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            buffer += INT64.pack(INT, value)
+        else:
+            value = str(value).encode('ascii')
+            buffer += SIZE.pack(BIGINT, len(value))
+            buffer += value
+    elif isinstance(value, float):
+        buffer += FLOAT64.pack(FLOAT, value)
+    elif isinstance(value, str):
+        value = value.encode('utf-8')
+        buffer += SIZE.pack(STR, len(value))
+        buffer += value
+    elif isinstance(value, (bytes, bytearray)):
+        buffer += SIZE.pack(BYTES, len(value))
+        buffer += value
+    elif isinstance(value, (list, tuple)):
+        buffer += SIZE.pack(LIST, len(value))
+        for item in value:
+            packValue(buffer, item)
+    elif isinstance(value, dict):
+        buffer += SIZE.pack(DICT, len(value))
+        for key, item in value.items():
+            packValue(buffer, key)
+            packValue(buffer, item)
+    else:
+        raise TypeError("Cannot serialize value of '{0}' type".format(
+            value.__class__.__name__))
+
+
+def unpackValue(view, offset):
+    tag = view[offset]
+    if tag == NONE:
+        return None, offset + 1
+    if tag == TRUE:
+        return True, offset + 1
+    if tag == FALSE:
+        return False, offset + 1
+    if tag == INT:
+        return INT64.unpack_from(view, offset)[1], offset + INT64.size
+    if tag == FLOAT:
+        return FLOAT64.unpack_from(view, offset)[1], offset + FLOAT64.size
+    size = UINT32.unpack_from(view, offset + 1)[0]
+    offset += SIZE.size
+    if tag == STR:
+        return str(view[offset:offset + size], 'utf-8'), offset + size
+    if tag == BYTES:
+        return bytes(view[offset:offset + size]), offset + size
+    if tag == BIGINT:
+        return int(str(view[offset:offset + size], 'ascii')), offset + size
+    if tag == LIST:
+        items = []
+        for _ in range(size):
+            item, offset = unpackValue(view, offset)
+            items.append(item)
+        return items, offset
+    if tag == DICT:
+        items = {}
+        for _ in range(size):
+            key, offset = unpackValue(view, offset)
+            items[key], offset = unpackValue(view, offset)
+        return items, offset
+    raise ValueError("Unknown type of value {0}".format(tag))
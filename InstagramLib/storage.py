@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+import sqlite3
+import threading
+from time import time
+
+from .instagram import Account, Comment, Location, Media, Tag
+
+
+# Tables: name -> (key columns, value columns)
+TABLES = {
+    'accounts': (('login',), (
+        'id', 'full_name', 'biography', 'profile_pic_url', 'follows_count',
+        'followers_count', 'media_count', 'is_private', 'is_verified',
+        'updated_at',
+    )),
+    'media': (('code',), (
+        'id', 'owner_login', 'caption', 'date', 'location_id', 'likes_count',
+        'comments_count', 'comments_disabled', 'is_video', 'video_url',
+        'display_url', 'updated_at',
+    )),
+    'comments': (('id',), (
+        'media_code', 'owner_login', 'text', 'created_at', 'updated_at',
+    )),
+    'locations': (('id',), (
+        'slug', 'name', 'lat', 'lng', 'media_count', 'updated_at',
+    )),
+    'tags': (('name',), ('media_count', 'updated_at')),
+    'follows': (('follower_id', 'followed_id'), ('updated_at',)),
+    'likes': (('media_code', 'account_id'), ('updated_at',)),
+    'tag_media': (('tag_name', 'media_code'), ('updated_at',)),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    login TEXT PRIMARY KEY, id INTEGER, full_name TEXT, biography TEXT,
+    profile_pic_url TEXT, follows_count INTEGER, followers_count INTEGER,
+    media_count INTEGER, is_private INTEGER, is_verified INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS media (
+    code TEXT PRIMARY KEY, id INTEGER, owner_login TEXT, caption TEXT,
+    date INTEGER, location_id INTEGER, likes_count INTEGER,
+    comments_count INTEGER, comments_disabled INTEGER, is_video INTEGER,
+    video_url TEXT, display_url TEXT, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY, media_code TEXT, owner_login TEXT, text TEXT,
+    created_at INTEGER, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY, slug TEXT, name TEXT, lat REAL, lng REAL,
+    media_count INTEGER, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    name TEXT PRIMARY KEY, media_count INTEGER, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS follows (
+    follower_id INTEGER, followed_id INTEGER, updated_at REAL,
+    PRIMARY KEY (follower_id, followed_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS likes (
+    media_code TEXT, account_id INTEGER, updated_at REAL,
+    PRIMARY KEY (media_code, account_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tag_media (
+    tag_name TEXT, media_code TEXT, updated_at REAL,
+    PRIMARY KEY (tag_name, media_code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS accounts_id ON accounts (id);
+CREATE INDEX IF NOT EXISTS media_id ON media (id);
+CREATE INDEX IF NOT EXISTS media_owner ON media (owner_login);
+CREATE INDEX IF NOT EXISTS media_date ON media (date);
+CREATE INDEX IF NOT EXISTS media_location ON media (location_id);
+CREATE INDEX IF NOT EXISTS comments_media ON comments (media_code);
+CREATE INDEX IF NOT EXISTS comments_created_at ON comments (created_at);
+CREATE INDEX IF NOT EXISTS follows_followed ON follows (followed_id);
+CREATE INDEX IF NOT EXISTS likes_account ON likes (account_id);
+"""
+
+
+def toInt(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Storage:
+    def __init__(self, path, batch_size=1000):
+        # Check data
+        if not isinstance(path, str):
+            raise TypeError("'path' must be str type")
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise TypeError("'batch_size' must be positive int")
+
+        self.path = path
+        self.batch_size = batch_size
+        self.__lock__ = threading.RLock()
+        self.__buffer__ = {table: [] for table in TABLES}
+        self.__size__ = 0
+        self.__queries__ = {}
+        for table, (keys, values) in TABLES.items():
+            self.__queries__[table] = \
+                "INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT ({3}) DO " \
+                "UPDATE SET {4}".format(
+                    table,
+                    ", ".join(keys + values),
+                    ", ".join("?" * (len(keys) + len(values))),
+                    ", ".join(keys),
+                    ", ".join("{0}=coalesce(excluded.{0}, {0})".format(value)
+                              for value in values),
+                )
+
+        self.connection = sqlite3.connect(path, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, obj, relation=None, parent=None):
+        # Values are read from __dict__ for skip lazy loading of fields
+        data = vars(obj)
+        now = time()
+        if isinstance(obj, Account):
+            self.__append__('accounts', (
+                obj.login, toInt(data['id']), data['full_name'],
+                data['biography'], data['profile_pic_url'],
+                data['follows_count'], data['followers_count'],
+                data['media_count'], data['is_private'], data['is_verified'],
+                now,
+            ))
+            if relation == 'follower':
+                self.addFollow(obj, parent)
+            elif relation == 'follow':
+                self.addFollow(parent, obj)
+            elif relation == 'like':
+                self.addLike(parent, obj)
+        elif isinstance(obj, Media):
+            owner = data['owner']
+            if owner is None and isinstance(parent, Account):
+                owner = parent
+            location = data['location']
+            if location is None and isinstance(parent, Location):
+                location = parent
+            self.__append__('media', (
+                obj.code, toInt(data['id']),
+                owner.login if isinstance(owner, Account) else None,
+                data['caption'], data['date'],
+                toInt(location.id) if isinstance(location, Location) else None,
+                data['likes_count'] if isinstance(data['likes_count'], int)
+                else None,
+                data['comments_count'], data['comments_disabled'],
+                data['is_video'], data['video_url'], data['display_url'], now,
+            ))
+            if isinstance(parent, Tag):
+                self.__append__('tag_media', (parent.name, obj.code, now))
+        elif isinstance(obj, Comment):
+            self.__append__('comments', (
+                toInt(obj.id),
+                obj.media.code if isinstance(obj.media, Media) else None,
+                obj.owner.login if isinstance(obj.owner, Account) else None,
+                obj.text, obj.created_at, now,
+            ))
+        elif isinstance(obj, Location):
+            coordinates = data['coordinates'] or (None, None)
+            self.__append__('locations', (
+                toInt(obj.id), data['slug'], data['name'], coordinates[0],
+                coordinates[1], data['media_count'], now,
+            ))
+        elif isinstance(obj, Tag):
+            self.__append__('tags', (obj.name, data['media_count'], now))
+        else:
+            raise TypeError(
+                "obj must be Account, Media, Comment, Location or Tag")
+
+    def addFollow(self, follower, followed):
+        # Check data
+        if not isinstance(follower, Account):
+            raise TypeError("'follower' must be Account type")
+        if not isinstance(followed, Account):
+            raise TypeError("'followed' must be Account type")
+
+        self.__append__('follows', (toInt(vars(follower)['id']),
+                                 toInt(vars(followed)['id']), time()))
+
+    def addLike(self, media, account):
+        # Check data
+        if not isinstance(media, Media):
+            raise TypeError("'media' must be Media type")
+        if not isinstance(account, Account):
+            raise TypeError("'account' must be Account type")
+
+        self.__append__('likes', (media.code, toInt(vars(account)['id']),
+                               time()))
+
+    def flush(self):
+        with self.__lock__:
+            if not self.__size__:
+                return
+            self.connection.execute("BEGIN")
+            try:
+                for table, rows in self.__buffer__.items():
+                    if rows:
+                        self.connection.executemany(self.__queries__[table],
+                                                    rows)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+            for rows in self.__buffer__.values():
+                rows.clear()
+            self.__size__ = 0
+
+    def close(self):
+        with self.__lock__:
+            self.flush()
+            self.connection.close()
+
+    def __append__(self, table, row):
+        with self.__lock__:
+            self.__buffer__[table].append(row)
+            self.__size__ += 1
+            if self.__size__ >= self.batch_size:
+                self.flush()
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+from array import array
+from bisect import bisect_left
+
+
+class Delta:
+    def __init__(self, snapshot):
+        self.previous = snapshot
+        self.snapshot = snapshot
+        self.gained = []
+        self.lost = []
+        # Count of lost ids by count of edges, ids of them are known only
+        # after walk of full list
+        self.lost_count = 0
+        self.count = None
+        self.requests = 0
+        # Is snapshot equal to list of edges
+        self.complete = False
+
+    def __repr__(self):
+        return "Delta(gained={0}, lost={1}, count={2}, requests={3})".format(
+            len(self.gained), self.lost_count, self.count, self.requests)
+
+    def contains(self, id):
+        index = bisect_left(self.previous, id)
+        return index < len(self.previous) and self.previous[index] == id
+
+    def merge(self):
+        lost = set(self.lost)
+        self.snapshot = array('q', sorted(
+            [id for id in self.previous if id not in lost] + self.gained))
@@ -0,0 +1,505 @@
+#!/usr/bin/python3
+import json
+import threading
+import zlib
+from collections import deque
+from importlib.util import find_spec
+from time import sleep, time
+from urllib.parse import urlencode, urlsplit
+
+# Encodings from the most efficient
+ENCODINGS = ('zstd', 'br', 'gzip', 'deflate')
+
+
+def availableEncodings():
+    # Modules are found without import for fast start
+    encodings = []
+    if find_spec('zstandard') is not None:
+        encodings.append('zstd')
+    if find_spec('brotli') is not None or find_spec('brotlicffi') is not None:
+        encodings.append('br')
+    encodings.extend(('gzip', 'deflate'))
+    return encodings
+
+
+def httpxEncodings(version):
+    # Encodings, which are decoded by httpx of version: zstd is decoded since
+    # httpx 0.27.1, unknown version decodes only gzip and deflate
+    try:
+        version = tuple(int(part) for part in version.split('.')[:3])
+    except (AttributeError, ValueError):
+        return ['gzip', 'deflate']
+    supported = ('zstd', 'br', 'gzip', 'deflate') if version >= (0, 27, 1) \
+        else ('br', 'gzip', 'deflate')
+    return [encoding for encoding in availableEncodings()
+            if encoding in supported]
+
+
+class Decoder:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self.__decoder__ = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self.__decoder__ = zlib.decompressobj()
+        elif encoding == 'br':
+            try:
+                import brotli
+            except ImportError:
+                import brotlicffi as brotli
+            self.__decoder__ = brotli.Decompressor()
+        elif encoding == 'zstd':
+            import zstandard
+
+            self.__decoder__ = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise ValueError("Unknown encoding '{0}'".format(encoding))
+
+    def decompress(self, chunk):
+        if self.encoding == 'br' and hasattr(self.__decoder__, 'process'):
+            return self.__decoder__.process(chunk)
+        return self.__decoder__.decompress(chunk)
+
+    def flush(self):
+        flush = getattr(self.__decoder__, 'flush', None)
+        return flush() if flush is not None and self.encoding in (
+            'gzip', 'deflate') else b''
+
+
+def decodeContent(content, encoding, chunk_size=64 * 1024):
+    # Content is decompressed by chunks without copy of whole body
+    if not encoding or encoding == 'identity':
+        return content
+    decoder = Decoder(encoding)
+    view = memoryview(content)
+    chunks = [decoder.decompress(view[start:start + chunk_size])
+              for start in range(0, len(view), chunk_size)]
+    chunks.append(decoder.flush())
+    return b''.join(chunks)
+
+
+def wireSize(response):
+    # Bytes of body, which are received by network before decoding
+    size = getattr(response, 'wire_size', None)
+    if size is None:
+        tell = getattr(getattr(response, 'raw', None), 'tell', None)
+        if tell is not None:
+            try:
+                size = tell() or None
+            except Exception:
+                size = None
+    if size is None:
+        length = response.headers.get('Content-Length')
+        size = int(length) if length and length.isdigit() else \
+            len(response.content)
+    return size
+
+
+# Response with interface of requests.Response for not requests backends
+class Response:
+    def __init__(self, url, status_code=200, content=b'', headers={},
+                 cookies={}, encoding=None, wire_size=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = dict(headers)
+        self.cookies = dict(cookies)
+        self.encoding = encoding
+        self.wire_size = wire_size
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            from requests.exceptions import HTTPError
+
+            raise HTTPError("{0} Error for url: {1}".format(self.status_code,
+                                                            self.url),
+                            response=self)
+
+
+class Transport:
+    __accept_encoding__ = None
+
+    @property
+    def encodings(self):
+        # Wrapping transports decode as wrapped transport
+        transport = getattr(self, 'transport', None)
+        if isinstance(transport, Transport):
+            return transport.encodings
+        return availableEncodings()
+
+    @property
+    def acceptEncoding(self):
+        # Header is built once by every transport, so new transport of agent
+        # builds own header
+        if self.__accept_encoding__ is None:
+            self.__accept_encoding__ = ', '.join(self.encodings)
+        return self.__accept_encoding__
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    def __init__(self, session=None):
+        self.__session__ = session
+        self.__encodings__ = None
+        self.__lock__ = threading.Lock()
+
+    @property
+    def session(self):
+        # Requests is imported and session is created on first use
+        if self.__session__ is None:
+            with self.__lock__:
+                if self.__session__ is None:
+                    import requests
+
+                    self.__session__ = requests.Session()
+        return self.__session__
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        self.session.cookies = jar
+
+    @property
+    def encodings(self):
+        # Encodings, which are decoded by installed urllib3
+        if self.__encodings__ is None:
+            self.session
+            from urllib3.util.request import ACCEPT_ENCODING
+
+            supported = ACCEPT_ENCODING.replace(' ', '').split(',')
+            self.__encodings__ = [encoding for encoding in ENCODINGS
+                                  if encoding in supported]
+        return self.__encodings__
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        if self.__session__ is not None:
+            self.__session__.close()
+
+
+class HTTP2Transport(Transport):
+    def __init__(self, proxy=None, timeout=30, max_connections=1,
+                 prior_knowledge=False):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("HTTP2Transport requires 'httpx[http2]' package")
+
+        # All requests are multiplexed over few connections
+        kwargs = {
+            'http2': True,
+            'timeout': timeout,
+            'limits': httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections),
+        }
+        if prior_knowledge:
+            kwargs['http1'] = False
+        if proxy is not None:
+            kwargs['proxy'] = proxy
+        self.client = httpx.Client(**kwargs)
+        self.__encodings__ = httpxEncodings(getattr(httpx, '__version__',
+                                                    None))
+
+    @property
+    def cookies(self):
+        return self.client.cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        # Client keeps the given jar, so jar can be shared by clients
+        self.client.cookies = jar
+
+    @property
+    def encodings(self):
+        return self.__encodings__
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                cookies=None, timeout=None, allow_redirects=True, **kwargs):
+        # Check data
+        if kwargs.get('proxies'):
+            raise TypeError("HTTP2Transport uses proxy of transport")
+
+        arguments = {'params': params, 'data': data, 'headers': headers,
+                     'cookies': cookies, 'follow_redirects': allow_redirects}
+        if timeout is not None:
+            arguments['timeout'] = timeout
+        response = self.client.request(method, url, **arguments)
+        return Response(
+            url=str(response.url),
+            status_code=response.status_code,
+            content=response.content,
+            headers=response.headers,
+            cookies=response.cookies,
+            encoding=response.encoding,
+            wire_size=response.num_bytes_downloaded,
+        )
+
+    def close(self):
+        self.client.close()
+
+
+class RateLimitedTransport(Transport):
+    def __init__(self, transport, rate, burst=1):
+        # Check data
+        if not isinstance(transport, Transport):
+            raise TypeError("'transport' must be Transport type")
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise TypeError("'rate' must be positive number")
+
+        self.transport = transport
+        # Requests per second
+        self.rate = rate
+        self.burst = burst
+        self.__tokens__ = burst
+        self.__refilled_at__ = time()
+        self.__lock__ = threading.Lock()
+
+    @property
+    def cookies(self):
+        return self.transport.cookies
+
+    def request(self, method, url, **kwargs):
+        self.wait()
+        return self.transport.request(method, url, **kwargs)
+
+    def wait(self):
+        with self.__lock__:
+            now = time()
+            self.__tokens__ = min(self.burst, self.__tokens__ +
+                                  (now - self.__refilled_at__) * self.rate)
+            self.__refilled_at__ = now
+            # Token is taken in advance, so waiting is done out of lock
+            self.__tokens__ -= 1
+            delay = -self.__tokens__ / self.rate if self.__tokens__ < 0 else 0
+        if delay:
+            sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+
+class HedgedTransport(Transport):
+    def __init__(self, transport, hedge=None, percentile=95, budget=0.05,
+                 min_delay=0.05, window=1000, min_samples=20, workers=64):
+        # Check data
+        if not isinstance(transport, Transport):
+            raise TypeError("'transport' must be Transport type")
+        if hedge is not None and not isinstance(hedge, Transport):
+            raise TypeError("'hedge' must be Transport type")
+        if not isinstance(percentile, (int, float)) or \
+                not 0 < percentile < 100:
+            raise TypeError("'percentile' must be number from 0 to 100")
+        if not isinstance(budget, (int, float)) or not 0 <= budget <= 1:
+            raise TypeError("'budget' must be number from 0 to 1")
+
+        self.transport = transport
+        # Duplicates are sent by other transport if it is given, else shared
+        # transport sends them over other connection or proxy
+        self.hedge = hedge if hedge is not None else transport
+        self.percentile = percentile
+        # Max part of requests, which can be duplicated
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.workers = workers
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.denied = 0
+        self.__latencies__ = deque(maxlen=window)
+        self.__delay__ = None
+        self.__samples__ = 0
+        self.__executor__ = None
+        self.__lock__ = threading.Lock()
+
+    @property
+    def cookies(self):
+        return self.transport.cookies
+
+    @property
+    def delay(self):
+        with self.__lock__:
+            # Percentile is recalculated after every 50 new samples
+            if len(self.__latencies__) < self.min_samples:
+                return None
+            if self.__delay__ is None or self.__samples__ >= 50:
+                latencies = sorted(self.__latencies__)
+                index = min(int(len(latencies) * self.percentile / 100),
+                            len(latencies) - 1)
+                self.__delay__ = max(latencies[index], self.min_delay)
+                self.__samples__ = 0
+            return self.__delay__
+
+    def request(self, method, url, **kwargs):
+        # Only reading requests are safe for duplication
+        if method != 'GET':
+            return self.transport.request(method, url, **kwargs)
+
+        from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+        with self.__lock__:
+            self.requests += 1
+            # Request, which can't be hedged by budget, is sent by calling
+            # thread
+            full = self.hedged + 1 > self.budget * self.requests
+        delay = self.delay
+        if delay is None or full:
+            return self.__send__(self.transport, method, url, kwargs)
+
+        # Primary request doesn't wait in queue of pool, so delay of hedge
+        # is counted from sending of primary request
+        primary = Future()
+        threading.Thread(target=self.__run__, daemon=True, args=(
+            primary, self.transport, method, url, kwargs)).start()
+        done, _ = wait([primary], delay)
+        if done or not self.__allow__():
+            return primary.result()
+
+        hedge = self.__submit__(self.hedge, method, url, kwargs)
+        futures = [primary, hedge]
+        while True:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            winner = done.pop()
+            futures.remove(winner)
+            # Error is returned only if both requests are failed
+            if winner.exception() is None or not futures:
+                break
+        for future in futures:
+            self.__cancel__(future)
+        if winner is hedge and winner.exception() is None:
+            with self.__lock__:
+                self.wins += 1
+        return winner.result()
+
+    def stats(self):
+        with self.__lock__:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'wins': self.wins,
+                'denied': self.denied,
+                'delay': self.__delay__,
+            }
+
+    def close(self):
+        if self.__executor__ is not None:
+            self.__executor__.shutdown(wait=False)
+        self.transport.close()
+        if self.hedge is not self.transport:
+            self.hedge.close()
+
+    def __allow__(self):
+        with self.__lock__:
+            if self.hedged + 1 > self.budget * self.requests:
+                self.denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def __submit__(self, transport, method, url, kwargs):
+        if self.__executor__ is None:
+            with self.__lock__:
+                if self.__executor__ is None:
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    self.__executor__ = ThreadPoolExecutor(self.workers)
+        return self.__executor__.submit(self.__send__, transport, method, url,
+                                        kwargs)
+
+    def __run__(self, future, transport, method, url, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self.__send__(transport, method, url, kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def __send__(self, transport, method, url, kwargs):
+        start = time()
+        response = transport.request(method, url, **kwargs)
+        with self.__lock__:
+            self.__latencies__.append(time() - start)
+            self.__samples__ += 1
+        return response
+
+    def __cancel__(self, future):
+        # Started request can't be interrupted, so its response is closed
+        # when it is received
+        if not future.cancel():
+            future.add_done_callback(self.__close_response__)
+
+    @staticmethod
+    def __close_response__(future):
+        if future.exception() is None:
+            close = getattr(future.result(), 'close', None)
+            if close is not None:
+                close()
+
+
+class FakeTransport(Transport):
+    def __init__(self):
+        self.cookies = {}
+        # List of (method, url, kwargs) of sent requests
+        self.requests = []
+        self.__routes__ = {}
+        self.__lock__ = threading.Lock()
+
+    def add(self, method, url, content=b'', status_code=200, headers={},
+            cookies={}):
+        # Content can be callable with arguments of request
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        elif isinstance(content, (dict, list)):
+            content = json.dumps(content).encode('utf-8')
+        self.__routes__[(method, self.__path__(url))] = \
+            (content, status_code, headers, cookies)
+
+    def request(self, method, url, params=None, **kwargs):
+        with self.__lock__:
+            self.requests.append((method, url, dict(kwargs, params=params)))
+        route = self.__routes__.get((method, self.__path__(url)))
+        if params:
+            url = "{0}?{1}".format(url, urlencode(params))
+        if route is None:
+            return Response(url, 404)
+        content, status_code, headers, cookies = route
+        if callable(content):
+            content = content(method, url, params=params, **kwargs)
+            if isinstance(content, Response):
+                return content
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+        self.cookies.update(cookies)
+        # Compressed content is decoded as by real transports
+        wire_size = len(content)
+        content = decodeContent(content, headers.get('Content-Encoding'))
+        return Response(url, status_code, content, headers, cookies,
+                        wire_size=wire_size)
+
+    def __path__(self, url):
+        parts = urlsplit(url)
+        return "{0}://{1}{2}".format(parts.scheme, parts.netloc,
+                                     parts.path.rstrip('/'))
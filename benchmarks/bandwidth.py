@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+# Benchmark of bandwidth of public methods: wire and decoded bytes per item
+# for every negotiated content encoding.
+import gzip
+import json
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.instagram import Account, AgentAccount, Media, Tag
+from InstagramLib.transport import FakeTransport, Response, \
+    availableEncodings, decodeContent
+
+from parse_executor import makePage
+
+MEDIA_HASH = "42323d64886122307be10013ad2dcc44"
+COMMENTS_HASH = "33ba35852cb50da46f5b5e889df7d159"
+LIKES_HASH = "1cb6ec562846122743b61e492c85999f"
+FOLLOWERS_HASH = "37479f2b8209594dde7facb0d904896a"
+FEED_ID = 17842794232208280
+
+
+def compress(content, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(content)
+    if encoding == 'deflate':
+        return zlib.compress(content)
+    if encoding == 'br':
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+        return brotli.compress(content)
+    if encoding == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(content)
+    return content
+
+
+def mediaNode(number):
+    return {
+        'id': str(number), 'shortcode': 'code{0}'.format(number),
+        'taken_at_timestamp': 1520000000 + number,
+        'edge_media_to_caption': {'edges': [{'node': {
+            'text': 'caption #tag{0} '.format(number) * 10}}]},
+        'edge_liked_by': {'count': number},
+        'edge_media_preview_like': {'count': number},
+        'edge_media_to_comment': {'count': 2}, 'comments_disabled': False,
+        'is_video': False, 'display_url': 'https://example.com/' + 'y' * 100,
+        'owner': {'id': '2', 'username': 'owner'},
+    }
+
+
+def connection(edges, number, pages, makeNode):
+    return {
+        'count': edges * pages,
+        'edges': [{'node': makeNode(number * edges + index)}
+                  for index in range(edges)],
+        'page_info': {'has_next_page': number < pages,
+                      'end_cursor': str(number + 1)},
+    }
+
+
+def makeMediaPage(edges, number, pages):
+    return {'data': {'hashtag': {'edge_hashtag_to_media': connection(
+        edges, number, pages, mediaNode)}}}
+
+
+def accountNode(number):
+    return {'id': str(number), 'username': 'user{0}'.format(number),
+            'full_name': 'User number {0}'.format(number),
+            'profile_pic_url': 'https://example.com/' + 'z' * 100,
+            'is_verified': False, 'followed_by_viewer': False,
+            'requested_by_viewer': False}
+
+
+def makeFollowersPage(edges, number, pages):
+    return {'data': {'user': {'edge_followed_by': connection(
+        edges, number, pages, accountNode)}}}
+
+
+def makeLikesPage(edges, number, pages):
+    return {'data': {'shortcode_media': {'edge_liked_by': connection(
+        edges, number, pages, accountNode)}}}
+
+
+def makeFeedPage(edges, number, pages):
+    return {'data': {'user': {'edge_web_feed_timeline': connection(
+        edges, number, pages, mediaNode)}}}
+
+
+def makeCommentsPage(edges, number, pages):
+    return {'data': {'shortcode_media': {'edge_media_to_comment': {
+        'count': edges * pages,
+        'edges': [{'node': {
+            'id': str(number * edges + index),
+            'owner': {'username': 'user{0}'.format(index)},
+            'text': 'comment text number {0}'.format(index),
+            'created_at': 1520000000 + index}} for index in range(edges)],
+        'page_info': {'has_next_page': number < pages,
+                      'end_cursor': str(number + 1)},
+    }}}}
+
+
+# Query of graphql -> page of it
+PAGES = {
+    MEDIA_HASH: makeMediaPage,
+    COMMENTS_HASH: makeCommentsPage,
+    LIKES_HASH: makeLikesPage,
+    FOLLOWERS_HASH: makeFollowersPage,
+    FEED_ID: makeFeedPage,
+}
+
+
+class BenchmarkTransport(FakeTransport):
+    def __init__(self, encodings, edges=50, pages=10):
+        super().__init__()
+        self.__encodings__ = encodings
+        self.edges = edges
+        self.pages = pages
+        # Routes of login of agent
+        self.add('GET', 'https://www.instagram.com/',
+                 cookies={'csrftoken': 'token'})
+        self.add('POST', 'https://www.instagram.com/accounts/login/ajax/',
+                 {'status': 'ok', 'authenticated': True})
+        self.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                 self.__encode__(lambda *args, **kwargs: makePage(self.edges)))
+        self.add('GET', 'https://www.instagram.com/graphql/query',
+                 self.__encode__(self.__query__))
+
+    @property
+    def encodings(self):
+        return self.__encodings__
+
+    def __query__(self, method, url, params=None, **kwargs):
+        variables = json.loads(params['variables'])
+        after = variables.get('after', variables.get(
+            'fetch_media_item_cursor'))
+        number = int(after) if after not in (None, '', 'None') else 1
+        make = PAGES[params.get('query_hash') or params.get('query_id')]
+        return json.dumps(make(self.edges, number, self.pages)).encode()
+
+    def __encode__(self, make):
+        def content(method, url, **kwargs):
+            # The first encoding, which is accepted by agent
+            accept = kwargs.get('headers', {}).get('Accept-Encoding', '')
+            encoding = accept.split(',')[0].strip() or 'identity'
+            body = compress(make(method, url, **kwargs), encoding)
+            headers = {} if encoding == 'identity' else \
+                {'Content-Encoding': encoding}
+            return Response(url, 200, decodeContent(body, encoding), headers,
+                            wire_size=len(body))
+        return content
+
+
+def run(encoding, edges, pages):
+    agent = AgentAccount('login', 'password', transport=BenchmarkTransport(
+        [] if encoding == 'identity' else [encoding], edges, pages))
+    agent.enableBandwidthMeter()
+    agent.__update__(Tag('tag'))
+    # Pages of graphql are requested after page of target, feed is
+    # requested from the second page
+    agent.getMedia(Tag('tag'), after='1', count=edges * pages, limit=edges,
+                   settings={})
+    agent.getComments(Media('code'), after='1', count=edges * pages,
+                      limit=edges, settings={})
+    agent.getLikes(Media('code'), after='1', count=edges * pages,
+                   limit=edges, settings={})
+    account = Account('user')
+    account.id = '1'
+    agent.getFollowers(account, after='1', count=edges * pages, limit=edges,
+                       settings={})
+    agent.feed(count=edges * pages, after='1', settings={})
+    for name, stats in sorted(agent.getBandwidth().items()):
+        print("{0}\t{1}\t{2}\t{3}\t{4:.0f}\t{5:.0f}\t{6:.1f}".format(
+            encoding, name, stats['requests'], stats['items'],
+            stats['wire_per_item'], stats['decoded_per_item'],
+            stats['ratio']))
+    agent.disableBandwidthMeter()
+
+
+if __name__ == '__main__':
+    edges = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print("encoding\tmethod\trequests\titems\twire bytes/item\t"
+          "decoded bytes/item\tratio")
+    for encoding in ['identity'] + availableEncodings()[::-1]:
+        run(encoding, edges, pages)
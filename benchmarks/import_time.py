@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+# Benchmark of import time of library with 'python -X importtime'.
+# Exit code is not zero if import is slower than limit or heavy modules are
+# imported, so script can be used as check for regressions.
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules, which must be imported only on first network use
+HEAVY = ('requests', 'urllib3', 'httpx', 'sqlite3', 'multiprocessing')
+
+
+def importTime(module):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=ROOT, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == '__main__':
+    module = sys.argv[1] if len(sys.argv) > 1 else 'InstagramLib.instagram'
+    # Limit of cumulative import time in milliseconds
+    limit = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    times = importTime(module)
+    total = times[module] / 1000
+    heavy = sorted(name for name in times if name.split('.')[0] in HEAVY)
+    print("{0}: {1:.1f} ms".format(module, total))
+    for name, value in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print("  {0:<40} {1:.1f} ms".format(name, value / 1000))
+    if heavy:
+        print("Heavy modules are imported: {0}".format(", ".join(heavy)))
+    if heavy or total > limit:
+        sys.exit(1)
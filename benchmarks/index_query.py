@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+# Benchmark of indexing and latency of boolean and time-ranged queries of
+# inverted index over captions.
+import os
+import random
+import sys
+import tempfile
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.indexing import InvertedIndex
+from InstagramLib.instagram import Media
+
+WORDS = ['word{0}'.format(index) for index in range(5000)]
+TAGS = ['#tag{0}'.format(index) for index in range(1000)]
+MENTIONS = ['@user{0}'.format(index) for index in range(1000)]
+QUERIES = ('#tag1', '#tag1 word2', '#tag1|#tag2 -word3', '@user5 #tag7',
+           'word1 word2 word3', '#tag1 @user1')
+
+
+def makeMedia(count):
+    random.seed(1)
+    for index in range(count):
+        media = Media('code{0}'.format(index))
+        # Popular words and tags are more frequent
+        media.caption = " ".join(
+            [WORDS[int(random.paretovariate(1)) % len(WORDS)]
+             for _ in range(10)] +
+            [TAGS[int(random.paretovariate(1)) % len(TAGS)]
+             for _ in range(3)] +
+            [MENTIONS[random.randrange(len(MENTIONS))]])
+        media.date = 1500000000 + index * 60
+        yield media
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as path:
+        index = InvertedIndex(path)
+        start = time()
+        index.update(makeMedia(count))
+        index.compact()
+        print("indexed {0} media in {1:.1f} s, {2:.1f} MB on disk".format(
+            count, time() - start,
+            sum(os.path.getsize(os.path.join(path, name))
+                for name in os.listdir(path)) / 1024 / 1024))
+
+        middle = 1500000000 + count * 30
+        print("query\tresults\tall, ms\tlimit 100, ms\ttime range, ms")
+        for query in QUERIES:
+            timings = []
+            for kwargs in ({}, {'limit': 100},
+                           {'since': middle, 'until': middle + 86400}):
+                start = time()
+                results = index.search(query, **kwargs)
+                timings.append((time() - start) * 1000)
+                if not kwargs:
+                    total = len(results)
+            print("{0}\t{1}\t{2:.2f}\t{3:.2f}\t{4:.2f}".format(
+                query, total, *timings))
+        index.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+# Benchmark of page parsing throughput (pages/sec) against count of cores,
+# workers send compact records of nodes, models are built from them
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.instagram import Agent, Tag
+from InstagramLib.transport import FakeTransport
+
+
+def makePage(edges=500):
+    node = {
+        'id': '1', 'shortcode': 'abcdef', 'taken_at_timestamp': 1520000000,
+        'edge_media_to_caption': {'edges': [{'node': {'text': 'x' * 200}}]},
+        'edge_media_preview_like': {'count': 10},
+        'edge_liked_by': {'count': 10},
+        'edge_media_to_comment': {'count': 2}, 'comments_disabled': False,
+        'is_video': False, 'display_url': 'https://example.com/' + 'y' * 100,
+        'owner': {'id': '2'},
+    }
+    data = {
+        'config': {'csrf_token': 'token'},
+        'rhx_gis': 'gis',
+        'entry_data': {'TagPage': [{'graphql': {'hashtag': {
+            'name': 'tag',
+            'edge_hashtag_to_media': {
+                'count': edges,
+                'edges': [{'node': node}] * edges,
+                'page_info': {'has_next_page': False, 'end_cursor': None},
+            },
+            'edge_hashtag_to_top_posts': {'edges': [{'node': node}] * 9},
+        }}}]},
+    }
+    return "<html><script type=\"text/javascript\">window._sharedData = {0};" \
+           "</script></html>".format(json.dumps(data)).encode('utf-8')
+
+
+def run(agent, pages, threads):
+    # Parsing of page and building of models from records
+    start = time()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda _: agent.getMedia(Tag('tag'), count=500),
+                          range(pages)))
+    return pages / (time() - start)
+
+
+if __name__ == '__main__':
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    threads = 32
+    agent = Agent()
+    transport = FakeTransport()
+    transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                  makePage())
+    agent.setTransport(transport)
+    print("cores\tpages/sec")
+    print("inline\t{0:.1f}".format(run(agent, pages, threads)))
+    for cores in range(1, (os.cpu_count() or 1) + 1):
+        agent.enableParseExecutor(cores, threshold=0)
+        run(agent, cores, cores)
+        print("{0}\t{1:.1f}".format(cores, run(agent, pages, threads)))
+        agent.disableParseExecutor()
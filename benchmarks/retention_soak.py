@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+# Soak benchmark of RSS for long polling with retention of collections
+import json
+import os
+import resource
+import subprocess
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.instagram import Agent, Tag
+from InstagramLib.polling import PollingScheduler
+from InstagramLib.transport import FakeTransport
+
+
+def rss():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') \
+                // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class TagTransport(FakeTransport):
+    # Every poll of tag page gets new media
+    def __init__(self, edges=12):
+        super().__init__()
+        self.edges = edges
+        self.poll = 0
+        self.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                 self.__page__)
+
+    def __page__(self, method, url, **kwargs):
+        self.poll += 1
+        nodes = [{'node': {
+            'id': str(self.poll * self.edges + index),
+            'shortcode': 'code{0}_{1}'.format(self.poll, index),
+            'taken_at_timestamp': 1520000000 + self.poll * 60 + index,
+            'edge_media_to_caption': {'edges': [{'node': {
+                'text': 'caption ' * 20}}]},
+            'edge_media_preview_like': {'count': index},
+            'edge_media_to_comment': {'count': 0},
+            'comments_disabled': False, 'is_video': False,
+            'display_url': 'https://example.com/' + 'y' * 100,
+            'owner': {'id': '1'},
+        }} for index in range(self.edges)]
+        data = {
+            'config': {'csrf_token': 'token'},
+            'rhx_gis': 'gis',
+            'entry_data': {'TagPage': [{'graphql': {'hashtag': {
+                'name': 'tag',
+                'edge_hashtag_to_media': {
+                    'count': self.poll * self.edges, 'edges': nodes,
+                    'page_info': {'has_next_page': False,
+                                  'end_cursor': None},
+                },
+                'edge_hashtag_to_top_posts': {'edges': nodes[:9]},
+            }}}]},
+        }
+        return "<html><script type=\"text/javascript\">" \
+               "window._sharedData = {0};</script></html>".format(
+                   json.dumps(data))
+
+
+def soak(mode, polls, samples=10):
+    agent = Agent()
+    transport = TagTransport()
+    agent.setTransport(transport)
+    # Polls are not paced, so window is short
+    agent.setRetention('media', mode, size=1000, window=0.1)
+    agent.setRetention('top_posts', mode, size=1000, window=0.1)
+    # Polls are due at once, as if hours are passed
+    scheduler = PollingScheduler(budget=1e6, min_interval=1e-6,
+                                 max_interval=1e-6)
+    scheduler.add(Tag('tag'))
+    start = time()
+    for poll in range(polls):
+        target = scheduler.next()
+        scheduler.poll(agent, target)
+        # Log of fake requests is not part of retention
+        transport.requests.clear()
+        if poll % (polls // samples) == 0 or poll == polls - 1:
+            print("{0}\t{1}\t{2:.1f}\t{3}\t{4}".format(
+                mode, poll, time() - start, len(target.obj.media), rss()))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    # One poll per minute gives 60 polls per hour
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 60 * 24 * 30
+    print("mode\tpoll\tseconds\tretained\trss_kb")
+    sys.stdout.flush()
+    if len(sys.argv) > 2:
+        soak(sys.argv[2], polls)
+    else:
+        for mode in ('all', 'off', 'lru', 'window', 'ids'):
+            subprocess.check_call([sys.executable, __file__, str(polls), mode])
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+# Benchmark of round-trip throughput and size of serialization of models:
+# pickle of objects against flat records with struct and msgpack codecs.
+import os
+import pickle
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.instagram import Account, Comment, Location, Media
+from InstagramLib.serialization import dumps, loads
+
+
+def makeObjects(count):
+    objects = []
+    owners = [Account('user{0}'.format(index)) for index in range(100)]
+    for index, owner in enumerate(owners):
+        owner.id = str(1000 + index)
+        owner.full_name = 'User {0}'.format(index)
+        owner.followers_count = index * 10
+        owner.is_private = False
+    location = Location(1)
+    location.name = 'Moscow'
+    location.coordinates = (55.75, 37.61)
+    for index in range(count):
+        media = Media('code{0}'.format(index))
+        media.id = str(index)
+        media.owner = owners[index % len(owners)]
+        media.owner.media.add(media)
+        media.location = location
+        media.caption = 'caption #tag{0} '.format(index) * 10
+        media.date = 1520000000 + index
+        media.likes_count = index
+        media.comments_count = 2
+        media.is_video = False
+        media.display_url = 'https://example.com/' + 'y' * 100
+        media.dimensions = (1080, 1080)
+        objects.append(media)
+        for number in range(2):
+            comment = Comment('{0}_{1}'.format(index, number), media,
+                              owners[number], 'comment text', 1520000000)
+            media.comments.add(comment)
+            objects.append(comment)
+    return objects
+
+
+def run(name, encode, decode, objects, repeats=3):
+    start = time()
+    for _ in range(repeats):
+        data = encode(objects)
+    encoded = time() - start
+    start = time()
+    for _ in range(repeats):
+        decode(data)
+    decoded = time() - start
+    count = len(objects) * repeats
+    print("{0}\t{1:.0f}\t{2:.0f}\t{3:.1f}".format(
+        name, count / encoded, count / decoded, len(data) / len(objects)))
+
+
+def runSingle(name, encode, decode, objects):
+    # Every object is sent as own message, as in queues between processes
+    start = time()
+    messages = [encode([obj]) for obj in objects]
+    encoded = time() - start
+    start = time()
+    for message in messages:
+        decode(message)
+    decoded = time() - start
+    print("{0}\t{1:.0f}\t{2:.0f}\t{3:.1f}".format(
+        name, len(objects) / encoded, len(objects) / decoded,
+        sum(map(len, messages)) / len(objects)))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    objects = makeObjects(count)
+    formats = [('pickle', lambda items: pickle.dumps(items, -1), pickle.loads),
+               ('struct', lambda items: dumps(items, 'struct'), loads)]
+    try:
+        import msgpack
+    except ImportError:
+        print("msgpack is skipped, 'msgpack' package is not installed")
+    else:
+        formats.append(('msgpack', lambda items: dumps(items, 'msgpack'),
+                        loads))
+
+    print("batch\tencode obj/sec\tdecode obj/sec\tbytes/obj")
+    for name, encode, decode in formats:
+        run(name, encode, decode, objects)
+    print("single\tencode obj/sec\tdecode obj/sec\tbytes/obj")
+    for name, encode, decode in formats:
+        runSingle(name, encode, decode, objects[:count // 10])
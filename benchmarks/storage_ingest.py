@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+# Benchmark of ingest rate (rows/sec) of SQLite storage
+import os
+import sys
+import tempfile
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.instagram import Account, Comment, Media, Tag
+from InstagramLib.storage import Storage
+
+
+def run(count, batch_size):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    owner = Account('owner')
+    owner.id = 1
+    tag = Tag('tag')
+    start = time()
+    with Storage(path, batch_size) as storage:
+        for i in range(count):
+            account = Account('user{0}'.format(i))
+            account.id = i + 2
+            storage.add(account, 'follower', owner)
+            media = Media('code{0}'.format(i))
+            media.id = i
+            media.owner = account
+            media.date = 1520000000 + i
+            storage.add(media, 'media', tag)
+            storage.add(Comment(i, media, account, 'text', media.date))
+    # Account, follow edge, media, tag edge and comment
+    return count * 5 / (time() - start)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("batch_size\trows/sec")
+    for batch_size in (1, 100, 1000, 10000):
+        print("{0}\t{1:.0f}".format(
+            batch_size, run(count if batch_size > 1 else count // 10,
+                            batch_size)))
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+# Benchmark of latency and count of connections for HTTP/1.1 and HTTP/2
+# transports with high concurrency against local test servers.
+# Requires 'requests', 'httpx[http2]' and 'h2' packages.
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstagramLib.transport import HTTP2Transport, RequestsTransport
+
+# Latency of server for every request
+DELAY = 0.05
+BODY = b'{"data": {"status": "ok"}}'
+connections = {'http/1.1': 0, 'http/2': 0}
+
+
+class HTTP1Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        connections['http/1.1'] += 1
+
+    def do_GET(self):
+        sleep(DELAY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTP2Protocol(asyncio.Protocol):
+    def connection_made(self, transport):
+        import h2.config
+        import h2.connection
+
+        connections['http/2'] += 1
+        self.transport = transport
+        self.connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False))
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data):
+        import h2.events
+
+        for event in self.connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.get_event_loop().call_later(DELAY, self.respond,
+                                                    event.stream_id)
+        self.transport.write(self.connection.data_to_send())
+
+    def respond(self, stream_id):
+        self.connection.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(BODY))),
+        ])
+        self.connection.send_data(stream_id, BODY, end_stream=True)
+        self.transport.write(self.connection.data_to_send())
+
+
+def startHTTP1():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), HTTP1Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def startHTTP2():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        loop.create_server(HTTP2Protocol, '127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server.sockets[0].getsockname()[1]
+
+
+def run(transport, url, requests_count, concurrency):
+    latencies = []
+
+    def send(_):
+        start = time()
+        transport.get(url).raise_for_status()
+        latencies.append(time() - start)
+
+    start = time()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(send, range(requests_count)))
+    total = time() - start
+    latencies.sort()
+    return (requests_count / total,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99) - 1] * 1000)
+
+
+if __name__ == '__main__':
+    try:
+        import h2
+        import httpx
+        import requests
+    except ImportError as e:
+        sys.exit("Benchmark requires requests, httpx[http2] and h2: {0}".format(
+            e))
+
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    http1_url = "http://127.0.0.1:{0}/graphql/query/".format(startHTTP1())
+    http2_url = "http://127.0.0.1:{0}/graphql/query/".format(startHTTP2())
+
+    print("transport\tconcurrency\treq/sec\tp50_ms\tp99_ms\tconnections")
+    for concurrency in (10, 50, 200):
+        for name, protocol, factory, url in (
+                ('requests', 'http/1.1', RequestsTransport, http1_url),
+                ('http2', 'http/2',
+                 lambda: HTTP2Transport(prior_knowledge=True), http2_url)):
+            connections[protocol] = 0
+            transport = factory()
+            rate, p50, p99 = run(transport, url, requests_count, concurrency)
+            transport.close()
+            print("{0}\t{1}\t{2:.0f}\t{3:.1f}\t{4:.1f}\t{5}".format(
+                name, concurrency, rate, p50, p99, connections[protocol]))
@@ -14,7 +14,13 @@ setup(
         'Programming Language :: Python :: 3.6',
     ),
     install_requires=['requests'],
+    entry_points={
+        'console_scripts': [
+            'instagramlib=InstagramLib.cli:main',
+        ],
+    },
     extras_require={
         'dev': [],
+        'http2': ['httpx[http2]'],
     },
 )
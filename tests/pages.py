@@ -0,0 +1,87 @@
+# Pages of Instagram for tests with FakeTransport
+import json
+
+
+def mediaNode(number, owner=None):
+    node = {
+        'id': str(number), 'shortcode': 'code{0}'.format(number),
+        'taken_at_timestamp': 1520000000 + number,
+        'edge_media_to_caption': {'edges': [{'node': {
+            'text': 'caption {0}'.format(number)}}]},
+        'edge_media_preview_like': {'count': number},
+        'edge_liked_by': {'count': number},
+        'edge_media_to_comment': {'count': 0}, 'comments_disabled': False,
+        'is_video': False, 'display_url': 'https://example.com/{0}'.format(
+            number),
+        'owner': owner or {'id': '1'},
+    }
+    return node
+
+
+def connection(nodes, count=None, cursor=None):
+    return {
+        'count': len(nodes) if count is None else count,
+        'edges': [{'node': node} for node in nodes],
+        'page_info': {'has_next_page': cursor is not None,
+                      'end_cursor': cursor},
+    }
+
+
+def page(kind, entity):
+    data = {
+        'config': {'csrf_token': 'token'},
+        'rhx_gis': 'gis',
+        'entry_data': {kind: [{'graphql': entity}]},
+    }
+    return "<html><script type=\"text/javascript\">window._sharedData = " \
+           "{0};</script></html>".format(json.dumps(data))
+
+
+def tagPage(name, media, count=None, cursor=None, top=()):
+    return page('TagPage', {'hashtag': {
+        'name': name,
+        'edge_hashtag_to_media': connection(media, count, cursor),
+        'edge_hashtag_to_top_posts': connection(list(top)),
+    }})
+
+
+def locationPage(id, media, count=None, cursor=None):
+    return page('LocationsPage', {'location': {
+        'id': str(id), 'slug': 'place', 'name': 'Place',
+        'has_public_page': True, 'lat': 1.0, 'lng': 2.0,
+        'edge_location_to_media': connection(media, count, cursor),
+        'edge_location_to_top_posts': connection([]),
+    }})
+
+
+def mediaPage(number, comments, count=None, cursor=None):
+    node = mediaNode(number, {'id': '1', 'username': 'owner'})
+    node['edge_media_to_comment'] = connection(comments, count, cursor)
+    node['edge_media_preview_like'] = connection([], 0)
+    return page('PostPage', {'shortcode_media': node})
+
+
+def commentNode(number):
+    return {'id': str(number), 'owner': {'username': 'user{0}'.format(
+        number)}, 'text': 'comment {0}'.format(number),
+        'created_at': 1520000000 + number}
+
+
+def accountPage(login, id, followers_count=0):
+    return page('ProfilePage', {'user': {
+        'id': str(id), 'username': login, 'full_name': login,
+        'profile_pic_url': '', 'profile_pic_url_hd': '',
+        'connected_fb_page': None, 'biography': '',
+        'edge_follow': {'count': 0},
+        'edge_followed_by': {'count': followers_count},
+        'edge_owner_to_timeline_media': connection([]),
+        'is_private': False, 'is_verified': False, 'country_block': False,
+    }})
+
+
+def addLogin(transport):
+    # Routes of login of AgentAccount
+    transport.add('GET', 'https://www.instagram.com/',
+                  cookies={'csrftoken': 'token'})
+    transport.add('POST', 'https://www.instagram.com/accounts/login/ajax/',
+                  {'status': 'ok', 'authenticated': True})
@@ -0,0 +1,41 @@
+import unittest
+
+from InstagramLib.exceptions import CircuitOpen
+from InstagramLib.instagram import AgentAccount, Media
+from InstagramLib.transport import FakeTransport
+
+from pages import addLogin
+
+
+class ActionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        addLogin(self.transport)
+        self.transport.add('POST',
+                           'https://www.instagram.com/web/likes/1/like/',
+                           {'status': 'fail'}, status_code=429)
+        self.agent = AgentAccount('login', 'password',
+                                  transport=self.transport)
+        self.media = Media('code')
+        self.media.id = '1'
+
+    def likes(self):
+        return [request for request in self.transport.requests
+                if request[1].endswith('/like/')]
+
+    def test_circuit_of_actions(self):
+        breaker = self.agent.enableCircuitBreaker(threshold=2, cooldown=60)
+        self.assertFalse(self.agent.like(self.media))
+        self.assertFalse(self.agent.like(self.media))
+        # Opened circuit fails action without request
+        with self.assertRaises(CircuitOpen):
+            self.agent.like(self.media)
+        self.assertEqual(len(self.likes()), 2)
+        stats = breaker.stats()['action']
+        self.assertEqual((stats['state'], stats['rejected']), ('open', 1))
+
+    def test_scheduler_of_actions(self):
+        scheduler = self.agent.enableScheduler(1000, burst=10)
+        self.agent.like(self.media)
+        self.assertEqual(len(self.likes()), 1)
+        self.assertEqual(scheduler.stats()['interactive']['requests'], 1)
@@ -0,0 +1,113 @@
+import json
+import unittest
+
+from InstagramLib.exceptions import UnexpectedResponse
+from InstagramLib.instagram import Agent, Media, Tag
+from InstagramLib.transport import FakeTransport
+
+from pages import (commentNode, connection, mediaNode, mediaPage, page,
+                   tagPage)
+
+
+class AgentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+
+    def test_update_tag(self):
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(1)], count=10,
+                    top=[mediaNode(2), mediaNode(3)]))
+        tag = Tag('tag')
+        self.agent.__update__(tag)
+        self.assertEqual(tag.media_count, 10)
+        self.assertEqual(sorted(media.code for media in tag.top_posts),
+                         ['code2', 'code3'])
+        self.assertEqual(self.agent.rhx_gis, 'gis')
+        self.assertEqual(self.agent.csrf_token, 'token')
+
+    def test_accept_encoding_of_new_transport(self):
+        class GzipTransport(FakeTransport):
+            encodings = ['gzip']
+
+        self.transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                           tagPage('tag', []))
+        self.agent.__update__(Tag('tag'))
+        transport = GzipTransport()
+        transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                      tagPage('tag', []))
+        self.agent.setTransport(transport)
+        self.agent.__update__(Tag('tag'))
+        self.assertEqual(self.transport.requests[0][2]['headers'][
+            'Accept-Encoding'], self.transport.acceptEncoding)
+        # Header of previous transport isn't used by new one
+        self.assertEqual(transport.requests[0][2]['headers'][
+            'Accept-Encoding'], 'gzip')
+
+    def test_get_media_pages(self):
+        def query(method, url, params=None, **kwargs):
+            variables = json.loads(params['variables'])
+            self.assertEqual(variables['tag_name'], 'tag')
+            self.assertEqual(variables['after'], 'c1')
+            return {'data': {'hashtag': {'edge_hashtag_to_media': connection(
+                [mediaNode(3), mediaNode(4)], 4)}}}
+
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(1), mediaNode(2)], 4, 'c1'))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           lambda *args, **kwargs: json.dumps(
+                               query(*args, **kwargs)))
+        tag = Tag('tag')
+        media_list, cursor = self.agent.getMedia(tag, count=4)
+        self.assertEqual([media.code for media in media_list],
+                         ['code1', 'code2', 'code3', 'code4'])
+        self.assertIsNone(cursor)
+        self.assertEqual(media_list[2].caption, 'caption 3')
+        self.assertEqual(media_list[2].likes_count, 3)
+        self.assertEqual(len(tag.media), 4)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_get_comments_pages(self):
+        self.transport.add('GET', 'https://www.instagram.com/p/code1',
+                           mediaPage(1, [commentNode(1)], 2, 'c1'))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query', {
+            'data': {'shortcode_media': {'edge_media_to_comment': connection(
+                [commentNode(2)], 2)}}})
+        media = Media('code1')
+        comments, cursor = self.agent.getComments(media, count=2)
+        self.assertEqual([comment.text for comment in comments],
+                         ['comment 1', 'comment 2'])
+        self.assertEqual(comments[1].owner.login, 'user2')
+        self.assertEqual(media.owner.login, 'owner')
+        self.assertEqual(len(media.comments), 2)
+
+
+    def test_malformed_first_page_of_media(self):
+        media = connection([mediaNode(1)])
+        del media['page_info']
+        self.transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                           page('TagPage', {'hashtag': {
+                               'name': 'tag', 'edge_hashtag_to_media': media,
+                               'edge_hashtag_to_top_posts': connection([])}}))
+        with self.assertRaises(UnexpectedResponse) as context:
+            self.agent.getMedia(Tag('tag'), settings={})
+        self.assertEqual(context.exception.url,
+                         'https://www.instagram.com/explore/tags/tag')
+
+    def test_malformed_first_page_of_likes(self):
+        node = mediaNode(1, {'id': '1', 'username': 'owner'})
+        node['edge_media_to_comment'] = connection([])
+        node['edge_media_preview_like'] = {'count': 0}
+        self.transport.add('GET', 'https://www.instagram.com/p/code1',
+                           page('PostPage', {'shortcode_media': node}))
+        with self.assertRaises(UnexpectedResponse) as context:
+            self.agent.getLikes(Media('code1'), settings={})
+        self.assertEqual(context.exception.url,
+                         'https://www.instagram.com/p/code1')
+
+
+if __name__ == '__main__':
+    unittest.main()
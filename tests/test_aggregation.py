@@ -0,0 +1,92 @@
+import unittest
+
+from InstagramLib.aggregation import EngagementAggregator, SpaceSaving
+from InstagramLib.instagram import Account, Comment, Media
+
+
+def media(code, likes_count=None, followers_count=None):
+    m = Media(code)
+    m.likes_count = likes_count
+    if followers_count is not None:
+        m.owner = Account('owner')
+        m.owner.followers_count = followers_count
+    return m
+
+
+def comment(id, m, login):
+    return Comment(id, m, Account(login), 'text', 0)
+
+
+class SpaceSavingTestCase(unittest.TestCase):
+    def test_replace_smallest(self):
+        counters = SpaceSaving(2)
+        counters.add('a')
+        counters.add('a')
+        counters.add('b', 4)
+        # New key takes count of the smallest counter as error
+        self.assertEqual(counters.add('c'), 'a')
+        self.assertEqual(counters.top(2), [(4, 0, 'b'), (3, 2, 'c')])
+        self.assertEqual(counters.add('d'), 'c')
+        self.assertEqual(counters.counters, {'b': [4, 0], 'd': [4, 3]})
+
+
+class AggregationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = EngagementAggregator(top_k=2, max_posts=2)
+
+    def test_matrix(self):
+        first = media('first', likes_count=10, followers_count=100)
+        self.aggregator.addLike(first, Account('user1'))
+        # Repeated like is counted once
+        self.aggregator.addLike(first, Account('user1'))
+        self.aggregator.addComment(comment('1', first, 'user1'))
+        self.aggregator.addComment(comment('2', first, 'user1'))
+        self.aggregator.addComment(comment('3', first, 'user2'))
+        self.assertEqual(self.aggregator.engagers('first'),
+                         {'user1': (1, 2), 'user2': (0, 1)})
+        self.assertEqual(self.aggregator.engagement('first'), {
+            'likes': 10, 'comments': 3, 'engagers': 2, 'rate': 0.13})
+        self.assertEqual(self.aggregator.posts('user2'), ['first'])
+        self.assertEqual(self.aggregator.top(), [('user1', 3, 0),
+                                                 ('user2', 1, 0)])
+        self.assertIsNone(self.aggregator.engagement('missing'))
+
+    def test_eviction(self):
+        posts = [media('post{0}'.format(number)) for number in range(3)]
+        self.aggregator.addLike(posts[0], Account('user0'))
+        self.aggregator.addLike(posts[1], Account('user1'))
+        # Post is moved to the end by use
+        self.aggregator.addLike(posts[0], Account('user1'))
+        self.aggregator.addLike(posts[2], Account('user2'))
+        self.assertEqual(list(self.aggregator.post_codes.values()),
+                         ['post0', 'post2'])
+        self.assertIsNone(self.aggregator.engagement('post1'))
+        self.assertEqual(self.aggregator.posts('user1'), ['post0'])
+
+    def test_release_of_ids(self):
+        aggregator = EngagementAggregator(top_k=1, top_capacity=1,
+                                          max_posts=1)
+        aggregator.addLike(media('first'), Account('user1'))
+        aggregator.addLike(media('second'), Account('user2'))
+        # Account without posts and counter is forgotten
+        self.assertEqual(list(aggregator.account_keys.values()), ['user2'])
+        self.assertEqual(aggregator.top(), [('user2', 2, 1)])
+
+    def test_consume(self):
+        first = media('first')
+        c = comment('1', first, 'user1')
+        first.comments.add(c)
+        self.aggregator.consume([c, (first, Account('user2'))])
+        self.assertEqual(first.comments, set())
+        self.assertEqual(self.aggregator.engagers('first'),
+                         {'user1': (0, 1), 'user2': (1, 0)})
+
+    def test_type(self):
+        with self.assertRaises(TypeError):
+            self.aggregator.addLike('first', Account('user'))
+        with self.assertRaises(TypeError):
+            self.aggregator.addComment('comment')
+
+
+if __name__ == '__main__':
+    unittest.main()
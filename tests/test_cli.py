@@ -0,0 +1,59 @@
+import io
+import json
+import unittest
+from argparse import Namespace
+
+from InstagramLib.cli import State, Writer, export
+from InstagramLib.instagram import Agent
+from InstagramLib.transport import FakeTransport
+
+from pages import connection, mediaNode, tagPage
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(1), mediaNode(2)], 6, '2'))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           self.query)
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+
+    @staticmethod
+    def query(method, url, params=None, **kwargs):
+        after = int(json.loads(params['variables'])['after'])
+        cursor = str(after + 2) if after + 2 < 6 else None
+        return json.dumps({'data': {'hashtag': {
+            'edge_hashtag_to_media': connection(
+                [mediaNode(after + 1), mediaNode(after + 2)], 6, cursor)}}})
+
+    def export(self, state):
+        file = io.StringIO()
+        args = Namespace(kind='tag', count=None, page_size=2)
+        export(self.agent, args, Writer(file, 'ndjson'), state, 'tag')
+        return [json.loads(line)['code'] for line in file.getvalue().splitlines()]
+
+    def test_page_is_loaded_once(self):
+        state = State(None)
+        self.assertEqual(self.export(state),
+                         ['code{0}'.format(number) for number in range(1, 7)])
+        # Next pages are loaded by cursor without page of tag
+        self.assertEqual([url.split('?')[0] for _, url, _ in
+                          self.transport.requests],
+                         ['https://www.instagram.com/explore/tags/tag'] +
+                         ['https://www.instagram.com/graphql/query/'] * 2)
+        self.assertEqual(state.get('tag'), {'cursor': None, 'count': 6,
+                                            'done': True})
+
+    def test_resume(self):
+        state = State(None)
+        state.set('tag', '4', 4, False)
+        self.agent.rhx_gis = 'gis'
+        self.assertEqual(self.export(state), ['code5', 'code6'])
+        self.assertEqual(len(self.transport.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import os
+import queue
+import tempfile
+import unittest
+
+from InstagramLib.crawling import DONE, WorkQueue, crawl
+from InstagramLib.instagram import Agent
+from InstagramLib.serialization import loads
+from InstagramLib.transport import FakeTransport
+
+from pages import connection, mediaNode, tagPage
+
+
+class CrawlTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(1), mediaNode(2)], 6, '2'))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           self.query)
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+        self.directory = tempfile.TemporaryDirectory()
+        self.work_queue = WorkQueue(os.path.join(self.directory.name,
+                                                 'queue.db'))
+
+    def tearDown(self):
+        self.work_queue.close()
+        self.directory.cleanup()
+
+    @staticmethod
+    def query(method, url, params=None, **kwargs):
+        after = int(json.loads(params['variables'])['after'])
+        cursor = str(after + 2) if after + 2 < 6 else None
+        return json.dumps({'data': {'hashtag': {
+            'edge_hashtag_to_media': connection(
+                [mediaNode(after + 1), mediaNode(after + 2)], 6, cursor)}}})
+
+    def test_crawl(self):
+        self.work_queue.add('tag', 'tag')
+        task = self.work_queue.acquire('worker')[0]
+        results = queue.Queue()
+        crawl(self.work_queue, 'worker', task, lambda _: self.agent, results,
+              2)
+        codes = []
+        while not results.empty():
+            kind, target, data = results.get()
+            objects = loads(data)
+            self.assertEqual((kind, target, objects[0].name),
+                             ('tag', 'tag', 'tag'))
+            codes.extend(media.code for media in objects[1:])
+        self.assertEqual(codes, ['code{0}'.format(number)
+                                 for number in range(1, 7)])
+        self.assertEqual(self.work_queue.stats()[DONE], 1)
+        self.assertEqual(self.work_queue.connection.execute(
+            "SELECT cursor, items FROM tasks").fetchone(), (None, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+
+from InstagramLib.instagram import ExceptionTree
+
+
+class ExceptionTreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tree = ExceptionTree()
+
+    def test_search_by_class(self):
+        action = lambda exception, *args, **kwargs: (args, kwargs)
+        self.tree[LookupError] = action
+        self.assertIs(self.tree[KeyError], action)
+        self.assertIs(self.tree[ValueError], self.tree[Exception])
+
+    def test_pending_names(self):
+        decode = lambda exception, *args, **kwargs: (args, kwargs)
+        missing = lambda exception, *args, **kwargs: (args, kwargs)
+        lookup = lambda exception, *args, **kwargs: (args, kwargs)
+        # Names of modules, which are imported already, and not imported
+        self.tree['json.decoder.JSONDecodeError'] = decode
+        self.tree['json.JSONDecodeError'] = decode
+        self.tree['missing_module.Error'] = missing
+        self.tree[LookupError] = lookup
+        self.assertIs(self.tree[KeyError], lookup)
+        self.assertIs(self.tree[json.JSONDecodeError], decode)
+        self.assertIs(self.tree[ValueError], self.tree[Exception])
+        # Name of not imported module waits for import
+        self.assertEqual([name for name, _ in self.tree.__pending__],
+                         ['missing_module.Error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import unittest
+
+from InstagramLib.deadlines import CancellationToken
+from InstagramLib.instagram import AgentAccount
+from InstagramLib.transport import FakeTransport
+
+from pages import addLogin, connection, mediaNode
+
+
+class FeedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        addLogin(self.transport)
+        self.agent = AgentAccount('login', 'password',
+                                  transport=self.transport)
+        self.transport.add('GET', 'https://www.instagram.com/', {
+            'graphql': {'user': {'edge_web_feed_timeline': self.page(0)}}})
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           self.query)
+        self.transport.requests.clear()
+        self.token = None
+
+    @staticmethod
+    def page(start):
+        return connection([mediaNode(number, {'id': '1', 'username': 'owner'})
+                           for number in range(start, start + 3)],
+                          cursor='c{0}'.format(start + 3))
+
+    def query(self, method, url, params=None, **kwargs):
+        variables = json.loads(params['variables'])
+        if self.token is not None:
+            self.token.cancel()
+        start = int(variables['fetch_media_item_cursor'][1:])
+        return json.dumps({'data': {'user': {
+            'edge_web_feed_timeline': self.page(start)}}})
+
+    def test_pages(self):
+        feed, cursor = self.agent.feed(count=6, cursor=True)
+        self.assertEqual([media.code for media in feed],
+                         ['code{0}'.format(number) for number in range(6)])
+        self.assertEqual(cursor, 'c6')
+        self.assertEqual(feed[0].owner.login, 'owner')
+
+    def test_list(self):
+        feed = self.agent.feed(count=3, settings={})
+        self.assertIsInstance(feed, list)
+        self.assertEqual([media.code for media in feed],
+                         ['code0', 'code1', 'code2'])
+
+    def test_resume(self):
+        feed, cursor = self.agent.feed(count=3, after='c6',
+                                       cursor=True)
+        self.assertEqual([media.code for media in feed],
+                         ['code6', 'code7', 'code8'])
+        self.assertEqual(cursor, 'c9')
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_cancel(self):
+        # Token is cancelled by the first page of graphql
+        self.token = CancellationToken()
+        self.agent.setDeadline(token=self.token)
+        feed, cursor = self.agent.feed(count=9, cursor=True)
+        self.assertEqual(len(feed), 6)
+        self.assertEqual(cursor, 'c6')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from InstagramLib.exceptions import InternetException
+from InstagramLib.harvesting import CommentHarvester
+from InstagramLib.instagram import Agent, Media
+from InstagramLib.transport import FakeTransport
+
+from pages import commentNode, connection, mediaPage
+
+
+class HarvestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add(
+            'GET', 'https://www.instagram.com/p/code1',
+            mediaPage(1, [commentNode(number) for number in range(1, 4)], 5,
+                      'cursor'))
+        self.transport.add('GET', 'https://www.instagram.com/p/code2',
+                           mediaPage(2, [commentNode(10)]))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           self.query)
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+        self.harvester = CommentHarvester(self.agent, workers=2)
+
+    @staticmethod
+    def query(method, url, params=None, **kwargs):
+        variables = json.loads(params['variables'])
+        nodes = [commentNode(number) for number in range(4, 6)]
+        return json.dumps({'data': {'shortcode_media': {
+            'edge_media_to_comment': connection(
+                nodes[:variables['first']], 5)}}})
+
+    def variables(self):
+        return [json.loads(kwargs['params']['variables'])
+                for _, url, kwargs in self.transport.requests
+                if url.endswith('/graphql/query/')]
+
+    def test_harvest(self):
+        media = [Media('code1'), Media('code2')]
+        comments = list(self.harvester.harvest(media))
+        self.assertEqual(sorted(int(c.id) for c in comments),
+                         [1, 2, 3, 4, 5, 10])
+        self.assertEqual({c.media.code for c in comments if c.id == '10'},
+                         {'code2'})
+        # Next pages are requested only for media with more comments
+        self.assertEqual(self.variables(), [
+            {'shortcode': 'code1', 'first': 50, 'after': 'cursor'}])
+        self.assertEqual(len(media[0].comments), 5)
+        self.assertEqual(self.harvester.errors, [])
+
+    def test_count(self):
+        comments = list(self.harvester.harvest([Media('code1')], count=4))
+        self.assertEqual(sorted(int(c.id) for c in comments), [1, 2, 3, 4])
+        self.assertEqual(self.variables()[0]['first'], 1)
+
+    def test_errors(self):
+        media = Media('missing')
+        comments = list(self.harvester.harvest(
+            [media, 'code', Media('code2')]))
+        # Failed media don't stop other media
+        self.assertEqual([c.id for c in comments], ['10'])
+        errors = sorted(self.harvester.errors, key=lambda error: error[0] is
+                        media)
+        self.assertEqual([m for m, _ in errors], ['code', media])
+        self.assertIsInstance(errors[0][1], TypeError)
+        self.assertIsInstance(errors[1][1], InternetException)
+
+    def test_early_stop(self):
+        harvester = CommentHarvester(self.agent, workers=1, queue_size=1)
+        iterator = harvester.harvest([Media('code1'), Media('code2')])
+        self.assertIsNotNone(next(iterator))
+        iterator.close()
+        self.assertEqual(harvester.errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import unittest
+from time import sleep
+from unittest import mock
+
+from InstagramLib.transport import FakeTransport, HedgedTransport, Response
+
+
+class ClosingResponse(Response):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    # Time of transport module, requests move it by their latency
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def route(self, latency):
+        def content(method, url, params=None, **kwargs):
+            self.now += latency
+            return b''
+        return content
+
+
+class HedgedTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.responses = []
+        self.primary = FakeTransport()
+        self.primary.add('GET', 'https://example.com/fast', b'fast')
+        self.primary.add('GET', 'https://example.com/slow', self.slow)
+        self.hedge = FakeTransport()
+        self.hedge.add('GET', 'https://example.com/slow', b'hedge')
+
+    def slow(self, method, url, params=None, **kwargs):
+        # Primary request waits for release by test
+        self.release.wait(5)
+        response = ClosingResponse(url, 200, b'slow')
+        self.responses.append(response)
+        return response
+
+    def transport(self, **kwargs):
+        kwargs = dict(dict(budget=1, min_delay=0.05, min_samples=1),
+                      **kwargs)
+        transport = HedgedTransport(self.primary, self.hedge, **kwargs)
+        self.addCleanup(transport.close)
+        # Latency for delay of hedge
+        transport.request('GET', 'https://example.com/fast')
+        return transport
+
+    def test_hedge_wins(self):
+        transport = self.transport()
+        response = transport.request('GET', 'https://example.com/slow')
+        self.assertEqual(response.content, b'hedge')
+        self.assertEqual(transport.stats(), {
+            'requests': 2, 'hedged': 1, 'wins': 1, 'denied': 0,
+            'delay': 0.05})
+        # Late response of loser is closed
+        self.release.set()
+        for _ in range(500):
+            if self.responses:
+                break
+            sleep(0.01)
+        self.assertEqual(len(self.responses), 1)
+        self.assertTrue(self.responses[0].closed)
+
+    def test_primary_wins_before_delay(self):
+        transport = self.transport(min_delay=5)
+        threading.Timer(0.05, self.release.set).start()
+        response = transport.request('GET', 'https://example.com/slow')
+        self.assertEqual(response.content, b'slow')
+        self.assertFalse(response.closed)
+        self.assertEqual(self.hedge.requests, [])
+        self.assertEqual(transport.stats()['hedged'], 0)
+
+    def test_primary_wins_after_failed_hedge(self):
+        self.hedge.add('GET', 'https://example.com/slow', self.fail)
+        transport = self.transport()
+        threading.Timer(0.1, self.release.set).start()
+        response = transport.request('GET', 'https://example.com/slow')
+        # Error is returned only if both requests are failed
+        self.assertEqual(response.content, b'slow')
+        self.assertEqual(len(self.hedge.requests), 1)
+        self.assertEqual(transport.stats()['wins'], 0)
+
+    def test_budget(self):
+        transport = self.transport(budget=0)
+        threading.Timer(0.05, self.release.set).start()
+        response = transport.request('GET', 'https://example.com/slow')
+        self.assertEqual(response.content, b'slow')
+        self.assertEqual(self.hedge.requests, [])
+
+    def test_not_get(self):
+        self.primary.add('POST', 'https://example.com/slow', self.slow)
+        transport = self.transport()
+        threading.Timer(0.05, self.release.set).start()
+        transport.request('POST', 'https://example.com/slow')
+        self.assertEqual(self.hedge.requests, [])
+        self.assertEqual(transport.stats()['requests'], 1)
+
+    def test_percentile_delay(self):
+        clock = Clock()
+        for number in range(1, 11):
+            self.primary.add('GET', 'https://example.com/{0}'.format(number),
+                             clock.route(number))
+        transport = HedgedTransport(self.primary, percentile=50, budget=0,
+                                    min_delay=0, min_samples=5)
+        with mock.patch('InstagramLib.transport.time', clock):
+            for number in range(1, 5):
+                transport.request('GET', 'https://example.com/{0}'.format(
+                    number))
+            # Delay isn't known without enough samples
+            self.assertIsNone(transport.delay)
+            for number in range(5, 11):
+                transport.request('GET', 'https://example.com/{0}'.format(
+                    number))
+            # Median of first 5 samples
+            self.assertEqual(transport.delay, 3)
+            # Delay is recalculated only after 50 new samples
+            for _ in range(44):
+                transport.request('GET', 'https://example.com/10')
+            self.assertEqual(transport.delay, 3)
+            transport.request('GET', 'https://example.com/10')
+            self.assertEqual(transport.delay, 10)
+
+    def test_min_delay(self):
+        transport = self.transport(min_delay=0.5)
+        self.assertEqual(transport.delay, 0.5)
+
+    @staticmethod
+    def fail(method, url, params=None, **kwargs):
+        raise ConnectionError(url)
+
+
+if __name__ == '__main__':
+    unittest.main()
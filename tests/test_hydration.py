@@ -0,0 +1,121 @@
+import pickle
+import unittest
+
+from InstagramLib.exceptions import NotUpdatedElement
+from InstagramLib.hydration import LazyElement
+from InstagramLib.instagram import Account, Agent, Location, Media, Tag
+from InstagramLib.transport import FakeTransport
+
+from pages import accountPage, locationPage, mediaNode, mediaPage, tagPage
+
+
+class HydrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        for number in range(1, 4):
+            login = 'user{0}'.format(number)
+            self.transport.add('GET', 'https://www.instagram.com/' + login,
+                               accountPage(login, number, number * 10))
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+        self.agent.enableLazyMode(batch_size=2)
+        self.addCleanup(self.agent.disableLazyMode)
+
+    def urls(self):
+        return sorted(url for _, url, _ in self.transport.requests)
+
+    def test_batch(self):
+        accounts = [Account('user{0}'.format(number))
+                    for number in range(1, 4)]
+        self.agent.bind(*accounts)
+        self.assertEqual(accounts[0].followers_count, 10)
+        # Element of the same batch is loaded with the first one, the last
+        # element waits for next batch
+        self.assertEqual([ref() for ref in
+                          self.agent.hydrator.__pending__.values()],
+                         [accounts[2]])
+        self.assertEqual(accounts[1].followers_count, 20)
+        self.assertEqual(len(self.transport.requests), 2)
+        self.assertEqual(accounts[2].followers_count, 30)
+        self.assertEqual(accounts[0].id, '1')
+        # Every element is loaded once by TTL
+        self.assertEqual(self.urls(), [
+            'https://www.instagram.com/user{0}'.format(number)
+            for number in range(1, 4)])
+
+    def test_failure(self):
+        account = Account('missing')
+        self.agent.bind(account)
+        with self.assertRaises(NotUpdatedElement):
+            account.followers_count
+
+    def test_not_bound_element(self):
+        account = Account('user1')
+        self.assertIsNone(account.followers_count)
+        self.assertIs(type(account), Account)
+        self.assertEqual(self.transport.requests, [])
+
+    def test_type(self):
+        account = Account('user1')
+        self.agent.bind(account)
+        self.assertIsInstance(account, Account)
+        self.assertIsInstance(account, LazyElement)
+        self.assertTrue(issubclass(type(account), Account))
+        self.assertEqual(type(account).__name__, 'Account')
+        # One class is made for all bound elements of class
+        other = Account('user2')
+        self.agent.bind(other)
+        self.assertIs(type(other), type(account))
+
+    def test_pickle(self):
+        account = Account('user1')
+        self.agent.bind(account)
+        self.assertEqual(account.followers_count, 10)
+        restored = pickle.loads(pickle.dumps(account))
+        # Restored element isn't bound to hydrator
+        self.assertIs(type(restored), Account)
+        self.assertNotIn('__hydrator__', vars(restored))
+        self.assertEqual((restored.login, restored.followers_count),
+                         ('user1', 10))
+
+    def test_embedded_owner_and_location(self):
+        node = mediaNode(1, {'id': '7', 'username': 'user1'})
+        node['location'] = {'id': '5', 'name': 'Place', 'slug': 'place',
+                            'has_public_page': True}
+        other = mediaNode(2, {'id': '8', 'username': 'user2'})
+        other['location'] = None
+        self.transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                           tagPage('tag', [node, other]))
+        media, _ = self.agent.getMedia(Tag('tag'), settings={})
+        media = {item.code: item for item in media}
+        first, second = media['code1'], media['code2']
+        self.assertEqual((first.owner.login, first.owner.id), ('user1', '7'))
+        self.assertEqual((first.location.id, first.location.name),
+                         ('5', 'Place'))
+        self.assertIn('owner', first.getFields())
+        # Null location of node is loaded value, not absent one
+        self.assertIsNone(second.location)
+        self.assertIn('location', second.getFields())
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_absent_owner_and_location(self):
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/locations/5',
+            locationPage(5, [mediaNode(1)]))
+        self.transport.add('GET', 'https://www.instagram.com/p/code1',
+                           mediaPage(1, []))
+        media, _ = self.agent.getMedia(Location('5'), settings={})
+        self.assertEqual(media[0].likes_count, 1)
+        self.assertNotIn('owner', media[0].getFields())
+        self.assertNotIn('location', media[0].getFields())
+        self.assertEqual(len(self.transport.requests), 1)
+        # Owner with id only and absent location are loaded from page of media
+        self.assertEqual(media[0].owner.login, 'owner')
+        self.assertIsNone(media[0].location)
+        self.assertEqual(self.transport.requests[-1][1],
+                         'https://www.instagram.com/p/code1')
+        self.assertIsInstance(media[0], Media)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from InstagramLib.indexing import InvertedIndex, parseQuery, tokenize
+from InstagramLib.instagram import Account, Comment, Media
+
+DAY = 86400
+
+
+def media(code, caption, date):
+    m = Media(code)
+    m.caption = caption
+    m.date = date
+    return m
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'index')
+        self.index = self.open()
+
+    def open(self, path=None, **kwargs):
+        index = InvertedIndex(path or self.path, **kwargs)
+        self.addCleanup(index.close)
+        return index
+
+    def fill(self, index):
+        index.update([
+            media('code1', 'Sea and #sun with @friend.one', DAY),
+            media('code2', 'sea #rain', 2 * DAY),
+            media('code3', 'Mountains #sun', 3 * DAY),
+        ])
+        first = media('code1', None, None)
+        index.add(Comment('1', first, Account('user'), 'the sea is #sun', 10))
+
+    @staticmethod
+    def keys(results):
+        return [key for _, key, _ in results]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Sea #Sun @friend.one.'), {
+            'sea', 'sun', 'friend', 'one', '#sun', '@friend.one'})
+        self.assertEqual(parseQuery('a b|c -d'), ([['a'], ['b', 'c']],
+                                                  ['d']))
+
+    def test_search(self):
+        self.fill(self.index)
+        # Documents are returned in reverse order of adding
+        self.assertEqual(self.index.search('sea'), [
+            ('comment', '1', 10), ('media', 'code2', 2 * DAY),
+            ('media', 'code1', DAY)])
+        self.assertEqual(self.keys(self.index.search('sea #sun')),
+                         ['1', 'code1'])
+        self.assertEqual(self.keys(self.index.search('#rain|mountains')),
+                         ['code3', 'code2'])
+        self.assertEqual(self.keys(self.index.search('#sun -sea')),
+                         ['code3'])
+        self.assertEqual(self.keys(self.index.search('@friend.one')),
+                         ['code1'])
+        self.assertEqual(self.keys(self.index.search('sea', kind='media')),
+                         ['code2', 'code1'])
+        self.assertEqual(self.keys(self.index.search('sea', limit=1)), ['1'])
+        self.assertEqual(self.index.search('-sea'), [])
+        with self.assertRaises(ValueError):
+            self.index.search('sea', kind='account')
+
+    def test_time_range(self):
+        self.fill(self.index)
+        self.assertEqual(self.keys(self.index.search(
+            '#sun', since=DAY, until=4 * DAY)), ['code3', 'code1'])
+        self.assertEqual(self.keys(self.index.search(
+            'sea', since=2 * DAY)), ['code2'])
+        self.assertEqual(self.keys(self.index.search(
+            'sea', until=DAY, limit=5)), ['1'])
+
+    def test_add_once(self):
+        self.assertTrue(self.index.add(media('code', 'sea', DAY)))
+        self.assertFalse(self.index.add(media('code', 'sea', DAY)))
+        self.assertEqual(len(self.index), 1)
+        with self.assertRaises(TypeError):
+            self.index.add(Account('user'))
+
+    def test_compact(self):
+        index = self.open(os.path.join(self.path, 'other'), flush_size=1)
+        self.fill(index)
+        self.assertGreater(len(index.segments), 1)
+        results = index.search('sea')
+        index.compact()
+        self.assertEqual(len(index.segments), 1)
+        self.assertEqual(index.search('sea'), results)
+        self.assertEqual(sorted(name for name in os.listdir(index.path)
+                                if name.startswith('segment')),
+                         [os.path.basename(index.segments[0].path)])
+
+    def test_max_segments(self):
+        index = self.open(os.path.join(self.path, 'other'), flush_size=1,
+                          max_segments=2)
+        for number in range(5):
+            index.add(media('code{0}'.format(number), 'sea', None))
+            self.assertLessEqual(len(index.segments), 2)
+        self.assertEqual(len(index.search('sea')), 5)
+
+    def test_reopen(self):
+        path = os.path.join(self.path, 'other')
+        with InvertedIndex(path) as index:
+            self.fill(index)
+        index = self.open(path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(self.keys(index.search('sea')),
+                         ['1', 'code2', 'code1'])
+        self.assertEqual(index.terms(), {
+            'sea', 'and', 'sun', 'with', 'friend', 'one', '#sun',
+            '@friend.one', 'rain', '#rain', 'mountains', 'the', 'is'})
+
+    def test_reopen_partially_flushed(self):
+        self.index.add(media('code1', 'sea', DAY))
+        self.index.flush()
+        self.index.add(media('code2', 'sea', DAY))
+        # Search writes documents, but postings stay in memory, so copy is
+        # state after crash
+        self.assertEqual(len(self.index.search('sea')), 2)
+        copy = os.path.join(os.path.dirname(self.path), 'copy')
+        shutil.copytree(self.path, copy)
+        index = self.open(copy)
+        # Document without postings is removed and can be added again
+        self.assertEqual(len(index), 1)
+        self.assertEqual(self.keys(index.search('sea')), ['code1'])
+        self.assertTrue(index.add(media('code2', 'sea', DAY)))
+        self.assertEqual(self.keys(index.search('sea')), ['code2', 'code1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
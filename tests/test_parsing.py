@@ -0,0 +1,83 @@
+import json
+import pickle
+import unittest
+
+from InstagramLib.instagram import Agent, Media, Tag
+from InstagramLib.parsing import (commentRecord, compactEdges, parseEdges,
+                                  parsePage)
+from InstagramLib.transport import FakeTransport
+
+from pages import commentNode, connection, mediaNode, tagPage
+
+
+class ParsingTestCase(unittest.TestCase):
+    def test_parse_page(self):
+        content = tagPage('tag', [mediaNode(1), mediaNode(2)], 10, 'cursor',
+                          top=[mediaNode(3)]).encode('utf-8')
+        data = parsePage(content, 'utf-8', 'Tag')
+        self.assertEqual((data['rhx_gis'], data['csrf_token']),
+                         ('gis', 'token'))
+        edges = data['data']['edge_hashtag_to_media']
+        self.assertEqual(edges['count'], 10)
+        self.assertEqual(edges['page_info']['end_cursor'], 'cursor')
+        # Nodes are replaced by records with code of media as key
+        self.assertEqual([record[0] for record in edges['edges']],
+                         ['code1', 'code2'])
+        self.assertEqual(
+            [record[0] for record in
+             data['data']['edge_hashtag_to_top_posts']['edges']], ['code3'])
+
+    def test_parse_edges(self):
+        content = json.dumps({'data': {'shortcode_media': {
+            'edge_media_to_comment': connection(
+                [commentNode(1), commentNode(2)], 5, 'next')}}}).encode()
+        data = parseEdges(content, None, ('data', 'shortcode_media',
+                                          'edge_media_to_comment'), 'comment')
+        self.assertEqual(data['edges'], [commentRecord(commentNode(1)),
+                                         commentRecord(commentNode(2))])
+        self.assertEqual(data['count'], 5)
+
+    def test_comment_record(self):
+        self.assertEqual(commentRecord(commentNode(7)),
+                         ('7', 'user7', 'comment 7', 1520000007))
+
+    def test_compact_edges(self):
+        data = compactEdges(connection([{'id': '1'}, {'id': '2'}]), 'id')
+        self.assertEqual(data['edges'], ['1', '2'])
+        data = compactEdges(connection([mediaNode(1, {
+            'id': '5', 'username': 'owner'})]), 'media')
+        # Records are picklable, so they are sent from processes
+        record = pickle.loads(pickle.dumps(data['edges'][0]))
+        media = Media(record[0])
+        media.__setDataFromRecord__(record)
+        self.assertEqual((media.code, media.id, media.caption,
+                          media.likes_count, media.date),
+                         ('code1', '1', 'caption 1', 1, 1520000001))
+
+
+class ParseExecutorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(number) for number in range(1, 6)], 5))
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+
+    def media(self):
+        media, _ = self.agent.getMedia(Tag('tag'), count=5, settings={})
+        return sorted((item.code, item.id, item.caption, item.likes_count)
+                      for item in media)
+
+    def test_executor(self):
+        inline = self.media()
+        # Every response is parsed in process of pool
+        self.agent.enableParseExecutor(workers=1, threshold=0)
+        self.addCleanup(self.agent.disableParseExecutor)
+        self.assertIsNotNone(self.agent.parse_executor)
+        self.assertEqual(self.media(), inline)
+        self.assertEqual(len(inline), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
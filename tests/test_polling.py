@@ -0,0 +1,149 @@
+import threading
+import unittest
+from time import sleep, time
+
+from InstagramLib.instagram import Agent, Location, Media, Tag
+from InstagramLib.polling import PollingScheduler
+from InstagramLib.transport import FakeTransport
+
+from pages import mediaNode, tagPage
+
+
+def mediaList(*dates):
+    media_list = []
+    for number, date in enumerate(dates):
+        media = Media('code{0}'.format(number))
+        media.date = date
+        media_list.append(media)
+    return media_list
+
+
+class PollingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = PollingScheduler(budget=1, min_interval=60,
+                                          max_interval=86400,
+                                          items_per_poll=12, smoothing=0.5)
+
+    def test_add(self):
+        target = self.scheduler.add(Tag('tag'))
+        self.assertIs(self.scheduler.add(Tag('tag')), target)
+        self.scheduler.add(Location('1'))
+        self.assertEqual(len(self.scheduler), 2)
+        self.assertEqual(target.interval, 60)
+        with self.assertRaises(TypeError):
+            self.scheduler.add(Media('code'))
+
+    def test_first_rate_by_dates(self):
+        target = self.scheduler.add(Tag('tag'))
+        new = self.scheduler.observe(target, 100, mediaList(0, 100, 200),
+                                     now=1000)
+        self.assertEqual(len(new), 3)
+        self.assertAlmostEqual(target.rate, 0.01)
+        # 12 items per poll at 0.01 posts per second
+        self.assertAlmostEqual(target.interval, 1200)
+        self.assertAlmostEqual(target.due, 2200)
+
+    def test_rate_by_media_count_and_new_media(self):
+        target = self.scheduler.add(Tag('tag'))
+        self.scheduler.observe(target, 100, mediaList(0, 100, 200), now=1000)
+        # Known media are not new, media_count grows faster than the page
+        new = self.scheduler.observe(target, 120,
+                                     mediaList(0, 100, 200, 300), now=2000)
+        self.assertEqual([media.code for media in new], ['code3'])
+        self.assertAlmostEqual(target.rate, 0.5 * 0.02 + 0.5 * 0.01)
+        # Intervals are limited by min and max intervals
+        self.scheduler.observe(target, 1120, [], now=2010)
+        self.assertEqual(target.interval, 60)
+        quiet = self.scheduler.add(Tag('quiet'))
+        self.scheduler.observe(quiet, 10, mediaList(0), now=1000)
+        self.assertEqual(quiet.rate, 0)
+        self.assertEqual(quiet.interval, 86400)
+
+    def test_budget(self):
+        scheduler = PollingScheduler(budget=0.01, min_interval=60)
+        targets = [scheduler.add(Tag(str(number))) for number in range(4)]
+        # 4 targets by 1/60 requests per second are stretched to 0.01
+        self.assertAlmostEqual(scheduler.scale(), 4 / 60 / 0.01)
+        scheduler.observe(targets[0], None, [], now=0)
+        self.assertAlmostEqual(targets[0].frequency, 1 / 86400)
+        self.assertAlmostEqual(
+            targets[0].interval, (3 / 60 + 1 / 86400) / 0.01 * 86400)
+
+    def test_next(self):
+        first = self.scheduler.add(Tag('first'))
+        second = self.scheduler.add(Tag('second'))
+        third = self.scheduler.add(Tag('third'))
+        # Targets are due after minimal interval since the last poll
+        now = time()
+        self.scheduler.observe(second, None, mediaList(1, 2), now=now - 70)
+        self.scheduler.observe(first, None, mediaList(1, 2), now=now - 100)
+        self.scheduler.observe(third, None, mediaList(1, 2), now=now - 100)
+        self.scheduler.remove(third.obj)
+        self.assertIs(self.scheduler.next(timeout=0), first)
+        self.assertIs(self.scheduler.next(timeout=0), second)
+        self.assertTrue(second.running)
+        self.assertIsNone(self.scheduler.next(timeout=0))
+        self.assertEqual(len(self.scheduler), 2)
+
+    def test_next_stop(self):
+        self.scheduler.observe(self.scheduler.add(Tag('tag')), None, [])
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        self.assertIsNone(self.scheduler.next(stop=stop))
+
+    def test_fail(self):
+        target = self.scheduler.add(Tag('tag'))
+        now = time()
+        self.scheduler.fail(target, now=now)
+        self.assertEqual(target.due, now + 120)
+        self.scheduler.fail(target, now=now)
+        self.assertEqual(target.due, now + 240)
+        self.assertIsNone(self.scheduler.next(timeout=0))
+
+    def test_poll(self):
+        transport = FakeTransport()
+        transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                      tagPage('tag', [mediaNode(1), mediaNode(2)], 50))
+        agent = Agent()
+        agent.setTransport(transport)
+        target = self.scheduler.add(Tag('tag'))
+        new = self.scheduler.poll(agent, target)
+        self.assertEqual(sorted(media.code for media in new),
+                         ['code1', 'code2'])
+        self.assertEqual(target.media_count, 50)
+        self.assertEqual(self.scheduler.poll(agent, target), [])
+
+    def test_run(self):
+        transport = FakeTransport()
+        transport.add('GET', 'https://www.instagram.com/explore/tags/tag',
+                      tagPage('tag', [mediaNode(1)]))
+        agent = Agent()
+        agent.setTransport(transport)
+        scheduler = PollingScheduler(budget=100)
+        scheduler.add(Tag('tag'))
+        failed = scheduler.add(Tag('missing'))
+        stop = threading.Event()
+        found = []
+
+        def callback(obj, new):
+            found.append((obj.name, [media.code for media in new]))
+
+        thread = threading.Thread(target=scheduler.run, args=(agent,),
+                                  kwargs={'workers': 2, 'callback': callback,
+                                          'settings': {}, 'stop': stop})
+        thread.start()
+        for _ in range(500):
+            if found and failed.errors:
+                break
+            sleep(0.01)
+        stop.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(found, [('tag', ['code1'])])
+        # Failed target is polled again later
+        self.assertEqual(failed.errors, 1)
+        self.assertGreater(failed.due, time() + 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from InstagramLib.instagram import AgentAccount, Tag
+from InstagramLib.transport import FakeTransport
+
+from pages import addLogin, connection, mediaNode, tagPage
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        addLogin(self.transport)
+        self.agent = AgentAccount('login', 'password',
+                                  transport=self.transport)
+        # Feed is loaded from start page after login
+        self.transport.add('GET', 'https://www.instagram.com/', {
+            'graphql': {'user': {'edge_web_feed_timeline': connection(
+                [mediaNode(number, {'id': '1', 'username': 'owner'})
+                 for number in range(3)], cursor='c1')}}})
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(1), mediaNode(2)]))
+
+    def test_methods(self):
+        profiler = self.agent.enableProfiling()
+        self.agent.feed(count=3)
+        self.agent.getMedia(Tag('tag'), count=2)
+        self.agent.disableProfiling()
+        self.assertEqual(profiler.stats['feed']['calls'], 1)
+        self.assertEqual(profiler.stats['__update__']['calls'], 1)
+        self.assertIn('feed;network', profiler.folded)
+        self.assertIn('feed;decode', profiler.folded)
+
+    def test_bandwidth(self):
+        self.agent.enableBandwidthMeter()
+        self.agent.feed(count=3)
+        report = self.agent.getBandwidth()
+        self.agent.disableBandwidthMeter()
+        # Bytes of feed are not counted without method
+        self.assertNotIn(None, report)
+        self.assertEqual(report['feed']['requests'], 1)
+        self.assertEqual(report['feed']['items'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
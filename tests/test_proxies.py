@@ -0,0 +1,138 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from InstagramLib.instagram import Agent
+from InstagramLib.proxies import ProxyPool, ProxyTransport
+from InstagramLib.transport import FakeTransport, RequestsTransport
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    # Stand-in proxy answers requests itself instead of forwarding them
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('Cookie')))
+        body = self.server.name.encode('utf-8')
+        self.send_response(200)
+        if self.path.endswith('/login'):
+            self.send_header('Set-Cookie', 'csrftoken=token; Path=/')
+            self.send_header('Set-Cookie', 'sessionid=secret; Path=/')
+        elif self.path.endswith('/rotate'):
+            self.send_header('Set-Cookie', 'csrftoken=rotated; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def startProxy(name):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+    server.name = name
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class GzipTransport(FakeTransport):
+    encodings = ['gzip']
+
+
+class ProxyEncodingsTestCase(unittest.TestCase):
+    def test_factory(self):
+        proxies = []
+
+        def factory(proxy):
+            proxies.append(proxy)
+            return GzipTransport()
+
+        transport = ProxyTransport(ProxyPool(['http://proxy1',
+                                              'http://proxy2']),
+                                   factory=factory)
+        # Encodings are taken from transport of proxy before first request
+        self.assertEqual(transport.acceptEncoding, 'gzip')
+        self.assertEqual(proxies, ['http://proxy1'])
+        transport.request('GET', 'https://www.instagram.com/')
+        self.assertEqual(len(proxies), 1)
+
+    def test_shared_transport(self):
+        transport = ProxyTransport(ProxyPool(['http://proxy']),
+                                   GzipTransport())
+        self.assertEqual(transport.encodings, ['gzip'])
+
+
+@unittest.skipIf(requests is None, "requires 'requests' package")
+class ProxyTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.servers = [startProxy('p1'), startProxy('p2')]
+        for server in self.servers:
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+        self.proxies = ['http://127.0.0.1:{0}'.format(server.server_port)
+                        for server in self.servers]
+        # Every proxy has one request, so requests go by turns
+        self.pool = ProxyPool(self.proxies, rate=0.001, burst=1)
+
+    def factory(self, proxy):
+        session = requests.Session()
+        session.trust_env = False
+        session.proxies = {'http': proxy, 'https': proxy}
+        return RequestsTransport(session)
+
+    def test_factory_shares_cookies(self):
+        transport = ProxyTransport(self.pool, factory=self.factory)
+        self.addCleanup(transport.close)
+        agent = Agent()
+        agent.setTransport(transport)
+        first = agent.transport.get('http://www.instagram.com/accounts/login')
+        self.assertEqual(agent.transport.cookies['csrftoken'], 'token')
+        second = agent.transport.get('http://www.instagram.com/')
+        # Login cookie of first proxy is sent by second proxy
+        self.assertEqual({first.text, second.text}, {'p1', 'p2'})
+        second = self.servers[0] if second.text == 'p1' else self.servers[1]
+        self.assertEqual(second.requests, [
+            ('http://www.instagram.com/', 'csrftoken=token; sessionid=secret')])
+
+    def test_factory_keeps_domains_of_cookies(self):
+        pool = ProxyPool(self.proxies[:1], rate=1000)
+        transport = ProxyTransport(pool, factory=self.factory)
+        self.addCleanup(transport.close)
+        transport.get('http://www.instagram.com/accounts/login')
+        transport.get('http://www.instagram.com/')
+        transport.get('http://www.instagram.com/rotate')
+        transport.get('http://www.instagram.com/')
+        transport.get('http://evil.example.com/')
+        self.assertEqual(self.servers[0].requests[1:], [
+            ('http://www.instagram.com/', 'csrftoken=token; sessionid=secret'),
+            ('http://www.instagram.com/rotate',
+             'csrftoken=token; sessionid=secret'),
+            ('http://www.instagram.com/',
+             'csrftoken=rotated; sessionid=secret'),
+            # Cookies of Instagram aren't sent to other hosts
+            ('http://evil.example.com/', None),
+        ])
+        self.assertEqual(transport.cookies['csrftoken'], 'rotated')
+        self.assertEqual(transport.cookies['sessionid'], 'secret')
+
+    def test_shared_transport(self):
+        shared = RequestsTransport()
+        shared.session.trust_env = False
+        transport = ProxyTransport(self.pool, shared)
+        self.addCleanup(transport.close)
+        responses = [transport.get('http://www.instagram.com/accounts/login'),
+                     transport.get('http://www.instagram.com/')]
+        self.assertEqual({response.text for response in responses},
+                         {'p1', 'p2'})
+        self.assertEqual(transport.cookies['csrftoken'], 'token')
+        stats = self.pool.stats()
+        self.assertEqual([stats[proxy]['successes']
+                          for proxy in self.proxies], [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+
+from InstagramLib.instagram import Account, Agent, Media, Tag
+from InstagramLib.retention import (IdCollection, LRUCollection,
+                                    NullCollection, WindowCollection,
+                                    createCollection, setRetention)
+from InstagramLib.transport import FakeTransport
+
+from pages import mediaNode, tagPage
+
+
+def accounts(*logins):
+    return [Account(login) for login in logins]
+
+
+class CollectionTestCase(unittest.TestCase):
+    def test_all(self):
+        collection = createCollection('all', items=accounts('a'))
+        self.assertIsInstance(collection, set)
+        self.assertEqual(len(collection), 1)
+
+    def test_off(self):
+        collection = createCollection('off', items=accounts('a'))
+        collection.add(Account('b'))
+        self.assertIsInstance(collection, NullCollection)
+        self.assertEqual((len(collection), list(collection)), (0, []))
+        self.assertNotIn(Account('b'), collection)
+
+    def test_lru(self):
+        collection = createCollection('lru', size=2, items=accounts('a', 'b'))
+        self.assertIsInstance(collection, LRUCollection)
+        # Added again element is the last used one
+        collection.add(Account('a'))
+        collection.add(Account('c'))
+        self.assertEqual([obj.login for obj in collection], ['a', 'c'])
+        self.assertIn(Account('a'), collection)
+        self.assertNotIn(Account('b'), collection)
+        collection.discard(Account('a'))
+        self.assertEqual(len(collection), 1)
+
+    def test_window(self):
+        with mock.patch('InstagramLib.retention.time', return_value=100):
+            collection = createCollection('window', window=10,
+                                          items=accounts('a', 'b'))
+        self.assertIsInstance(collection, WindowCollection)
+        with mock.patch('InstagramLib.retention.time', return_value=105):
+            collection.add(Account('a'))
+            collection.add(Account('c'))
+            self.assertEqual(len(collection), 3)
+        # Elements, which was not added for window, are removed
+        with mock.patch('InstagramLib.retention.time', return_value=111):
+            self.assertEqual([obj.login for obj in collection], ['a', 'c'])
+        with mock.patch('InstagramLib.retention.time', return_value=116):
+            self.assertEqual(len(collection), 0)
+
+    def test_ids(self):
+        collection = createCollection('ids', items=[Media('code')])
+        collection.add(Tag('tag'))
+        self.assertIsInstance(collection, IdCollection)
+        # Only keys of elements are kept
+        self.assertEqual(sorted(collection), ['code', 'tag'])
+        self.assertIn(Media('code'), collection)
+        collection.difference_update([Media('code')])
+        self.assertEqual(list(collection), ['tag'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            createCollection('unknown')
+        with self.assertRaises(TypeError):
+            createCollection('lru')
+        with self.assertRaises(TypeError):
+            createCollection('window', window=-1)
+        with self.assertRaises(ValueError):
+            setRetention(Account('a'), 'likes', 'ids')
+
+    def test_element_retention(self):
+        account = Account('a')
+        account.followers.update(accounts('b', 'c'))
+        setRetention(account, 'followers', 'lru', size=1)
+        self.assertIsInstance(account.followers, LRUCollection)
+        self.assertEqual(len(account.followers), 1)
+
+
+class AgentRetentionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add(
+            'GET', 'https://www.instagram.com/explore/tags/tag',
+            tagPage('tag', [mediaNode(number) for number in range(1, 4)]))
+        self.agent = Agent()
+        self.agent.setTransport(self.transport)
+
+    def test_agent_retention(self):
+        self.agent.setRetention('media', 'lru', size=2)
+        tag = Tag('tag')
+        media_list, _ = self.agent.getMedia(tag, settings={})
+        # Result isn't limited, only the collection of element
+        self.assertEqual(len(media_list), 3)
+        self.assertIsInstance(tag.media, LRUCollection)
+        self.assertEqual(len(tag.media), 2)
+
+    def test_element_priority(self):
+        self.agent.setRetention('media', 'off')
+        tag = Tag('tag')
+        setRetention(tag, 'media', 'ids')
+        self.agent.getMedia(tag, settings={})
+        self.assertEqual(sorted(tag.media), ['code1', 'code2', 'code3'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.agent.setRetention('unknown', 'off')
+        with self.assertRaises(ValueError):
+            self.agent.setRetention('media', 'unknown')
+        self.assertNotIn('media', self.agent.retention)
+
+
+if __name__ == '__main__':
+    unittest.main()
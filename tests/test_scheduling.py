@@ -0,0 +1,115 @@
+import threading
+import unittest
+from time import perf_counter, sleep
+
+from InstagramLib.deadlines import CancellationToken, Deadline
+from InstagramLib.exceptions import Cancelled
+from InstagramLib.instagram import Account, Agent
+from InstagramLib.scheduling import (BULK, INTERACTIVE, Priority,
+                                     RequestScheduler)
+from InstagramLib.transport import FakeTransport
+
+from pages import accountPage
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def test_rate(self):
+        scheduler = RequestScheduler(rate=1, burst=2)
+        self.assertTrue(scheduler.acquire())
+        self.assertTrue(scheduler.acquire(BULK))
+        # Bucket is empty, next token is in a second
+        self.assertFalse(scheduler.acquire(timeout=0.05))
+        stats = scheduler.stats()
+        self.assertEqual((stats[INTERACTIVE]['requests'],
+                          stats[INTERACTIVE]['timeouts'],
+                          stats[INTERACTIVE]['depth']), (1, 1, 0))
+        self.assertEqual(stats[BULK]['requests'], 1)
+        with self.assertRaises(ValueError):
+            scheduler.acquire('unknown')
+
+    def test_weights(self):
+        scheduler = RequestScheduler(rate=5)
+        scheduler.acquire()
+        order = []
+
+        def acquire(priority):
+            scheduler.acquire(priority)
+            order.append(priority)
+
+        threads = []
+        for priority in (BULK, BULK, INTERACTIVE, INTERACTIVE):
+            thread = threading.Thread(target=acquire, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            # Requests are queued in order of threads
+            while sum(cls['depth'] for cls in
+                      scheduler.stats().values()) < len(threads):
+                sleep(0.001)
+        for thread in threads:
+            thread.join(5)
+        # Interactive requests pass queued bulk requests by weight
+        self.assertEqual(order, [INTERACTIVE, INTERACTIVE, BULK, BULK])
+
+    def test_cancel(self):
+        scheduler = RequestScheduler(rate=0.1)
+        scheduler.acquire()
+        token = CancellationToken()
+        deadline = Deadline(token=token)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            scheduler.acquire(deadline=deadline)))
+        start = perf_counter()
+        thread.start()
+        token.wait(0.05)
+        token.cancel()
+        thread.join(5)
+        # Token only deadline wakes waiting up long before next token
+        self.assertEqual(results, [False])
+        self.assertLess(perf_counter() - start, 1)
+        self.assertEqual(scheduler.stats()[INTERACTIVE]['timeouts'], 1)
+        self.assertEqual(scheduler.__queue__, [])
+
+    def test_classify(self):
+        scheduler = RequestScheduler(rate=1)
+        self.assertEqual(scheduler.classify(
+            'GET', 'https://www.instagram.com/graphql/query/',
+            {'query_hash': 'hash'}), BULK)
+        self.assertEqual(scheduler.classify(
+            'GET', 'https://www.instagram.com/user'), INTERACTIVE)
+        with Priority(BULK):
+            self.assertEqual(scheduler.classify(
+                'GET', 'https://www.instagram.com/user'), BULK)
+
+
+class AgentSchedulerTestCase(unittest.TestCase):
+    def test_cancel(self):
+        transport = FakeTransport()
+        transport.add('GET', 'https://www.instagram.com/user',
+                      accountPage('user', 1))
+        agent = Agent()
+        agent.setTransport(transport)
+        agent.enableScheduler(rate=0.1)
+        agent.__update__(Account('user'), settings={})
+        token = CancellationToken()
+        agent.setDeadline(token=token)
+        errors = []
+
+        def update():
+            try:
+                agent.__update__(Account('user'), settings={})
+            except Cancelled as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=update)
+        start = perf_counter()
+        thread.start()
+        token.wait(0.05)
+        token.cancel()
+        thread.join(5)
+        self.assertEqual(len(errors), 1)
+        self.assertLess(perf_counter() - start, 1)
+        self.assertEqual(len(transport.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
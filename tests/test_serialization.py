@@ -0,0 +1,32 @@
+import pickle
+import unittest
+
+from InstagramLib.instagram import Account, Comment, Media
+from InstagramLib.serialization import dumps, loads
+
+
+class SerializationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.owner = Account('owner')
+        self.owner.id = '1'
+        self.media = Media('code')
+        self.media.__dict__.update(id='2', owner=self.owner, likes_count=10,
+                                   caption='caption', dimensions=(1, 2))
+        self.comment = Comment('3', self.media, self.owner, 'text', 100)
+
+    def test_round_trip(self):
+        data = dumps([self.owner, self.media, self.comment])
+        # Buffer isn't copied to bytes
+        self.assertIsInstance(data, bytearray)
+        owner, media, comment = loads(data)
+        self.assertEqual((media.code, media.id, media.likes_count,
+                          media.dimensions), ('code', '2', 10, (1, 2)))
+        # References to the same element are restored as one object
+        self.assertIs(media.owner, owner)
+        self.assertIs(comment.media, media)
+        self.assertIs(comment.owner, owner)
+        self.assertEqual((comment.text, comment.created_at), ('text', 100))
+
+    def test_buffer_between_processes(self):
+        data = pickle.loads(pickle.dumps(dumps([self.media])))
+        self.assertEqual(loads(data)[0].caption, 'caption')
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from InstagramLib.instagram import Account, Comment, Media, Tag
+from InstagramLib.storage import Storage
+
+
+class StorageTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'storage.db')
+        self.storage = Storage(self.path, batch_size=3)
+        self.addCleanup(self.storage.close)
+
+    def query(self, query, *args):
+        return self.storage.connection.execute(query, args).fetchall()
+
+    def test_wal(self):
+        self.assertEqual(self.query("PRAGMA journal_mode"), [('wal',)])
+
+    def test_batch(self):
+        self.storage.add(Account('first'))
+        self.storage.add(Account('second'))
+        # Rows are written by batches
+        self.assertEqual(self.query("SELECT count(*) FROM accounts"), [(0,)])
+        self.storage.add(Account('third'))
+        self.assertEqual(self.query("SELECT count(*) FROM accounts"), [(3,)])
+        self.storage.add(Account('fourth'))
+        self.storage.flush()
+        self.assertEqual(self.query("SELECT count(*) FROM accounts"), [(4,)])
+
+    def test_coalesced_upsert(self):
+        account = Account('user')
+        account.id = '5'
+        account.followers_count = 10
+        self.storage.add(account)
+        self.storage.flush()
+        # Not loaded fields don't erase stored values
+        account = Account('user')
+        account.full_name = 'User'
+        self.storage.add(account)
+        self.storage.flush()
+        self.assertEqual(self.query(
+            "SELECT login, id, followers_count, full_name FROM accounts"),
+            [('user', 5, 10, 'User')])
+
+    def test_relations(self):
+        owner = Account('owner')
+        owner.id = '1'
+        follower = Account('follower')
+        follower.id = '2'
+        media = Media('code')
+        tag = Tag('tag')
+        self.storage.add(follower, 'follower', owner)
+        self.storage.add(media, 'media', owner)
+        self.storage.add(media, 'media', tag)
+        self.storage.add(Comment('3', media, follower, 'text', 100))
+        self.storage.flush()
+        self.assertEqual(self.query(
+            "SELECT follower_id, followed_id FROM follows"), [(2, 1)])
+        self.assertEqual(self.query("SELECT code, owner_login FROM media"),
+                         [('code', 'owner')])
+        self.assertEqual(self.query(
+            "SELECT tag_name, media_code FROM tag_media"), [('tag', 'code')])
+        self.assertEqual(self.query(
+            "SELECT id, media_code, owner_login FROM comments"),
+            [(3, 'code', 'follower')])
+
+    def test_indexes(self):
+        plan = self.query("EXPLAIN QUERY PLAN SELECT code FROM media WHERE "
+                          "owner_login = ?", 'owner')
+        self.assertIn('media_owner', plan[0][-1])
+        plan = self.query("EXPLAIN QUERY PLAN SELECT follower_id FROM "
+                          "follows WHERE followed_id = ?", 1)
+        self.assertIn('follows_followed', plan[0][-1])
+
+    def test_close_flushes(self):
+        self.storage.add(Tag('tag'))
+        self.storage.close()
+        with Storage(self.path) as storage:
+            self.assertEqual(storage.connection.execute(
+                "SELECT name FROM tags").fetchall(), [('tag',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from InstagramLib.instagram import Account, AgentAccount
+from InstagramLib.transport import FakeTransport
+
+from pages import accountPage, addLogin, connection
+
+
+class SyncTestCase(unittest.TestCase):
+    def setUp(self):
+        # Followers are listed from the newest
+        self.followers = list(range(1000, 0, -1))
+        self.transport = FakeTransport()
+        addLogin(self.transport)
+        self.transport.add('GET', 'https://www.instagram.com/user',
+                           lambda *args, **kwargs: accountPage(
+                               'user', 1, len(self.followers)))
+        self.transport.add('GET', 'https://www.instagram.com/graphql/query',
+                           self.query)
+        self.agent = AgentAccount('login', 'password',
+                                  transport=self.transport)
+        self.snapshot = list(self.followers)
+
+    def query(self, method, url, params=None, **kwargs):
+        variables = json.loads(params['variables'])
+        start = int(variables.get('after', 0))
+        end = start + variables['first']
+        return json.dumps({'data': {'user': {'edge_followed_by': connection(
+            [{'id': str(id)} for id in self.followers[start:end]],
+            len(self.followers), str(end) if end < len(self.followers)
+            else None)}}})
+
+    def sync(self, **kwargs):
+        return self.agent.syncFollowers(Account('user'), self.snapshot,
+                                        known_streak=20, page_size=50,
+                                        **kwargs)
+
+    def test_gained(self):
+        self.followers[:0] = [2001, 2002]
+        delta = self.sync()
+        self.assertEqual(sorted(delta.gained), [2001, 2002])
+        self.assertEqual(delta.lost_count, 0)
+        self.assertTrue(delta.complete)
+        self.assertEqual(len(delta.snapshot), 1002)
+        self.assertEqual(delta.requests, 2)
+
+    def test_lost_are_counted(self):
+        self.followers[:0] = [2001]
+        self.followers.remove(1)
+        self.followers.remove(500)
+        delta = self.sync()
+        # Cost doesn't depend on count of followers
+        self.assertEqual(delta.requests, 2)
+        self.assertEqual(delta.gained, [2001])
+        self.assertEqual((delta.lost, delta.lost_count), ([], 2))
+        self.assertFalse(delta.complete)
+        # Lost ids are counted again by next sync
+        self.snapshot = delta.snapshot
+        delta = self.sync()
+        self.assertEqual((delta.gained, delta.lost_count), ([], 2))
+
+    def test_reconcile(self):
+        self.followers.remove(1)
+        delta = self.sync(reconcile=True)
+        self.assertEqual((delta.lost, delta.lost_count), ([1], 1))
+        self.assertTrue(delta.complete)
+        self.assertEqual(len(delta.snapshot), 999)
+        self.assertNotIn(1, delta.snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from unittest import mock
+
+from InstagramLib.transport import httpxEncodings
+
+
+class HttpxEncodingsTestCase(unittest.TestCase):
+    @mock.patch('InstagramLib.transport.availableEncodings',
+                return_value=['zstd', 'br', 'gzip', 'deflate'])
+    def test_version(self, available):
+        self.assertEqual(httpxEncodings('0.27.1'),
+                         ['zstd', 'br', 'gzip', 'deflate'])
+        self.assertEqual(httpxEncodings('0.28.0.dev1'),
+                         ['zstd', 'br', 'gzip', 'deflate'])
+        # zstd is decoded since httpx 0.27.1
+        self.assertEqual(httpxEncodings('0.27.0'), ['br', 'gzip', 'deflate'])
+        self.assertEqual(httpxEncodings('1.0.dev3'), ['gzip', 'deflate'])
+        self.assertEqual(httpxEncodings(None), ['gzip', 'deflate'])
+
+    @mock.patch('InstagramLib.transport.availableEncodings',
+                return_value=['gzip', 'deflate'])
+    def test_not_installed_decoders(self, available):
+        self.assertEqual(httpxEncodings('0.27.2'), ['gzip', 'deflate'])
+
+
+if __name__ == '__main__':
+    unittest.main()